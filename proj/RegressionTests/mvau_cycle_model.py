@@ -0,0 +1,279 @@
+#
+# Python Script: MVAU Cycle Model (mvau_cycle_model.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script predicts the number of clock cycles taken by the MVAU
+# batch (mvau.sv + mvau_control_block.sv) and stream (mvau_stream.sv +
+# mvau_stream_control_block.sv) units from the configuration alone, i.e.,
+# without running any simulation. Both units use the same stream control
+# block, which computes one output pixel in SF*NF cycles without any bubbles:
+# the SF input words of a pixel are written to the input buffer while the
+# first NF chunk is computed and are then read back (NF-1) times, with the
+# next pixel being accepted in the cycle following the last read. Here
+# SF=MatrixW/SIMD and NF=MatrixH/PE.
+#
+# The latency written by the test benches (mvau_tb_v3.sv, mvau_stream_tb_v3.sv)
+# to latency.txt is the number of cycles from coming out of reset until the
+# last output has been consumed, which is modelled as:
+#   latency = start_cycles + SF*NF*OFMDim*OFMDim*MMV + pipe_cycles + tb_cycles
+#
+# It can be called from the command line as follows:
+# python mvau_cycle_model.py predict <config>                  - Predicts the cycles of a configuration
+# python mvau_cycle_model.py predict <config> --lat_file <f>   - Also compares with a recorded latency.txt
+# python mvau_cycle_model.py rank <config>                     - Ranks all legal SIMD/PE pairs by cycles per frame
+# python mvau_cycle_model.py validate -d <database>            - Compares with the RTL latency of regression tests
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import sys
+from collections import namedtuple
+
+# Variable: start_cycles
+# Cycles after reset before the first input is accepted, as wready is
+# registered from ap_start in the stream control block
+start_cycles = 1
+
+# Variable: pipe_cycles
+# Cycles from the last computation cycle of an output pixel to the output
+# valid. The accumulator outputs are valid two cycles after sf_clr is set
+# (sf_clr_dly), while the stream unit registers its output once more
+pipe_cycles = {'mvau': 2, 'mvau_stream': 3}
+
+# Variable: tb_cycles
+# Cycles counted by the test bench after the last output becomes valid
+tb_cycles = 1
+
+# Variable: MvauCycles
+# Cycle counts of a configuration. ii is the number of cycles per output pixel,
+# cycles the number of computation cycles of all output pixels, first_out the
+# cycle in which the first output is valid and latency the total number of
+# cycles counted by the test bench (None if the test benches cannot be used)
+MvauCycles = namedtuple('MvauCycles', ['sf', 'nf', 'pixels', 'ii', 'cycles', 'first_out', 'latency'])
+
+# Function: ofm_dim
+# This function calculates the output feature map dimensions
+#
+# Parameters:
+#   ifm_dim - Input feature map dimensions
+#   kdim - Kernel dimensions
+#   stride - Convolution stride
+#   pad - Padding around the input feature map
+#
+# Returns:
+#
+#   ofm_dim - Output feature map dimensions
+def ofm_dim(ifm_dim, kdim, stride=1, pad=0):
+    return (ifm_dim-kdim+2*pad)//stride+1
+
+# Function: fold_factors
+# This function calculates the folding of the weight matrix
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   simd - Number of SIMD blocks per PE
+#   pe - Number of PEs
+#
+# Returns:
+#
+#   sf - Number of SIMD wide chunks of a row of the weight matrix (MatrixW/SIMD)
+#   nf - Number of PE high chunks of the weight matrix (MatrixH/PE)
+def fold_factors(ifm_ch, ofm_ch, kdim, simd, pe):
+    matrix_w = kdim*kdim*ifm_ch
+    matrix_h = ofm_ch
+    if(matrix_w % simd != 0):
+        raise ValueError("SIMD (%d) does not divide MatrixW (%d)" % (simd, matrix_w))
+    if(matrix_h % pe != 0):
+        raise ValueError("PE (%d) does not divide MatrixH (%d)" % (pe, matrix_h))
+    return matrix_w//simd, matrix_h//pe
+
+# Function: mvau_cycles
+# This function predicts the cycle counts of the batch or stream unit
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ifm_dim - Input feature map dimensions
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   simd - Number of SIMD blocks per PE
+#   pe - Number of PEs
+#   stride - Convolution stride
+#   mmv - Number of input frames
+#   stream - True for the stream unit, False for the batch unit
+#
+# Returns:
+#
+#   cycles - MvauCycles record
+def mvau_cycles(ifm_ch, ifm_dim, ofm_ch, kdim, simd, pe, stride=1, mmv=1, stream=False):
+    sf, nf = fold_factors(ifm_ch, ofm_ch, kdim, simd, pe)
+    ### The stream control block does not reuse the input buffer at a constant rate with SF=1
+    if(sf < 2 and nf > 1):
+        raise ValueError("SF=MatrixW/SIMD of 1 is only supported with NF=1, SIMD (%d) is too large" % simd)
+    pixels = ofm_dim(ifm_dim, kdim, stride)**2
+    pipe = pipe_cycles['mvau_stream' if stream else 'mvau']
+    ii = sf*nf
+    cycles = ii*pixels*mmv
+    latency = start_cycles+cycles+pipe+tb_cycles
+    ### With SF=1, the outputs are valid in consecutive cycles which the test benches cannot follow
+    if(sf < 2 and pixels*mmv > 1):
+        latency = None
+    return MvauCycles(sf, nf, pixels, ii, cycles, start_cycles+sf+pipe, latency)
+
+# Function: legal_folds
+# This function lists all SIMD/PE pairs allowed by the regression tests,
+# i.e., SIMD divides the input channels and PE divides the output channels,
+# and by the stream control block, i.e., SF>=2 or SF=NF=1
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#
+# Returns:
+#
+#   folds - List of (simd, pe) tuples
+def legal_folds(ifm_ch, ofm_ch, kdim):
+    simd_lst = [s for s in range(1, ifm_ch+1) if ifm_ch % s == 0]
+    pe_lst = [p for p in range(1, ofm_ch+1) if ofm_ch % p == 0]
+    return [(s, p) for s in simd_lst for p in pe_lst
+            if kdim*kdim*ifm_ch//s >= 2 or ofm_ch//p == 1]
+
+# Function: rank_folds
+# This function ranks all legal SIMD/PE pairs of a layer by throughput
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ifm_dim - Input feature map dimensions
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   stride - Convolution stride
+#   stream - True for the stream unit, False for the batch unit
+#
+# Returns:
+#
+#   ranks - List of (simd, pe, MvauCycles) tuples, fewest cycles first and fewest
+#           SIMD*PE first among pairs with the same number of cycles
+def rank_folds(ifm_ch, ifm_dim, ofm_ch, kdim, stride=1, stream=False):
+    ranks = [(s, p, mvau_cycles(ifm_ch, ifm_dim, ofm_ch, kdim, s, p, stride, stream=stream))
+             for s, p in legal_folds(ifm_ch, ofm_ch, kdim)]
+    return sorted(ranks, key=lambda r: (r[2].cycles, r[0]*r[1], r[1]))
+
+# Function: read_latency
+# This function reads a latency.txt file written by the test benches
+#
+# Parameters:
+#   lat_file - Latency file
+#
+# Returns:
+#
+#   lat - Latency in clock cycles
+def read_latency(lat_file):
+    try:
+        with open(lat_file) as f:
+            return int(float(f.read().replace(' ', '')))
+    except:
+        print("Cannot read the RTL latency report file")
+        raise
+
+# Function: validate_db
+# This function compares the predicted latency with the RTL latency of all
+# configuration sets stored in the results database
+#
+# Parameters:
+#   db_file - Results database file name
+#   sweep - Name of the regression test, None for all sweeps
+#
+# Returns:
+#
+#   df - Pandas data frame with the predicted and measured latency of each configuration set
+def validate_db(db_file, sweep=None):
+    from mvau_results_db import ResultsDB
+    db = ResultsDB(db_file)
+    scripts = dict(db.conn.execute('SELECT sweep, script FROM sweeps').fetchall())
+    df = db.query(sweep)
+    db.close()
+    predicted = []
+    for _, row in df.iterrows():
+        try:
+            lat = mvau_cycles(int(row['IFM_Ch']), int(row['IFM_Dim']), int(row['OFM_Ch']), int(row['KDim']),
+                              int(row['SIMD']), int(row['PE']), stream=('stream' in scripts[row['sweep']])).latency
+        except ValueError:
+            lat = None
+        predicted.append(lat)
+    df = df[['sweep', 'config_set', 'IFM_Ch', 'IFM_Dim', 'OFM_Ch', 'KDim', 'SIMD', 'PE', 'RTL Latency']].copy()
+    ### Sharded simulations have no RTL latency (N/A)
+    df['RTL Latency'] = df['RTL Latency'].apply(lambda lat: None if lat == 'N/A' else lat).astype(float)
+    df['Model Latency'] = predicted
+    df['Diff'] = df['RTL Latency'] - df['Model Latency']
+    return df
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for predicting the cycles of MVAU batch and stream units')
+    parser.add_argument('cmd', choices=['predict', 'rank', 'validate'],
+                        help="Predict the cycles of a configuration, rank SIMD/PE pairs or validate against a results database")
+    parser.add_argument('-k','--kdim',default=2,type=int,
+                        help="Filter dimension")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+                        help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+                        help="Output feature map channels")
+    parser.add_argument('--ifm_dim', default=4, type=int,
+                        help="Input feature map dimensions")
+    parser.add_argument('-s','--simd',default=2,type=int,
+                        help="SIMD")
+    parser.add_argument('-p', '--pe', default=2,type=int,
+                        help="PE")
+    parser.add_argument('-m', '--mmv', default=1,type=int,
+                        help="MMV")
+    parser.add_argument('--stride', default=1,type=int,
+                        help="Convolution stride")
+    parser.add_argument('--stream', action='store_true',
+                        help="Model the MVAU stream unit")
+    parser.add_argument('--lat_file', default=None,
+                        help="Latency file (latency.txt) written by the test bench to compare with")
+    parser.add_argument('-d','--db',default="mvau_results.db",
+                        help="Results database file")
+    parser.add_argument('--sweep',default=None,
+                        help="Sweep to be validated, all sweeps by default")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# predicts, ranks or validates the cycles
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.cmd == 'predict'):
+        cyc = mvau_cycles(args.ifm_ch, args.ifm_dim, args.ofm_ch, args.kdim, args.simd, args.pe,
+                          args.stride, args.mmv, args.stream)
+        print(f'SF: {cyc.sf}, NF: {cyc.nf}, Output pixels: {cyc.pixels}')
+        print(f'Cycles per output pixel: {cyc.ii}, Cycles: {cyc.cycles}')
+        print(f'First output: {cyc.first_out}, Latency: {cyc.latency}')
+        if(args.lat_file is not None and cyc.latency is None):
+            print("The latency of this configuration cannot be measured by the test benches")
+            sys.exit(1)
+        elif(args.lat_file is not None):
+            lat = read_latency(args.lat_file)
+            print(f'Recorded latency: {lat}, Difference: {lat-cyc.latency}')
+            sys.exit(0 if lat == cyc.latency else 1)
+    elif(args.cmd == 'rank'):
+        print("SIMD\tPE\tSF\tNF\tCycles\tLatency")
+        for s, p, cyc in rank_folds(args.ifm_ch, args.ifm_dim, args.ofm_ch, args.kdim, args.stride, args.stream):
+            print(f'{s}\t{p}\t{cyc.sf}\t{cyc.nf}\t{cyc.cycles}\t{cyc.latency}')
+    else:
+        df = validate_db(args.db, args.sweep)
+        print(df.to_string(index=False))
+        checked = df['Diff'].notna()
+        print(f'{int((df["Diff"][checked] == 0).sum())} of {int(checked.sum())} configuration sets match the model')
+    sys.exit(0)
@@ -0,0 +1,264 @@
+#
+# Python Script: Regression Test Event Log (mvau_events.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script times the stages of the regression test flows and writes
+# one JSON record for each stage to an event log (JSON lines). A record holds
+# the configuration set, the stage, its start and end time (seconds since the
+# epoch), its duration, its exit status, whether it succeeded (the test
+# scripts exit with 1 on success) and, for stages running a child
+# process, the resources used by the child process tree (see mvau_monitor.py):
+# its peak CPU utilization, CPU time, peak resident set size (RSS), the MB read
+# and written and the limit it was terminated for, if any.
+#
+# The regression test script times its own stages (HLS and RTL flows, golden
+# data, report extraction and writing the output file) and passes the event log,
+# the configuration set and the current stage to the test scripts through the
+# environment variables MVAU_EVENT_LOG, MVAU_CONFIG_SET and MVAU_STAGE. The
+# test scripts run the commands of their own stages (generation, elaboration,
+# simulation, synthesis) through this script, which names them after the
+# stage of its parent, for e.g. rtl/sim/elab. Without MVAU_EVENT_LOG and
+# MVAU_LIMITS, commands are run without being timed or monitored. Records are appended with a single write, so
+# configuration sets run in parallel can share the event log. A stage killed
+# for exceeding its limits fails, and so do the stages it is nested in, as
+# regtest_mvau.py checks the event log for killed stages after each flow.
+#
+# It can be called from the command line as follows:
+# python mvau_events.py run <stage> -- <command>      - Runs and times a command
+# python mvau_events.py run --ok 1 <stage> -- <command> - Same for a command exiting with 1 on success
+# python mvau_events.py summary <event log>           - Summarizes where the time of a sweep goes
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+import pandas as pd
+from mvau_monitor import run_monitored, stage_limits
+
+# Variable: event_cols
+# Fields of the records of the event log
+event_cols = ['config_set', 'stage', 'start', 'end', 'dur', 'status', 'ok', 'killed',
+              'cpu_pct', 'cpu_s', 'max_rss_mb', 'read_mb', 'write_mb', 'pid']
+
+# Function: log_event
+# This function appends one record to the event log given by MVAU_EVENT_LOG
+#
+# Parameters:
+#   rec - Dictionary of the record
+#
+# Returns:
+#
+#   None
+def log_event(rec):
+    log_file = os.environ.get('MVAU_EVENT_LOG')
+    if(not log_file):
+        return
+    line = (json.dumps(rec) + "\n").encode()
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+# Function: stage_name
+# This function returns the name of a stage, nested in the stage of the parent process
+#
+# Parameters:
+#   stage - Name of the stage
+#
+# Returns:
+#
+#   name - Name of the stage, for e.g. rtl/synth
+def stage_name(stage):
+    parent = os.environ.get('MVAU_STAGE')
+    return parent+"/"+stage if parent else stage
+
+# Function: make_record
+# This function returns the record of a completed stage
+#
+# Parameters:
+#   config_set - Configuration set number, None if not known
+#   stage - Full name of the stage
+#   start - Start time (seconds since the epoch)
+#   status - Exit status of the stage
+#   ok - True if the stage succeeded
+#   usage - Dictionary of the resources used by the child processes (returned by
+#           run_monitored of mvau_monitor.py), None if no child process was run
+#
+# Returns:
+#
+#   rec - Dictionary of the record
+def make_record(config_set, stage, start, status, ok, usage=None):
+    end = time.time()
+    if(config_set is None and os.environ.get('MVAU_CONFIG_SET')):
+        config_set = int(os.environ['MVAU_CONFIG_SET'])
+    rec = {'config_set': config_set, 'stage': stage, 'start': round(start, 3), 'end': round(end, 3),
+           'dur': round(end-start, 3), 'status': status, 'ok': ok, 'pid': os.getpid()}
+    if(usage is not None):
+        rec.update(usage)
+    return rec
+
+# Function: span
+# This context manager times a stage run by the python process itself. The stage
+# fails (status 1) if an exception is raised
+#
+# Parameters:
+#   stage - Name of the stage
+#   config_set - Configuration set number, None if not known
+@contextmanager
+def span(stage, config_set=None):
+    start = time.time()
+    status = 1
+    try:
+        yield
+        status = 0
+    finally:
+        log_event(make_record(config_set, stage_name(stage), start, status, status == 0))
+
+# Function: run_timed
+# This function runs a command as a child process, monitoring its resources and
+# enforcing the limits of the stage, and times it. The event log, configuration
+# set and stage are passed on to the child process, so that the stages of the
+# child process are nested in this stage. A command killed for exceeding its
+# limits returns a failing status, 0 for commands exiting with 1 on success and
+# 137 (killed) otherwise
+#
+# Parameters:
+#   stage - Name of the stage
+#   cmd - List of the command and its arguments
+#   cwd - Directory from where the command is run, None for the current directory
+#   env - Environment of the command, None to use the current environment
+#   config_set - Configuration set number, None if not known
+#   ok_status - Exit status of the command on success
+#
+# Returns:
+#
+#   status - Exit status of the command
+def run_timed(stage, cmd, cwd=None, env=None, config_set=None, ok_status=0):
+    name = stage_name(stage)
+    env = dict(os.environ if env is None else env)
+    env['MVAU_STAGE'] = name
+    if(config_set is not None):
+        env['MVAU_CONFIG_SET'] = str(config_set)
+    start = time.time()
+    status, usage = run_monitored(cmd, cwd, env, *stage_limits(name))
+    if(usage['killed'] is not None):
+        status = 0 if ok_status != 0 else 137
+    log_event(make_record(config_set, name, start, status,
+                          status == ok_status and usage['killed'] is None, usage))
+    return status
+
+# Function: killed_stages
+# This function returns the stages of a configuration set killed for exceeding their limits
+#
+# Parameters:
+#   config_set - Configuration set number
+#   since - Time (seconds since the epoch) from which stages are looked for
+#
+# Returns:
+#
+#   stages - List of the names of the killed stages
+def killed_stages(config_set, since):
+    log_file = os.environ.get('MVAU_EVENT_LOG')
+    if(not log_file or not os.path.isfile(log_file)):
+        return []
+    df = read_events(log_file)
+    df = df[(df['config_set'] == config_set) & (df['start'] >= since) & df['killed'].notna()]
+    return list(df['stage'])
+
+# Function: read_events
+# This function reads an event log, ignoring an incomplete last line
+#
+# Parameters:
+#   log_file - Event log file name
+#
+# Returns:
+#
+#   df - Pandas data frame with one row for each record
+def read_events(log_file):
+    recs = []
+    try:
+        with open(log_file) as f:
+            for line in f:
+                try:
+                    recs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except:
+        print("Cannot read the event log")
+        raise
+    return pd.DataFrame(recs, columns=event_cols)
+
+# Function: summarize
+# This function summarizes the time spent in each stage of a sweep. The share of
+# a stage is given with respect to the total time of the top level stages, as the
+# time of nested stages is also counted in the stages they are nested in
+#
+# Parameters:
+#   df - Pandas data frame of the records (read by read_events)
+#
+# Returns:
+#
+#   summary - Pandas data frame with one row for each stage, longest first
+def summarize(df):
+    summary = df.groupby('stage').agg(runs=('dur', 'size'), failed=('ok', lambda s: int((s != True).sum())),
+                                      killed=('killed', 'count'), total_s=('dur', 'sum'), mean_s=('dur', 'mean'),
+                                      max_s=('dur', 'max'), cpu_pct=('cpu_pct', 'max'),
+                                      max_rss_mb=('max_rss_mb', 'max'), write_mb=('write_mb', 'max'))
+    top_total = df.loc[~df['stage'].str.contains("/"), 'dur'].sum()
+    summary['share_%'] = (100*summary['total_s']/top_total).round(1) if top_total > 0 else 0.0
+    return summary.round(2).sort_values('total_s', ascending=False)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for timing the stages of the regression test flows')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    run_p = sub.add_parser('run', help="Run and time a command")
+    run_p.add_argument('--ok',default=0,type=int,
+                       help="Exit status of the command on success")
+    run_p.add_argument('stage',
+                       help="Name of the stage")
+    run_p.add_argument('command', nargs=argparse.REMAINDER,
+                       help="Command and its arguments, after --")
+    sum_p = sub.add_parser('summary', help="Summarize an event log")
+    sum_p.add_argument('log_file',
+                       help="Event log file")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# runs a command or summarizes an event log
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.cmd == 'run'):
+        cmd = args.command[1:] if args.command[:1] == ['--'] else args.command
+        if(len(cmd) == 0):
+            print("No command given")
+            sys.exit(2)
+        if(not os.environ.get('MVAU_EVENT_LOG') and not os.environ.get('MVAU_LIMITS')):
+            os.execvp(cmd[0], cmd)
+        status = run_timed(args.stage, cmd, ok_status=args.ok)
+        ### Exit status of the shell for a command ended by a signal
+        sys.exit(status if status >= 0 else 128-status)
+    df = read_events(args.log_file)
+    if(len(df) == 0):
+        print(f'No events in {args.log_file}')
+        sys.exit(0)
+    summary = summarize(df)
+    print(summary.to_string())
+    print(f'{df["config_set"].nunique()} configuration sets, {len(df)} events, '
+          f'{df["end"].max()-df["start"].min():.0f} s from the first to the last event')
+    sys.exit(0)
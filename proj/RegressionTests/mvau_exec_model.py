@@ -0,0 +1,197 @@
+#
+# Python Script: Regression Test Run Time Model (mvau_exec_model.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script estimates the run time of the HLS and RTL flows of a
+# configuration set before it is run. The execution times of completed
+# configuration sets (hls_exec.rpt and rtl_exec.rpt, stored as 'HLS Exec. Time'
+# and 'RTL Exec. Time' in the results database) are fitted against the size of
+# the folded design, MatrixW x MatrixH x SIMD x PE, as a power law
+#   t = coef * (MatrixW*MatrixH*SIMD*PE)^exp
+# by least squares in the log domain, separately for HLS and RTL. Only the
+# sweeps of the same MVAU unit are used when there are enough of them. Without
+# any history, the run time of every configuration set is taken as default_exec.
+#
+# The estimates are used to report the run time of a sweep before it is run
+# and to start the longest configuration sets first when running in parallel.
+#
+# It can be called from the command line as follows:
+# python mvau_exec_model.py -d <database>              - Prints the fitted model
+# python mvau_exec_model.py -d <database> -a stream    - Prints the fitted model of the stream unit
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import heapq
+import os
+import sys
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from mvau_results_db import ResultsDB
+
+# Variable: default_exec
+# Run time (seconds) of the HLS and RTL flows used without any history
+default_exec = {'hls': 600.0, 'rtl': 300.0}
+
+# Variable: min_fit
+# Number of completed configuration sets of a unit needed to fit its own model
+min_fit = 4
+
+# Variable: ExecModel
+# Run time model of the HLS and RTL flows, each a (coef, exp) pair,
+# along with the number of configuration sets it was fitted to
+ExecModel = namedtuple('ExecModel', ['hls', 'rtl', 'n'])
+
+# Function: design_size
+# This function returns the size of the folded design the run time is fitted against
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   size - MatrixW x MatrixH x SIMD x PE
+def design_size(ifm_ch, ofm_ch, kdim, simd, pe):
+    return kdim*kdim*ifm_ch*ofm_ch*simd*pe
+
+# Function: fit_power
+# This function fits t = coef * x^exp by least squares of log(t). A single
+# size gives a constant model (exp of 0)
+#
+# Parameters:
+#   x - Array of design sizes
+#   t - Array of run times (seconds), all positive
+#
+# Returns:
+#
+#   coef, exp - Coefficients of the model
+def fit_power(x, t):
+    lx, lt = np.log(x), np.log(t)
+    if(len(np.unique(lx)) < 2):
+        return float(np.exp(lt.mean())), 0.0
+    exp, lcoef = np.polyfit(lx, lt, 1)
+    return float(np.exp(lcoef)), float(exp)
+
+# Function: default_model
+# This function returns the model used without any history
+#
+# Returns:
+#
+#   model - ExecModel record
+def default_model():
+    return ExecModel((default_exec['hls'], 0.0), (default_exec['rtl'], 0.0), 0)
+
+# Function: fit_exec
+# This function fits the run time model to the completed configuration
+# sets of a results database
+#
+# Parameters:
+#   db_file - Results database file
+#   arch - MVAU unit ('batch' or 'stream') whose sweeps are preferred, None for all sweeps
+#
+# Returns:
+#
+#   model - ExecModel record, the default model if the database has no results
+def fit_exec(db_file, arch=None):
+    if(not os.path.isfile(db_file)):
+        return default_model()
+    db = ResultsDB(db_file)
+    df = db.query()
+    scripts = dict(db.conn.execute('SELECT sweep, script FROM sweeps').fetchall())
+    db.close()
+    cols = ["IFM_Ch", "OFM_Ch", "KDim", "SIMD", "PE", "HLS Exec. Time", "RTL Exec. Time"]
+    if(len(df) == 0 or any(c not in df.columns for c in cols)):
+        return default_model()
+    df = df.assign(**{c: pd.to_numeric(df[c], errors='coerce') for c in cols}).dropna(subset=cols)
+    df = df[(df["HLS Exec. Time"] > 0) & (df["RTL Exec. Time"] > 0)]
+    ### Sweeps of the same unit, if there are enough of them
+    if(arch is not None):
+        same = df[df['sweep'].map(lambda s: scripts.get(s, "")) == "regtest_mvau_"+arch]
+        if(len(same) >= min_fit):
+            df = same
+    if(len(df) == 0):
+        return default_model()
+    x = design_size(*(df[c].values.astype(float) for c in cols[:5]))
+    return ExecModel(fit_power(x, df["HLS Exec. Time"].values.astype(float)),
+                     fit_power(x, df["RTL Exec. Time"].values.astype(float)), len(df))
+
+# Function: est_exec
+# This function estimates the run time of the HLS and RTL flows of a configuration set
+#
+# Parameters:
+#   model - ExecModel record
+#   pt - Configuration set (SweepPoint of mvau_sweep.py)
+#
+# Returns:
+#
+#   hls_exec, rtl_exec - Estimated run times (seconds)
+def est_exec(model, pt):
+    x = design_size(pt.ifm_ch, pt.ofm_ch, pt.kdim, pt.simd, pt.pe)
+    return model.hls[0]*x**model.hls[1], model.rtl[0]*x**model.rtl[1]
+
+# Function: lpt_makespan
+# This function returns the run time of a number of jobs run in parallel,
+# longest first, each one starting as soon as a job finishes
+#
+# Parameters:
+#   times - List of run times of the jobs
+#   jobs - Number of jobs run in parallel
+#
+# Returns:
+#
+#   makespan - Run time of all jobs
+def lpt_makespan(times, jobs):
+    ends = [0.0]*max(1, jobs)
+    for t in sorted(times, reverse=True):
+        heapq.heappush(ends, heapq.heappop(ends)+t)
+    return max(ends)
+
+# Function: fmt_time
+# This function formats a run time as hours, minutes and seconds
+#
+# Parameters:
+#   t - Run time (seconds)
+#
+# Returns:
+#
+#   String of the run time
+def fmt_time(t):
+    t = int(round(t))
+    return f'{t//3600}:{t//60%60:02d}:{t%60:02d}'
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for fitting the run time model of regression tests')
+    parser.add_argument('-d','--db',default="mvau_results.db",
+                        help="Results database file")
+    parser.add_argument('-a','--arch',default=None,choices=['batch', 'stream'],
+                        help="MVAU unit whose sweeps are preferred")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# prints the fitted model
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    model = fit_exec(args.db, args.arch)
+    if(model.n == 0):
+        print(f'No results in {args.db}, using the default run times')
+    else:
+        print(f'Fitted to {model.n} configuration sets of {args.db}')
+    print(f'HLS: {model.hls[0]:.4g} * (MatrixW*MatrixH*SIMD*PE)^{model.hls[1]:.3f} s')
+    print(f'RTL: {model.rtl[0]:.4g} * (MatrixW*MatrixH*SIMD*PE)^{model.rtl[1]:.3f} s')
+    sys.exit(0)
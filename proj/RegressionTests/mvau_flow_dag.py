@@ -0,0 +1,83 @@
+#
+# Python Script: Regression Test Flow Graph (mvau_flow_dag.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script runs the stages of the flows of one configuration set as
+# a graph of dependencies instead of one after the other. Every stage is
+# started in its own thread as soon as all stages it depends on have completed
+# successfully, so independent stages, for e.g. HLS synthesis and the RTL
+# simulation and synthesis, run at the same time. The stages themselves run
+# the test scripts as child processes, which do not hold the python interpreter.
+# A failing stage does not stop the stages already running, but no stage
+# depending on it is started.
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Class: FlowDAG
+# Holds the stages of a flow and their dependencies and runs them
+#
+# Attributes:
+#    stages - Dictionary of stage names to a function returning True on success
+#    deps - Dictionary of stage names to the list of stages they depend on
+class FlowDAG:
+    # Constructor: __init__
+    # The constructor creates an empty graph
+    def __init__(self):
+        self.stages = dict()
+        self.deps = dict()
+
+    # Method: add
+    # This method adds a stage to the graph
+    #
+    # Parameters:
+    #   name - Name of the stage
+    #   fn - Function running the stage, returning True on success
+    #   deps - List of stages which must complete before this stage
+    def add(self, name, fn, deps=()):
+        for d in deps:
+            if(d not in self.stages):
+                raise ValueError("Stage %s depends on unknown stage %s" % (name, d))
+        self.stages[name] = fn
+        self.deps[name] = list(deps)
+
+    # Method: run
+    # This method runs all stages of the graph
+    #
+    # Returns:
+    #
+    #   status - Dictionary of stage names to True (completed), False (failed)
+    #            or None (not run as a stage it depends on failed)
+    def run(self):
+        status = dict()
+        waiting = list(self.stages)
+        running = dict()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.stages))) as executor:
+            while(len(waiting) > 0 or len(running) > 0):
+                ### Stages are added after the stages they depend on, so one pass
+                ### in order of addition resolves all stages which can be resolved
+                for name in list(waiting):
+                    dep_status = [status[d] for d in self.deps[name] if d in status]
+                    if(any(s is not True for s in dep_status)):
+                        ### A stage it depends on failed or was not run
+                        status[name] = None
+                        waiting.remove(name)
+                    elif(len(dep_status) == len(self.deps[name])):
+                        running[executor.submit(self.stages[name])] = name
+                        waiting.remove(name)
+                if(len(running) == 0):
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = bool(future.result())
+                    except Exception as e:
+                        print(f'Stage {name} failed: {e}')
+                        status[name] = False
+        return status
@@ -0,0 +1,297 @@
+#
+# Python Script: MVAU Folding Optimizer (mvau_fold_opt.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script selects the folding (SIMD and PE) of a layer for a given
+# budget of cycles per frame. All legal SIMD/PE pairs, i.e., SIMD dividing the
+# input channels and PE dividing the output channels as required by the
+# regression test scripts, are enumerated. The cycles per frame of each pair are
+# predicted by the cycle model (mvau_cycle_model.py) and the resources by a
+# simple analytic estimate of the LUTs or DSPs of the PEs and the LUTs or block
+# RAMs of the weight memories. The folding with the least resources meeting the budget
+# is selected and written as a sweep plan which is run by regtest_mvau.py using
+# its --plan argument.
+#
+# The resource estimate is only meant for comparing the foldings of a layer and
+# is not a replacement for synthesis.
+#
+# It can be called from the command line as follows:
+# python mvau_fold_opt.py --budget <cycles> <layer> -o <plan>  - Writes the best folding to a sweep plan
+# python mvau_fold_opt.py --budget <cycles> <layer> --top <n>  - Writes the n best foldings to a sweep plan
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+from math import ceil
+import numpy as np
+from mvau_cycle_model import mvau_cycles, legal_folds
+
+# Variable: device
+# LUTs, 18 Kb block RAMs and DSPs of the device used for synthesis (xczu3eg-sbva484-1-i),
+# used to weigh LUTs against block RAMs and DSPs
+device = {'lut': 70560, 'bram18': 432, 'dsp': 360}
+
+# Variable: dsp_wl
+# Multipliers with both the input and the weight at least this wide are assumed
+# to be inferred as DSPs by synthesis (DSP_TRUE=0 leaves the choice to Vivado)
+dsp_wl = 8
+
+# Variable: lutram_depth
+# Weight memories up to this depth are assumed to be implemented in LUTs (ram_style = "auto")
+lutram_depth = 64
+
+# Variable: bram18_cfg
+# Aspect ratios (depth, width) of an 18 Kb block RAM
+bram18_cfg = [(16384, 1), (8192, 2), (4096, 4), (2048, 9), (1024, 18), (512, 36)]
+
+# Variable: plan_keys
+# Keys of a sweep plan, named after the arrays of the regression test scripts
+plan_keys = ['kdim_arr', 'ifm_ch_arr', 'ofm_ch_arr', 'ifm_dim_arr', 'inp_wl_arr', 'inp_wl_sgn',
+             'wgt_wl_arr', 'wgt_wl_sgn', 'out_wl_arr', 'simd', 'pe']
+
+# Variable: FoldEstimate
+# Cycles and estimated resources of a folding
+FoldEstimate = namedtuple('FoldEstimate', ['simd', 'pe', 'sf', 'nf', 'cycles', 'luts', 'bram18', 'dsps',
+                                           'wmem_depth', 'cost'])
+
+# Function: simd_mode
+# This function returns the type of SIMD blocks of a layer, selected
+# in the same way as by the regression test scripts
+#
+# Parameters:
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#
+# Returns:
+#
+#   mode - 'xnor', 'binwgt' or 'std'
+def simd_mode(inp_wl, wgt_wl):
+    if(inp_wl == 1 and wgt_wl == 1):
+        return 'xnor'
+    elif(wgt_wl == 1):
+        return 'binwgt'
+    return 'std'
+
+# Function: mac_luts
+# This function estimates the LUTs of one SIMD block. An XNOR takes one LUT, a
+# binary weight a conditional negation of the input and a multiplier is estimated
+# as in FINN, i.e., (2*ceil((A+W)/6)-1)*(A+W), unless it is mapped to a DSP
+#
+# Parameters:
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#
+# Returns:
+#
+#   luts - Estimated LUTs
+def mac_luts(inp_wl, wgt_wl):
+    mode = simd_mode(inp_wl, wgt_wl)
+    if(mode == 'xnor'):
+        return 1
+    elif(mode == 'binwgt'):
+        return inp_wl+1
+    elif(mac_dsps(inp_wl, wgt_wl) > 0):
+        return 0
+    return (2*ceil((inp_wl+wgt_wl)/6)-1)*(inp_wl+wgt_wl)
+
+# Function: mac_dsps
+# This function estimates the DSPs of one SIMD block
+#
+# Parameters:
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#
+# Returns:
+#
+#   dsps - Estimated DSPs
+def mac_dsps(inp_wl, wgt_wl):
+    if(simd_mode(inp_wl, wgt_wl) == 'std' and min(inp_wl, wgt_wl) >= dsp_wl):
+        return 1
+    return 0
+
+# Function: wmem_resources
+# This function estimates the resources of the PE weight memories, each
+# being WMEM_DEPTH deep and SIMD*TW wide
+#
+# Parameters:
+#   depth - Depth of a weight memory
+#   width - Width of a weight memory
+#   pe - Number of PEs
+#
+# Returns:
+#
+#   luts - Estimated LUTs
+#   bram18 - Estimated 18 Kb block RAMs
+def wmem_resources(depth, width, pe):
+    if(depth <= lutram_depth):
+        return pe*width*ceil(depth/64), 0
+    return 0, pe*min(ceil(depth/d)*ceil(width/w) for d, w in bram18_cfg)
+
+# Function: est_folding
+# This function predicts the cycles and estimates the resources of a folding
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ifm_dim - Input feature map dimensions
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#   out_wl - Output precision
+#   simd - Number of SIMD blocks per PE
+#   pe - Number of PEs
+#   stride - Convolution stride
+#   stream - True for the stream unit, False for the batch unit
+#
+# Returns:
+#
+#   est - FoldEstimate record
+def est_folding(ifm_ch, ifm_dim, ofm_ch, kdim, inp_wl, wgt_wl, out_wl, simd, pe, stride=1, stream=False):
+    cyc = mvau_cycles(ifm_ch, ifm_dim, ofm_ch, kdim, simd, pe, stride, stream=stream)
+    ### SIMD blocks, adder tree and accumulator of each PE
+    pe_luts = simd*mac_luts(inp_wl, wgt_wl) + (simd-1)*out_wl + out_wl
+    wmem_depth = cyc.sf*cyc.nf
+    wmem_luts, bram18 = (0, 0)
+    if(not stream):
+        wmem_luts, bram18 = wmem_resources(wmem_depth, simd*wgt_wl, pe)
+    luts = pe*pe_luts + wmem_luts
+    dsps = pe*simd*mac_dsps(inp_wl, wgt_wl)
+    cost = luts/device['lut'] + bram18/device['bram18'] + dsps/device['dsp']
+    return FoldEstimate(simd, pe, cyc.sf, cyc.nf, cyc.cycles, luts, bram18, dsps, wmem_depth, cost)
+
+# Function: optimize_folding
+# This function returns the legal foldings of a layer meeting a budget of
+# cycles per frame, least resources first
+#
+# Parameters:
+#   ifm_ch - Input feature map channels
+#   ifm_dim - Input feature map dimensions
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#   out_wl - Output precision
+#   budget - Maximum cycles per frame
+#   stride - Convolution stride
+#   stream - True for the stream unit, False for the batch unit
+#
+# Returns:
+#
+#   folds - List of FoldEstimate records, empty if no folding meets the budget
+def optimize_folding(ifm_ch, ifm_dim, ofm_ch, kdim, inp_wl, wgt_wl, out_wl, budget, stride=1, stream=False):
+    folds = [est_folding(ifm_ch, ifm_dim, ofm_ch, kdim, inp_wl, wgt_wl, out_wl, s, p, stride, stream)
+             for s, p in legal_folds(ifm_ch, ofm_ch, kdim)]
+    folds = [f for f in folds if f.cycles <= budget]
+    return sorted(folds, key=lambda f: (f.cost, f.simd*f.pe, f.cycles))
+
+# Function: write_plan
+# This function writes a sweep plan for one layer and a number of foldings
+#
+# Parameters:
+#   plan_file - Sweep plan file name
+#   ifm_ch - Input feature map channels
+#   ifm_dim - Input feature map dimensions
+#   ofm_ch - Output feature map channels
+#   kdim - Kernel dimensions
+#   inp_wl - Input activation precision
+#   inp_sgn - Sign of the input activation
+#   wgt_wl - Weight precision
+#   wgt_sgn - Sign of the weights
+#   out_wl - Output precision
+#   folds - List of FoldEstimate records
+#
+# Returns:
+#
+#   None
+def write_plan(plan_file, ifm_ch, ifm_dim, ofm_ch, kdim, inp_wl, inp_sgn, wgt_wl, wgt_sgn, out_wl, folds):
+    plan = dict(zip(plan_keys, [[kdim], [ifm_ch], [ofm_ch], [ifm_dim], [inp_wl], [inp_sgn],
+                                [wgt_wl], [wgt_sgn], [out_wl],
+                                [f.simd for f in folds], [f.pe for f in folds]]))
+    plan['folds'] = [f._asdict() for f in folds]
+    try:
+        with open(plan_file, "w") as f:
+            json.dump(plan, f, indent=1)
+    except:
+        print("Cannot write the sweep plan")
+        raise
+
+# Function: read_plan
+# This function reads a sweep plan
+#
+# Parameters:
+#   plan_file - Sweep plan file name
+#
+# Returns:
+#
+#   plan - Dictionary of numpy arrays with the keys in plan_keys
+def read_plan(plan_file):
+    try:
+        with open(plan_file) as f:
+            plan = json.load(f)
+        return {k: np.array(plan[k]) for k in plan_keys}
+    except:
+        print("Cannot read the sweep plan")
+        raise
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for selecting the SIMD/PE folding of a layer for a cycle budget')
+    parser.add_argument('-b','--budget',required=True,type=int,
+                        help="Maximum cycles per frame")
+    parser.add_argument('-k','--kdim',default=2,type=int,
+                        help="Filter dimension")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+                        help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+                        help="Output feature map channels")
+    parser.add_argument('--ifm_dim', default=4, type=int,
+                        help="Input feature map dimensions")
+    parser.add_argument('-i','--inp_wl',default=8,type=int,
+                        help="Input word length")
+    parser.add_argument('--inp_sgn',default=0,type=int,
+                        help="Input activation signed (1) or unsigned (0)")
+    parser.add_argument('-w','--wgt_wl',default=1,type=int,
+                        help="Weight word length")
+    parser.add_argument('--wgt_sgn',default=0,type=int,
+                        help="Weights signed (1) or unsigned (0)")
+    parser.add_argument('--out_wl', default=16, type=int,
+                        help="Output word length")
+    parser.add_argument('--stride', default=1,type=int,
+                        help="Convolution stride")
+    parser.add_argument('--stream', action='store_true',
+                        help="Optimize the MVAU stream unit, where weights are not stored")
+    parser.add_argument('-t','--top', default=1,type=int,
+                        help="Number of foldings written to the sweep plan")
+    parser.add_argument('-o','--out_file',default="mvau_plan.json",
+                        help="Sweep plan file")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# selects the folding and writes the sweep plan
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    folds = optimize_folding(args.ifm_ch, args.ifm_dim, args.ofm_ch, args.kdim, args.inp_wl, args.wgt_wl,
+                             args.out_wl, args.budget, args.stride, args.stream)
+    if(len(folds) == 0):
+        print(f'No legal folding meets the budget of {args.budget} cycles per frame')
+        sys.exit(1)
+    print("SIMD\tPE\tSF\tNF\tCycles\tLUTs\tBRAM18\tDSPs\tCost")
+    for f in folds[:args.top]:
+        print(f'{f.simd}\t{f.pe}\t{f.sf}\t{f.nf}\t{f.cycles}\t{f.luts}\t{f.bram18}\t{f.dsps}\t{f.cost:.4f}')
+    write_plan(args.out_file, args.ifm_ch, args.ifm_dim, args.ofm_ch, args.kdim, args.inp_wl, args.inp_sgn,
+               args.wgt_wl, args.wgt_sgn, args.out_wl, folds[:args.top])
+    print(f'Sweep plan written to {args.out_file}')
+    sys.exit(0)
@@ -0,0 +1,130 @@
+#
+# Python Script: Regression Test Journal (mvau_journal.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script implements an append-only journal of the configuration
+# sets completed by a regression test. Each completed configuration set is
+# written as one JSON line holding the configuration, the performance measures
+# and hashes of the reports they were extracted from. The line is flushed to
+# disk before the next configuration set is started, so when a regression test
+# is interrupted, it can be restarted and will skip all configuration sets found
+# in the journal.
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import hashlib
+import json
+import os
+import time
+
+# Function: config_key
+# This function returns the key identifying a configuration set in the journal.
+# The configuration set number is not part of the key, so that a configuration
+# is found even if the configuration sets of a regression test are changed
+#
+# Parameters:
+#   config - List of configuration parameters
+#   inp_sgn - Sign of the input activation
+#   wgt_sgn - Sign of the weights
+#   op_sgn - Enumerated value showing signedness/unsignedness of input activation/weights
+#   clk_per - Clock constraint for synthesis
+#   flow - Test script run for the configuration set, not part of the key if None
+#
+# Returns:
+#
+#   key - Key of the configuration set
+def config_key(config, inp_sgn, wgt_sgn, op_sgn, clk_per, flow=None):
+    key = [[int(c) for c in config], int(inp_sgn), int(wgt_sgn), int(op_sgn),
+           [float(c) for c in clk_per]]
+    if(flow is not None):
+        key.append(flow)
+    return json.dumps(key)
+
+# Function: hash_files
+# This function computes the SHA-256 hash of a number of files
+#
+# Parameters:
+#   files - A list of files, files which do not exist are skipped
+#
+# Returns:
+#
+#   hashes - Dictionary of hashes with file names as keys
+def hash_files(files):
+    hashes = dict()
+    for f in files:
+        if(os.path.isfile(f)):
+            with open(f, "rb") as fh:
+                hashes[os.path.basename(f)] = hashlib.sha256(fh.read()).hexdigest()
+    return hashes
+
+# Class: SweepJournal
+# Reads the completed configuration sets from a journal file and
+# appends new configuration sets to it
+#
+# Attributes:
+#    journal_file - Journal file name
+#    records - Dictionary of completed configuration sets with the configuration key as keys
+class SweepJournal:
+    # Constructor: __init__
+    # The constructor reads all completed configuration sets from the journal file.
+    # An incomplete last line, left by a run which was killed while writing it, is ignored
+    #
+    # Parameters:
+    #   journal_file - Journal file name
+    #   restart - If True, the journal file is emptied and all configuration sets are run again
+    def __init__(self, journal_file, restart=False):
+        self.journal_file = journal_file
+        self.records = dict()
+        if(restart or not os.path.isfile(journal_file)):
+            open(journal_file, "w").close()
+            return
+        with open(journal_file) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    print(f'Ignoring incomplete journal entry in {journal_file}')
+                    continue
+                self.records[rec['key']] = rec
+
+    # Method: lookup
+    # This method returns the record of a completed configuration set
+    #
+    # Parameters:
+    #   key - Key of the configuration set
+    #
+    # Returns:
+    #
+    #   rec - The record, None if the configuration set has not been completed
+    def lookup(self, key):
+        return self.records.get(key)
+
+    # Method: append
+    # This method appends a completed configuration set to the journal and
+    # flushes it to disk
+    #
+    # Parameters:
+    #   key - Key of the configuration set
+    #   config_set - Configuration set number
+    #   rpt_dict_key - Key of the configuration set in the report dictionary
+    #   rpt_lst - List of performance measures
+    #   hashes - Dictionary of hashes of the reports
+    def append(self, key, config_set, rpt_dict_key, rpt_lst, hashes):
+        rec = {'key': key, 'config_set': int(config_set), 'rpt_key': rpt_dict_key,
+               'rpt': rpt_lst, 'hashes': hashes, 'time': time.time()}
+        line = json.dumps(rec, default=lambda o: o.item())
+        ### Making sure that an incomplete line left by a killed run ends first
+        if(os.path.getsize(self.journal_file) > 0):
+            with open(self.journal_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if(f.read(1) != b"\n"):
+                    line = "\n" + line
+        with open(self.journal_file, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[key] = json.loads(line)
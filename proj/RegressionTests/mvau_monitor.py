@@ -0,0 +1,303 @@
+#
+# Python Script: Regression Test Resource Monitor (mvau_monitor.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script runs a command of a regression test stage (for e.g. vivado,
+# xelab or xsim) as a child process and monitors the whole process tree started
+# by it. At a fixed interval, the CPU utilization, the resident set size (RSS)
+# and the bytes read from and written to the disk of all processes of the tree
+# are read from /proc and their peaks are kept. A stage can be given a wall-clock
+# limit and a memory limit, in which case its process tree is terminated (SIGTERM,
+# followed by SIGKILL after a grace period) as soon as a limit is exceeded, so a
+# hanging or runaway tool run cannot stall a sweep.
+#
+# The limits of the stages are given by the 'limits' field of the sweep
+# specification (see mvau_sweep.py), which is passed on to the test scripts
+# through the MVAU_LIMITS environment variable, for e.g.
+#   {"synth": {"time": 14400, "mem": 16}, "rtl/sim": {"time": 3600}}
+# with the time in seconds and the memory in GB. A stage is looked up by its full
+# name (see mvau_events.py) and then by its last part. The sampling interval
+# (seconds) is given by MVAU_MONITOR_INTERVAL. Between two samples, the exit of
+# the command is waited for on a pidfd, so a stage ends as soon as its command
+# exits rather than at the next sample.
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import json
+import os
+import select
+import signal
+import subprocess
+import time
+
+# Variable: default_interval
+# Interval (seconds) at which the process tree is sampled
+default_interval = 1.0
+
+# Variable: kill_grace
+# Time (seconds) given to a process tree to exit after SIGTERM before it is killed
+kill_grace = 10.0
+
+# Variable: clk_tck
+# Clock ticks per second of the CPU times in /proc
+clk_tck = os.sysconf('SC_CLK_TCK')
+
+# Variable: page_size
+# Size (bytes) of a memory page
+page_size = os.sysconf('SC_PAGE_SIZE')
+
+# Function: read_stat
+# This function reads the parent, CPU time and RSS of a process from /proc
+#
+# Parameters:
+#   pid - Process ID
+#
+# Returns:
+#
+#   ppid, ticks, rss - Parent process ID, CPU time (clock ticks) and RSS (bytes),
+#                      None if the process does not exist anymore
+def read_stat(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    ### The command name may contain spaces, the fields start after it
+    fields = stat[stat.rindex(')')+2:].split()
+    return int(fields[1]), int(fields[11])+int(fields[12]), int(fields[21])*page_size
+
+# Function: read_io
+# This function reads the bytes read from and written to the disk by a process
+#
+# Parameters:
+#   pid - Process ID
+#
+# Returns:
+#
+#   read_bytes, write_bytes - Bytes read and written, 0 if they cannot be read
+def read_io(pid):
+    io = dict()
+    try:
+        with open(f'/proc/{pid}/io') as f:
+            for line in f:
+                key, val = line.split(":")
+                io[key] = int(val)
+    except (OSError, ValueError):
+        pass
+    return io.get('read_bytes', 0), io.get('write_bytes', 0)
+
+# Function: proc_tree
+# This function returns the processes of the tree started by a process
+#
+# Parameters:
+#   root - Process ID of the root of the tree
+#
+# Returns:
+#
+#   tree - Dictionary of the process IDs of the tree to their CPU time and RSS
+def proc_tree(root):
+    stats = dict()
+    for d in os.listdir('/proc'):
+        if(d.isdigit()):
+            st = read_stat(int(d))
+            if(st is not None):
+                stats[int(d)] = st
+    tree = dict()
+    todo = [root]
+    while(len(todo) > 0):
+        pid = todo.pop()
+        if(pid in stats and pid not in tree):
+            tree[pid] = stats[pid][1:]
+            todo.extend(p for p, st in stats.items() if st[0] == pid)
+    return tree
+
+# Function: alive
+# This function checks whether a process is running, i.e., it exists and is not a zombie
+#
+# Parameters:
+#   pid - Process ID
+#
+# Returns:
+#
+#   True if the process is running
+def alive(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+    except OSError:
+        return False
+    return stat[stat.rindex(')')+2] != 'Z'
+
+# Function: kill_tree
+# This function terminates a process tree, killing the processes which have
+# not exited after the grace period. The root of the tree is not reaped, so
+# that its exit status and resource usage can still be read with wait4
+#
+# Parameters:
+#   root - Process ID of the root of the tree
+#   grace - Time (seconds) given to the processes to exit
+#
+# Returns:
+#
+#   None
+def kill_tree(root, grace=kill_grace):
+    ### Processes whose parent exits are moved out of the tree, so the
+    ### tree is read once and the same processes are killed
+    pids = list(proc_tree(root))
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except OSError:
+                pass
+        end = time.time() + grace
+        while(any(alive(pid) for pid in pids) and time.time() < end):
+            time.sleep(0.1)
+        pids = [pid for pid in pids if alive(pid)]
+        if(len(pids) == 0):
+            break
+
+# Function: stage_limits
+# This function returns the limits of a stage given by MVAU_LIMITS
+#
+# Parameters:
+#   stage - Full name of the stage, for e.g. rtl/synth
+#
+# Returns:
+#
+#   max_time, max_mem - Wall-clock limit (seconds) and memory limit (GB), None if not limited
+def stage_limits(stage):
+    try:
+        limits = json.loads(os.environ.get('MVAU_LIMITS') or "{}")
+    except ValueError:
+        print("Cannot read the stage limits (MVAU_LIMITS), stages are not limited")
+        return None, None
+    lim = limits.get(stage, limits.get(stage.split("/")[-1], {}))
+    return lim.get('time'), lim.get('mem')
+
+# Class: TreeMonitor
+# Samples a process tree and keeps the peaks of its resource usage
+#
+# Attributes:
+#    root - Process ID of the root of the tree
+#    ticks - Dictionary of the process IDs of the last sample to their CPU time (clock ticks)
+#    io - Dictionary of all process IDs sampled to their bytes read and written
+#    last - Time of the last sample
+#    cpu_pct - Peak CPU utilization of the tree (100 for one core)
+#    rss - Peak RSS of the tree (bytes)
+class TreeMonitor:
+    # Constructor: __init__
+    # The constructor starts monitoring a process tree
+    #
+    # Parameters:
+    #   root - Process ID of the root of the tree
+    def __init__(self, root):
+        self.root = root
+        self.ticks = dict()
+        self.io = dict()
+        self.last = time.time()
+        self.cpu_pct = 0.0
+        self.rss = 0
+
+    # Method: sample
+    # This method samples the process tree and updates the peaks
+    #
+    # Returns:
+    #
+    #   rss - RSS of the tree (bytes)
+    def sample(self):
+        now = time.time()
+        tree = proc_tree(self.root)
+        rss = sum(r for _, r in tree.values())
+        ### CPU time of the processes since the last sample, processes started since then counting from 0
+        cpu = sum(t - self.ticks.get(pid, 0) for pid, (t, _) in tree.items())
+        if(now > self.last):
+            self.cpu_pct = max(self.cpu_pct, 100.0*cpu/clk_tck/(now-self.last))
+        self.ticks = {pid: t for pid, (t, _) in tree.items()}
+        for pid in tree:
+            self.io[pid] = read_io(pid)
+        self.rss = max(self.rss, rss)
+        self.last = now
+        return rss
+
+    # Method: peaks
+    # This method returns the peaks of the resource usage
+    #
+    # Returns:
+    #
+    #   peaks - Dictionary with the peak CPU utilization ('cpu_pct'), peak RSS ('max_rss_mb')
+    #           and the MB read ('read_mb') and written ('write_mb') by the tree
+    def peaks(self):
+        return {'cpu_pct': round(self.cpu_pct, 1), 'max_rss_mb': round(self.rss/2**20, 1),
+                'read_mb': round(sum(r for r, _ in self.io.values())/2**20, 1),
+                'write_mb': round(sum(w for _, w in self.io.values())/2**20, 1)}
+
+# Function: run_monitored
+# This function runs a command, samples its process tree until it exits and
+# terminates it if it exceeds its limits
+#
+# Parameters:
+#   cmd - List of the command and its arguments
+#   cwd - Directory from where the command is run, None for the current directory
+#   env - Environment of the command, None to use the current environment
+#   max_time - Wall-clock limit (seconds), None if not limited
+#   max_mem - Memory limit (GB) of the whole tree, None if not limited
+#   interval - Sampling interval (seconds), None for MVAU_MONITOR_INTERVAL or default_interval
+#
+# Returns:
+#
+#   status - Exit status of the command, negative for the signal which ended it
+#   usage - Dictionary of the peaks (see TreeMonitor.peaks) along with the CPU time of
+#           the tree ('cpu_s') and the limit the command was terminated for ('killed',
+#           'time', 'mem' or None)
+def run_monitored(cmd, cwd=None, env=None, max_time=None, max_mem=None, interval=None):
+    if(interval is None):
+        interval = float(os.environ.get('MVAU_MONITOR_INTERVAL') or default_interval)
+    start = time.time()
+    proc = subprocess.Popen(cmd, cwd = cwd, env = env)
+    mon = TreeMonitor(proc.pid)
+    killed = None
+    ### Becomes readable when the command exits, not available on older kernels
+    try:
+        pidfd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    try:
+        while(True):
+            ### Reaping with wait4 to get the resource usage of the whole tree
+            pid, wstatus, ru = os.wait4(proc.pid, os.WNOHANG)
+            if(pid != 0):
+                break
+            rss = mon.sample()
+            if(max_time is not None and time.time()-start > max_time):
+                killed = 'time'
+            elif(max_mem is not None and rss > max_mem*2**30):
+                killed = 'mem'
+            if(killed is not None):
+                print(f'{cmd[0]} exceeded its ' + (f'time limit of {max_time} s' if killed == 'time'
+                      else f'memory limit of {max_mem} GB') + ', terminating it')
+                kill_tree(proc.pid)
+                _, wstatus, ru = os.wait4(proc.pid, 0)
+                break
+            if(pidfd is not None):
+                select.select([pidfd], [], [], interval)
+            else:
+                time.sleep(interval)
+    except BaseException:
+        ### Not leaving the tree running on Ctrl+C or an error
+        kill_tree(proc.pid, 1.0)
+        raise
+    finally:
+        if(pidfd is not None):
+            os.close(pidfd)
+    proc.returncode = os.waitstatus_to_exitcode(wstatus)
+    usage = mon.peaks()
+    ### A short peak between two samples is still seen by the largest process
+    usage['max_rss_mb'] = max(usage['max_rss_mb'], round(ru.ru_maxrss/1024, 1))
+    usage['cpu_s'] = round(ru.ru_utime+ru.ru_stime, 1)
+    usage['killed'] = killed
+    return proc.returncode, usage
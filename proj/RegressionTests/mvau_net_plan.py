@@ -0,0 +1,175 @@
+#
+# Python Script: MVAU Network Folding Planner (mvau_net_plan.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script selects the folding (SIMD and PE) of every layer of a
+# network of MVAU batch units, by default the 4-layer multi-layer perceptron
+# (MLP) of the sweeps mvau_batch0.json to mvau_batch3.json, for a total budget
+# of LUTs, DSPs and block RAMs. As the layers are connected in a pipeline, the
+# throughput of the network is set by the slowest layer, so the cycles of all
+# layers are balanced against a common target: for every target, in increasing
+# order of cycles per frame, each layer takes its cheapest folding (estimated
+# by mvau_fold_opt.py) meeting the target, and the first target for which the
+# network fits the budget is selected. Layers faster than needed are thus not
+# given more resources than the slowest one can use.
+#
+# The selected foldings are written as the generation configuration of each
+# layer (the fields of MvauConfig in gen_mvau_artifacts.py) along with a sweep
+# plan for each layer which is run by regtest_mvau.py along with the sweep
+# specification of the layer using its --plan argument.
+#
+# It can be called from the command line as follows:
+# python mvau_net_plan.py                                      - Plans the MLP for the resources of the device
+# python mvau_net_plan.py --luts <n> --dsps <n> --brams <n>    - Plans the MLP for a budget of resources
+# python mvau_net_plan.py --layers <json> ...                  - Plans the layers in a JSON file
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import json
+import sys
+from mvau_cycle_model import legal_folds
+from mvau_fold_opt import device, simd_mode, est_folding, write_plan
+
+# Variable: mlp_layers
+# Layers of the MLP run by the sweeps mvau_batch0.json to mvau_batch3.json
+mlp_layers = [
+    {'ifm_ch': 600, 'ifm_dim': 1, 'ofm_ch': 64, 'kdim': 1, 'inp_wl': 2, 'inp_sgn': 0, 'wgt_wl': 2, 'wgt_sgn': 1, 'out_wl': 11},
+    {'ifm_ch': 64, 'ifm_dim': 1, 'ofm_ch': 64, 'kdim': 1, 'inp_wl': 2, 'inp_sgn': 0, 'wgt_wl': 2, 'wgt_sgn': 1, 'out_wl': 11},
+    {'ifm_ch': 64, 'ifm_dim': 1, 'ofm_ch': 64, 'kdim': 1, 'inp_wl': 2, 'inp_sgn': 0, 'wgt_wl': 2, 'wgt_sgn': 1, 'out_wl': 11},
+    {'ifm_ch': 64, 'ifm_dim': 1, 'ofm_ch': 1, 'kdim': 1, 'inp_wl': 2, 'inp_sgn': 0, 'wgt_wl': 2, 'wgt_sgn': 1, 'out_wl': 11},
+]
+
+# Function: layer_folds
+# This function estimates all legal foldings of a layer, cheapest first
+#
+# Parameters:
+#   layer - Dictionary with the keys of mlp_layers
+#
+# Returns:
+#
+#   folds - List of FoldEstimate records
+def layer_folds(layer):
+    folds = [est_folding(layer['ifm_ch'], layer['ifm_dim'], layer['ofm_ch'], layer['kdim'],
+                         layer['inp_wl'], layer['wgt_wl'], layer['out_wl'], s, p)
+             for s, p in legal_folds(layer['ifm_ch'], layer['ofm_ch'], layer['kdim'])]
+    return sorted(folds, key=lambda f: (f.cost, f.simd*f.pe, f.cycles))
+
+# Function: gen_config
+# This function returns the generation configuration of a layer, with the
+# binary flags and operator signs set in the same way as by the regression test scripts
+#
+# Parameters:
+#   layer - Dictionary with the keys of mlp_layers
+#   fold - FoldEstimate record
+#
+# Returns:
+#
+#   cfg - Dictionary with the fields of MvauConfig
+def gen_config(layer, fold):
+    mode = simd_mode(layer['inp_wl'], layer['wgt_wl'])
+    return {'ifm_ch': layer['ifm_ch'], 'ifm_dim': layer['ifm_dim'], 'ofm_ch': layer['ofm_ch'],
+            'kdim': layer['kdim'], 'inp_wl': layer['inp_wl'], 'inp_bin': int(mode == 'xnor'),
+            'wgt_wl': layer['wgt_wl'], 'wgt_bin': int(mode != 'std'),
+            'op_sgn': layer['inp_sgn'] + 2*layer['wgt_sgn'], 'out_wl': layer['out_wl'],
+            'simd': fold.simd, 'pe': fold.pe, 'mmv': 1, 'stride': 1}
+
+# Function: plan_network
+# This function selects the folding of all layers with the fewest cycles per
+# frame of the slowest layer which fits the budget
+#
+# Parameters:
+#   layers - List of dictionaries with the keys of mlp_layers
+#   budget - Dictionary with the LUTs ('lut'), DSPs ('dsp') and 18 Kb block RAMs ('bram18')
+#
+# Returns:
+#
+#   folds - List of FoldEstimate records, one for each layer, None if the budget is not met
+def plan_network(layers, budget):
+    all_folds = [layer_folds(l) for l in layers]
+    targets = sorted(set(f.cycles for folds in all_folds for f in folds))
+    for t in targets:
+        ### Cheapest folding of each layer meeting the target
+        sel = [next((f for f in folds if f.cycles <= t), None) for folds in all_folds]
+        if(None in sel):
+            continue
+        if(sum(f.luts for f in sel) <= budget['lut'] and sum(f.dsps for f in sel) <= budget['dsp']
+           and sum(f.bram18 for f in sel) <= budget['bram18']):
+            return sel
+    return None
+
+# Function: write_net_plan
+# This function writes the generation configurations and the estimates of all layers
+#
+# Parameters:
+#   plan_file - Network plan file name
+#   layers - List of dictionaries with the keys of mlp_layers
+#   folds - List of FoldEstimate records, one for each layer
+#
+# Returns:
+#
+#   None
+def write_net_plan(plan_file, layers, folds):
+    plan = {'cycles': max(f.cycles for f in folds),
+            'luts': sum(f.luts for f in folds), 'dsps': sum(f.dsps for f in folds),
+            'bram18': sum(f.bram18 for f in folds),
+            'layers': [{'config': gen_config(l, f), 'fold': f._asdict()} for l, f in zip(layers, folds)]}
+    try:
+        with open(plan_file, "w") as f:
+            json.dump(plan, f, indent=1)
+    except:
+        print("Cannot write the network plan")
+        raise
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for selecting the SIMD/PE folding of all layers of a network')
+    parser.add_argument('--layers',default=None,
+                        help="JSON file with a list of layers, the MLP of the batch regression tests by default")
+    parser.add_argument('--luts',default=device['lut'],type=int,
+                        help="LUT budget of the network")
+    parser.add_argument('--dsps',default=device['dsp'],type=int,
+                        help="DSP budget of the network")
+    parser.add_argument('--brams',default=device['bram18'],type=int,
+                        help="18 Kb block RAM budget of the network")
+    parser.add_argument('-o','--out_file',default="mvau_net_plan.json",
+                        help="Network plan file")
+    parser.add_argument('--plan_prefix',default="mvau_plan_batch",
+                        help="Prefix of the sweep plan of each layer, followed by the layer number")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# selects the foldings and writes the network and sweep plans
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    layers = mlp_layers
+    if(args.layers is not None):
+        try:
+            with open(args.layers) as f:
+                layers = json.load(f)
+        except:
+            print("Cannot read the layers file")
+            raise
+    folds = plan_network(layers, {'lut': args.luts, 'dsp': args.dsps, 'bram18': args.brams})
+    if(folds is None):
+        print(f'No folding of the network meets the budget of {args.luts} LUTs, {args.dsps} DSPs and {args.brams} BRAM18')
+        sys.exit(1)
+    print("Layer\tSIMD\tPE\tSF\tNF\tCycles\tLUTs\tBRAM18\tDSPs")
+    for i, (l, f) in enumerate(zip(layers, folds)):
+        print(f'{i}\t{f.simd}\t{f.pe}\t{f.sf}\t{f.nf}\t{f.cycles}\t{f.luts}\t{f.bram18}\t{f.dsps}')
+        write_plan(f'{args.plan_prefix}{i}.json', l['ifm_ch'], l['ifm_dim'], l['ofm_ch'], l['kdim'],
+                   l['inp_wl'], l['inp_sgn'], l['wgt_wl'], l['wgt_sgn'], l['out_wl'], [f])
+    print(f'Cycles per frame: {max(f.cycles for f in folds)}')
+    write_net_plan(args.out_file, layers, folds)
+    print(f'Network plan written to {args.out_file}')
+    sys.exit(0)
@@ -0,0 +1,241 @@
+#
+# Python Script: HLS and RTL Report Parsers (mvau_reports.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script parses the reports written by Vivado and Vivado HLS which
+# are used by the regression tests. Each report is read once and all of its
+# tables are returned as records with numbers converted to int or float, i.e.,
+# - Vivado utilization report (post_opt_util.rpt): All rows of all resource tables
+# - Vivado timing summary report (post_opt_timing_summary.rpt): Design timing summary and worst slack of each clock
+# - Vivado timing report (post_opt_timing.rpt): Start point, end point and slack of each path
+# - Vivado HLS export report (Testbench_<run>_export.rpt): Resources and clock periods
+# - Vivado HLS cosimulation report (Testbench_<run>_cosim.rpt): Status, latency and interval of each RTL
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import re
+from collections import namedtuple
+
+# Variable: UtilRow
+# One row of a table of the utilization report. The name is the first column
+# (Site Type or Ref Name) and the remaining columns are None if not present
+UtilRow = namedtuple('UtilRow', ['section', 'name', 'used', 'fixed', 'available', 'util'])
+
+# Variable: TimingSummary
+# Design timing summary of the timing summary report in ns along with the worst
+# setup and hold slack of every 'Setup :' and 'Hold :' line, in the order they appear
+TimingSummary = namedtuple('TimingSummary', ['wns', 'tns', 'tns_failing', 'tns_total',
+                                             'whs', 'ths', 'ths_failing', 'ths_total',
+                                             'wpws', 'tpws', 'tpws_failing', 'tpws_total',
+                                             'setup_slack', 'hold_slack'])
+
+# Variable: TimingPath
+# One path of a timing report written with '-path_type summary'
+TimingPath = namedtuple('TimingPath', ['startpoint', 'endpoint', 'slack'])
+
+# Variable: HlsExport
+# Contents of the HLS export report. Resources are stored for each section
+# (for e.g., 'Post-Implementation Resource usage') while rows hold all
+# 'name: value' lines in the order they appear
+HlsExport = namedtuple('HlsExport', ['resources', 'cp_required', 'cp_post_synth',
+                                     'cp_post_impl', 'timing_met', 'rows'])
+
+# Variable: CosimRow
+# One row of the HLS cosimulation report. The values are the columns after
+# the status, i.e., minimum, average and maximum latency and interval followed
+# by the total execution time if reported
+CosimRow = namedtuple('CosimRow', ['rtl', 'status', 'values'])
+
+# Function: to_num
+# This function converts a report field to an int or float if possible
+#
+# Parameters:
+#   s - Report field
+#
+# Returns:
+#
+#   val - int, float or the stripped string
+def to_num(s):
+    s = s.strip()
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        return float(s)
+    except ValueError:
+        return s
+
+# Function: table_cells
+# This function splits a table row of a Vivado report into its cells
+#
+# Parameters:
+#   line - Table row
+#
+# Returns:
+#
+#   cells - List of cells, None if the line is not a table row
+def table_cells(line):
+    line = line.strip()
+    if(not line.startswith("|") or not line.endswith("|")):
+        return None
+    return [c.strip() for c in line[1:-1].split("|")]
+
+# Function: parse_util_rpt
+# This function parses a Vivado utilization report
+#
+# Parameters:
+#   log_file - Utilization report
+#
+# Returns:
+#
+#   rows - List of UtilRow records of all tables
+def parse_util_rpt(log_file):
+    rows = []
+    section = ""
+    header = None
+    with open(log_file) as f:
+        for line in f:
+            m = re.match(r'^(\d+(\.\d+)*)\.?\s+(\S.*)$', line)
+            if m:
+                section = m.group(3).strip()
+                header = None
+                continue
+            if(line.startswith("+")):
+                continue
+            cells = table_cells(line)
+            if(cells is None):
+                header = None
+                continue
+            if(header is None):
+                header = cells
+                continue
+            vals = [to_num(c) for c in cells[1:]] + [None]*4
+            col = dict(zip(header[1:], vals))
+            rows.append(UtilRow(section, cells[0], vals[0],
+                                col.get('Fixed'), col.get('Available'), col.get('Util%')))
+    return rows
+
+# Function: parse_timing_summary
+# This function parses a Vivado timing summary report
+#
+# Parameters:
+#   log_file - Timing summary report
+#
+# Returns:
+#
+#   summary - TimingSummary record, fields of the design timing summary are None if not found
+def parse_timing_summary(log_file):
+    design = [None]*12
+    setup_slack = []
+    hold_slack = []
+    in_design = 0
+    with open(log_file) as f:
+        for line in f:
+            s = line.strip()
+            if(s.startswith("WNS(ns)")):
+                in_design = 1
+                continue
+            if(in_design == 1):
+                ### Skipping the line of dashes below the header
+                in_design = 2
+                continue
+            if(in_design == 2):
+                if(s != ""):
+                    design = [to_num(v) for v in s.split()][:12]
+                    design += [None]*(12-len(design))
+                in_design = 0
+                continue
+            m = re.match(r'^(Setup|Hold)\s*:.*Worst (Slack|Hold Slack)\s+(-?[\d.]+)ns', s)
+            if m:
+                if(m.group(1) == "Setup"):
+                    setup_slack.append(float(m.group(3)))
+                else:
+                    hold_slack.append(float(m.group(3)))
+    return TimingSummary(*design, setup_slack, hold_slack)
+
+# Function: parse_timing_paths
+# This function parses a Vivado timing report written with '-path_type summary'
+#
+# Parameters:
+#   log_file - Timing report
+#
+# Returns:
+#
+#   paths - List of TimingPath records
+def parse_timing_paths(log_file):
+    paths = []
+    in_table = False
+    with open(log_file) as f:
+        for line in f:
+            s = line.split()
+            if(len(s) >= 3 and s[0] == "Startpoint" and s[-1].startswith("Slack")):
+                in_table = True
+                continue
+            if(not in_table or len(s) == 0 or s[0].startswith("-")):
+                continue
+            if(len(s) == 3):
+                paths.append(TimingPath(s[0], s[1], to_num(s[2])))
+    return paths
+
+# Function: parse_hls_export
+# This function parses an HLS export report
+#
+# Parameters:
+#   log_file - HLS export report
+#
+# Returns:
+#
+#   export - HlsExport record, clock periods are None if not found
+def parse_hls_export(log_file):
+    resources = dict()
+    rows = []
+    section = ""
+    cp = dict()
+    timing_met = None
+    with open(log_file) as f:
+        for line in f:
+            s = line.strip()
+            m = re.match(r'^#=+\s*(.*?)\s*=+$', s)
+            if m:
+                section = m.group(1)
+                continue
+            if(s == "Timing met"):
+                timing_met = True
+            elif(s.startswith("Timing not met")):
+                timing_met = False
+            if(":" not in s):
+                continue
+            name, val = [v.strip() for v in s.split(":", 1)]
+            val = to_num(val)
+            rows.append((section, name, val))
+            if(name.startswith("CP ")):
+                cp[name] = val
+            elif("Resource" in section):
+                resources.setdefault(section, dict())[name] = val
+    return HlsExport(resources, cp.get("CP required"), cp.get("CP achieved post-synthesis"),
+                     cp.get("CP achieved post-implementation"), timing_met, rows)
+
+# Function: parse_cosim_rpt
+# This function parses an HLS cosimulation report
+#
+# Parameters:
+#   log_file - HLS cosimulation report
+#
+# Returns:
+#
+#   rows - List of CosimRow records, one for each RTL
+def parse_cosim_rpt(log_file):
+    rows = []
+    with open(log_file) as f:
+        for line in f:
+            cells = table_cells(line)
+            if(cells is None or len(cells) < 3):
+                continue
+            if(cells[0] in ("VHDL", "Verilog", "SystemC")):
+                rows.append(CosimRow(cells[0], cells[1], tuple(to_num(c) for c in cells[2:])))
+    return rows
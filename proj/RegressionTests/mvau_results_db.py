@@ -0,0 +1,335 @@
+#
+# Python Script: Regression Test Results Database (mvau_results_db.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script stores the performance measures of regression tests in a
+# local SQLite database. Each configuration set is inserted and committed as soon
+# as it completes, so the results of long regression tests are never lost and the
+# results of many regression tests (sweeps) can be queried together. The Excel
+# output of the regression test scripts can be exported from the database at any
+# time. The stages of each configuration set and the resources they used (see
+# mvau_events.py and mvau_monitor.py) are stored along with its results, and the
+# throughput measured under back-pressure by mvau_traffic.py in a table of its own.
+#
+# It can be called from the command line as follows:
+# python mvau_results_db.py list                               - Lists all sweeps in the database
+# python mvau_results_db.py export -s <sweep> -o <Excel File>  - Exports a sweep (latest by default) to an Excel file
+# python mvau_results_db.py stages -s <sweep>                  - Lists the stages of a sweep (latest by default)
+# python mvau_results_db.py throughput -s <sweep>              - Lists the throughput of a sweep (latest traffic sweep by default)
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+import pandas as pd
+
+# Function: sv_col_names
+# This function returns the column names of the differences between HLS and RTL
+# performance measures, which are written as '%' columns to the Excel file
+#
+# Parameters:
+#   rpt_col_names - Column names of HLS and RTL performance measures
+#
+# Returns:
+#
+#   sv_names - Column names of the differences
+def sv_col_names(rpt_col_names):
+    return [c.replace("HLS ", "", 1)+" %" for c in rpt_col_names[:len(rpt_col_names)//2]]
+
+# Variable: stage_cols
+# Columns of the stages table taken from the records of the event log
+stage_cols = ['stage', 'start', 'dur', 'status', 'ok', 'killed', 'cpu_pct', 'cpu_s',
+              'max_rss_mb', 'read_mb', 'write_mb']
+
+# Variable: throughput_cols
+# Columns of the throughput table taken from the traffic points of mvau_traffic.py
+throughput_cols = ['unit', 'ifm_ch', 'ifm_dim', 'ofm_ch', 'kdim', 'simd', 'pe', 'mmv', 'profile', 'in_load',
+                   'out_load', 'in_offered', 'out_offered', 'seed', 'cycles', 'outputs', 'out_per_cycle', 'sustained', 'ideal', 'efficiency',
+                   'in_stall', 'out_stall', 'ok']
+
+# Class: ResultsDB
+# Creates the database tables and inserts the results of configuration sets.
+# The database holds four tables, 'sweeps' with one row for each regression test
+# and its column names, 'results' with one row for each configuration set,
+# 'stages' with one row for each stage of a configuration set and 'throughput'
+# with one row for each traffic point simulated by mvau_traffic.py
+#
+# Attributes:
+#    conn - Connection to the SQLite database
+class ResultsDB:
+    # Constructor: __init__
+    # The constructor opens the database and creates the tables if needed
+    #
+    # Parameters:
+    #   db_file - Database file name
+    def __init__(self, db_file):
+        try:
+            self.conn = sqlite3.connect(db_file, timeout=60)
+            self.conn.execute('CREATE TABLE IF NOT EXISTS sweeps (sweep TEXT PRIMARY KEY, script TEXT, '
+                              'config_cols TEXT, rpt_cols TEXT, started REAL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS results (sweep TEXT, config_set INTEGER, '
+                              'rpt_key TEXT, time REAL, PRIMARY KEY (sweep, config_set))')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS stages (sweep TEXT, config_set INTEGER, stage TEXT, '
+                              'start REAL, dur REAL, status INTEGER, ok INTEGER, killed TEXT, cpu_pct REAL, '
+                              'cpu_s REAL, max_rss_mb REAL, read_mb REAL, write_mb REAL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS throughput (sweep TEXT, config_set INTEGER, time REAL, '
+                              'unit TEXT, ifm_ch INTEGER, ifm_dim INTEGER, ofm_ch INTEGER, kdim INTEGER, '
+                              'simd INTEGER, pe INTEGER, mmv INTEGER, profile TEXT, in_load REAL, out_load REAL, '
+                              'in_offered REAL, out_offered REAL, seed INTEGER, cycles INTEGER, outputs INTEGER, out_per_cycle REAL, sustained REAL, '
+                              'ideal REAL, efficiency REAL, in_stall REAL, out_stall REAL, ok INTEGER)')
+            ### Offered loads missing from the throughput tables of older databases
+            cols = [r[1] for r in self.conn.execute('PRAGMA table_info(throughput)')]
+            for c in ['in_offered', 'out_offered']:
+                if(c not in cols):
+                    self.conn.execute('ALTER TABLE throughput ADD COLUMN %s REAL' % c)
+            self.conn.commit()
+        except:
+            print("Cannot open the results database")
+            raise
+
+    # Method: add_columns
+    # This method adds columns to the results table which are not present yet
+    #
+    # Parameters:
+    #   col_names - Column names
+    def add_columns(self, col_names):
+        cols = [r[1] for r in self.conn.execute('PRAGMA table_info(results)')]
+        for c in col_names:
+            if(c not in cols):
+                self.conn.execute('ALTER TABLE results ADD COLUMN "%s"' % c)
+                cols.append(c)
+
+    # Method: add_sweep
+    # This method registers a regression test along with the column names
+    # of its configurations and performance measures
+    #
+    # Parameters:
+    #   sweep - Name of the regression test
+    #   script - Name of the regression test script
+    #   config_col_names - Column names of the configuration parameters
+    #   rpt_col_names - Column names of HLS and RTL performance measures
+    def add_sweep(self, sweep, script, config_col_names, rpt_col_names):
+        self.add_columns(config_col_names + rpt_col_names + sv_col_names(rpt_col_names))
+        self.conn.execute('INSERT OR IGNORE INTO sweeps VALUES (?, ?, ?, ?, ?)',
+                          (sweep, script, json.dumps(config_col_names), json.dumps(rpt_col_names), time.time()))
+        self.conn.commit()
+
+    # Method: add_result
+    # This method inserts the results of one configuration set and commits them.
+    # Results of a configuration set already present in the sweep are replaced
+    #
+    # Parameters:
+    #   sweep - Name of the regression test
+    #   config_set - Configuration set number
+    #   rpt_dict_key - Key of the configuration set in the report dictionary
+    #   config - List of configuration parameters
+    #   rpt_lst - List of HLS and RTL performance measures followed by the differences
+    def add_result(self, sweep, config_set, rpt_dict_key, config, rpt_lst):
+        config_cols, rpt_cols = [json.loads(c) for c in self.conn.execute(
+            'SELECT config_cols, rpt_cols FROM sweeps WHERE sweep=?', (sweep,)).fetchone()]
+        cols = ['sweep', 'config_set', 'rpt_key', 'time'] + config_cols + rpt_cols + sv_col_names(rpt_cols)
+        vals = [sweep, int(config_set), rpt_dict_key, time.time()] + list(config) + list(rpt_lst)
+        ### NumPy scalars are stored as python numbers
+        vals = [v.item() if hasattr(v, 'item') else v for v in vals]
+        self.conn.execute('INSERT OR REPLACE INTO results (%s) VALUES (%s)'
+                          % (",".join('"%s"' % c for c in cols), ",".join("?"*len(cols))), vals)
+        self.conn.commit()
+
+    # Method: add_stages
+    # This method inserts the stages of one configuration set, failed or not, and
+    # commits them. Stages of a configuration set already present in the sweep are replaced
+    #
+    # Parameters:
+    #   sweep - Name of the regression test
+    #   config_set - Configuration set number
+    #   recs - List of records of the event log (see mvau_events.py)
+    def add_stages(self, sweep, config_set, recs):
+        self.conn.execute('DELETE FROM stages WHERE sweep=? AND config_set=?', (sweep, int(config_set)))
+        for rec in recs:
+            vals = [rec.get(c) for c in stage_cols]
+            ### Missing fields are stored as NULL and NumPy scalars as python numbers
+            vals = [None if pd.isna(v) else v.item() if hasattr(v, 'item') else v for v in vals]
+            self.conn.execute('INSERT INTO stages VALUES (%s)' % ",".join("?"*(len(stage_cols)+2)),
+                              [sweep, int(config_set)] + vals)
+        self.conn.commit()
+
+    # Method: query_stages
+    # This method returns the stages of a sweep
+    #
+    # Parameters:
+    #   sweep - Name of the regression test
+    #
+    # Returns:
+    #
+    #   df - Pandas data frame of the stages
+    def query_stages(self, sweep):
+        return pd.read_sql_query('SELECT * FROM stages WHERE sweep=? ORDER BY config_set, start',
+                                 self.conn, params=(sweep,))
+
+    # Method: add_throughput
+    # This method inserts the traffic points of one run of mvau_traffic.py and
+    # commits them. Traffic points of the same sweep, configuration set, unit,
+    # profile and loads are replaced
+    #
+    # Parameters:
+    #   sweep - Name of the sweep
+    #   config_set - Configuration set number, None if not part of a regression test
+    #   recs - List of dictionaries with the throughput_cols of each traffic point,
+    #          missing ones stored as NULL
+    def add_throughput(self, sweep, config_set, recs):
+        for rec in recs:
+            self.conn.execute('DELETE FROM throughput WHERE sweep=? AND config_set IS ? AND unit=? AND profile=? '
+                              'AND in_load=? AND out_load=?', (sweep, config_set, rec['unit'], rec['profile'],
+                                                               rec['in_load'], rec['out_load']))
+            vals = [rec.get(c) for c in throughput_cols]
+            ### Missing and undefined measures are stored as NULL and NumPy scalars as python numbers
+            vals = [None if v is None or pd.isna(v) else v.item() if hasattr(v, 'item') else v for v in vals]
+            self.conn.execute('INSERT INTO throughput (sweep, config_set, time, %s) VALUES (%s)'
+                              % (", ".join(throughput_cols), ",".join("?"*(len(throughput_cols)+3))),
+                              [sweep, config_set, time.time()] + vals)
+        self.conn.commit()
+
+    # Method: query_throughput
+    # This method returns the traffic points of a sweep
+    #
+    # Parameters:
+    #   sweep - Name of the sweep, None for the latest sweep with traffic points
+    #
+    # Returns:
+    #
+    #   df - Pandas data frame of the traffic points
+    def query_throughput(self, sweep=None):
+        if(sweep is None):
+            row = self.conn.execute('SELECT sweep FROM throughput ORDER BY time DESC LIMIT 1').fetchone()
+            sweep = row[0] if row is not None else None
+        return pd.read_sql_query('SELECT * FROM throughput WHERE sweep=? ORDER BY config_set, unit, profile, '
+                                 'in_load DESC, out_load DESC', self.conn, params=(sweep,))
+
+    # Method: latest
+    # This method returns the name of the latest sweep
+    #
+    # Returns:
+    #
+    #   sweep - Name of the regression test, None if no sweep is recorded
+    def latest(self):
+        row = self.conn.execute('SELECT sweep FROM sweeps ORDER BY started DESC LIMIT 1').fetchone()
+        return row[0] if row is not None else None
+
+    # Method: query
+    # This method returns the results of one or all sweeps
+    #
+    # Parameters:
+    #   sweep - Name of the regression test, None for all sweeps
+    #
+    # Returns:
+    #
+    #   df - Pandas data frame of the results
+    def query(self, sweep=None):
+        if(sweep is None):
+            return pd.read_sql_query('SELECT * FROM results ORDER BY sweep, config_set', self.conn)
+        return pd.read_sql_query('SELECT * FROM results WHERE sweep=? ORDER BY config_set',
+                                 self.conn, params=(sweep,))
+
+    # Method: sweeps
+    # This method returns all sweeps in the database
+    #
+    # Returns:
+    #
+    #   df - Pandas data frame with the name, script, start time and number of results of each sweep
+    def sweeps(self):
+        return pd.read_sql_query('SELECT s.sweep, s.script, datetime(s.started, "unixepoch", "localtime") AS started, '
+                                 'COUNT(r.config_set) AS results FROM sweeps s LEFT JOIN results r '
+                                 'ON s.sweep = r.sweep GROUP BY s.sweep ORDER BY s.started', self.conn)
+
+    # Method: close
+    # This method closes the database
+    def close(self):
+        self.conn.close()
+
+# Function: export_excel
+# This function exports the results of a sweep to an Excel file in the same
+# format as written by the regression test scripts
+#
+# Parameters:
+#   db_file - Database file name
+#   out_file - Output excel file name
+#   sweep - Name of the regression test, None for the latest one
+#
+# Returns:
+#
+#   True if the sweep was exported or no sweep is recorded, False if the sweep given is not recorded
+def export_excel(db_file, out_file, sweep=None):
+    from regtest_mvau import write_rpt_file
+    db = ResultsDB(db_file)
+    if(sweep is None):
+        sweep = db.latest()
+    row = db.conn.execute('SELECT config_cols, rpt_cols FROM sweeps WHERE sweep=?', (sweep,)).fetchone()
+    if(row is None):
+        db.close()
+        print("No sweeps recorded" if sweep is None else f'Sweep {sweep} not recorded')
+        return sweep is None
+    config_cols, rpt_cols = [json.loads(c) for c in row]
+    df = db.query(sweep)
+    db.close()
+    rpt_dict = dict()
+    config_dict = dict()
+    for _, row in df.iterrows():
+        rpt_dict[row['rpt_key']] = list(row[rpt_cols + sv_col_names(rpt_cols)])
+        config_dict[str(row['config_set'])] = list(row[config_cols])
+    print(f'Exporting {len(rpt_dict)} results of sweep {sweep}')
+    write_rpt_file(rpt_dict, list(rpt_cols), config_dict, config_cols, out_file)
+    return True
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for querying and exporting regression test results')
+    parser.add_argument('cmd', choices=['list', 'export', 'stages', 'throughput'],
+                        help="List all sweeps, export a sweep to an Excel file or list the stages or throughput of a sweep")
+    parser.add_argument('-d','--db',default="mvau_results.db",
+                        help="Results database file")
+    parser.add_argument('-s','--sweep',default=None,
+                        help="Sweep to be exported or listed, the latest one by default")
+    parser.add_argument('-o','--out_file',default="mvau_report.xlsx",
+                        help="Output file")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# lists or exports the results
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.cmd == 'list'):
+        db = ResultsDB(args.db)
+        print(db.sweeps().to_string(index=False))
+        db.close()
+    elif(args.cmd == 'stages'):
+        db = ResultsDB(args.db)
+        sweep = args.sweep if args.sweep is not None else db.latest()
+        if(sweep is None):
+            db.close()
+            print("No sweeps recorded")
+            sys.exit(0)
+        df = db.query_stages(sweep)
+        db.close()
+        print(df.drop(columns=['sweep', 'start']).to_string(index=False))
+    elif(args.cmd == 'throughput'):
+        db = ResultsDB(args.db)
+        df = db.query_throughput(args.sweep)
+        db.close()
+        print(df.drop(columns=['sweep', 'time']).to_string(index=False))
+    else:
+        if(not export_excel(args.db, args.out_file, args.sweep)):
+            sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,137 @@
+#
+# Python Script: Regression Test Job Scheduler (mvau_sched.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script decides when the configuration sets of a parallel
+# regression test are started. Running Vivado synthesis and HLS co-simulation
+# concurrently is limited by the floating licences and the memory of the host
+# rather than by its cores, so a configuration set is only started when, along
+# with a free job, enough licence tokens and enough memory are available. A
+# configuration set running its HLS and RTL flows one after the other holds one
+# licence token and the peak memory of its flows while it runs, while one running
+# them at the same time (see mvau_flow_dag.py) holds two tokens and the memory
+# of both flows.
+#
+# The memory of a flow is estimated from the size of its weight memories and
+# SIMD blocks, PE x SIMD x TW, as
+#   mem = mem_model['base'] + mem_model['per_bit'] * PE*SIMD*TW (GB)
+# Configuration sets waiting to be started are ordered by their estimated run
+# time (longest processing time first) and the longest one fitting the free
+# resources is started. A configuration set larger than the whole memory budget
+# is started on its own once all others have finished.
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import os
+
+# Variable: mem_model
+# Memory (GB) of the HLS or RTL flow of a configuration set, a base memory
+# and the memory per bit of PE x SIMD x TW
+mem_model = {'base': 2.0, 'per_bit': 0.002}
+
+# Function: job_mem
+# This function estimates the peak memory of the flows of a configuration set
+#
+# Parameters:
+#   pt - Configuration set (SweepPoint of mvau_sweep.py)
+#   flows - Number of flows run at the same time
+#
+# Returns:
+#
+#   mem - Memory (GB)
+def job_mem(pt, flows=1):
+    return flows*(mem_model['base'] + mem_model['per_bit']*pt.pe*pt.simd*pt.wgt_wl)
+
+# Function: host_mem
+# This function returns the physical memory of the host
+#
+# Returns:
+#
+#   mem - Memory (GB)
+def host_mem():
+    try:
+        return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')/2**30
+    except (ValueError, OSError, AttributeError):
+        print("Cannot read the memory of the host, memory is not limited")
+        return float('inf')
+
+# Class: SlotScheduler
+# Keeps track of the jobs, licence tokens and memory held by the running
+# configuration sets and selects the next one to be started
+#
+# Attributes:
+#    jobs - Number of configuration sets run in parallel
+#    licences - Number of licence tokens
+#    mem - Memory budget (GB)
+#    running - Number of running configuration sets
+#    used_lic - Licence tokens held by the running configuration sets
+#    used_mem - Memory held by the running configuration sets (GB)
+class SlotScheduler:
+    # Constructor: __init__
+    # The constructor sets the resources, taking one licence token for every
+    # job and the memory of the host if they are not given
+    #
+    # Parameters:
+    #   jobs - Number of configuration sets run in parallel
+    #   licences - Number of licence tokens, None for one for every job
+    #   mem - Memory budget (GB), None for the memory of the host
+    def __init__(self, jobs, licences=None, mem=None):
+        self.jobs = jobs
+        self.licences = jobs if licences is None else licences
+        self.mem = host_mem() if mem is None else mem
+        self.running = 0
+        self.used_lic = 0
+        self.used_mem = 0.0
+        if(self.licences < 1):
+            raise ValueError("Number of licence tokens (%d) must be at least 1" % self.licences)
+
+    # Method: pick
+    # This method selects the configuration set to be started next
+    #
+    # Parameters:
+    #   reqs - Memory (GB) and licence tokens of the waiting configuration sets, longest first
+    #
+    # Returns:
+    #
+    #   idx - Index of the configuration set, None if none fits the free resources
+    def pick(self, reqs):
+        if(self.running >= self.jobs):
+            return None
+        for idx, (m, lic) in enumerate(reqs):
+            if(self.used_mem + m <= self.mem and self.used_lic + lic <= self.licences):
+                return idx
+        ### Starting a configuration set larger than the budget on its own
+        if(self.running == 0 and len(reqs) > 0):
+            m, lic = reqs[0]
+            if(m > self.mem):
+                print(f'Estimated memory of {m:.1f} GB exceeds the budget of {self.mem:.1f} GB, running it alone')
+            if(lic > self.licences):
+                print(f'{lic} licence tokens needed, only {self.licences} available, running it alone')
+            return 0
+        return None
+
+    # Method: start
+    # This method takes the resources of a configuration set being started
+    #
+    # Parameters:
+    #   mem - Memory of the configuration set (GB)
+    #   lic - Licence tokens of the configuration set
+    def start(self, mem, lic=1):
+        self.running += 1
+        self.used_lic += lic
+        self.used_mem += mem
+
+    # Method: finish
+    # This method returns the resources of a finished configuration set
+    #
+    # Parameters:
+    #   mem - Memory of the configuration set (GB)
+    #   lic - Licence tokens of the configuration set
+    def finish(self, mem, lic=1):
+        self.running -= 1
+        self.used_lic -= lic
+        self.used_mem -= mem
@@ -0,0 +1,503 @@
+#
+# Python Script: MVAU Stream Control Model (mvau_stream_model.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script is a cycle-accurate model of the control path of the MVAU
+# stream unit, i.e., of mvau_stream_control_block.sv (IDLE/WRITE/READ state
+# machine, SF and NF counters, sf_clr, nf_clr, wready and wmem_wready), of the
+# input buffer (mvau_inp_buffer.sv) and of the handshakes of mvau_stream.sv
+# (wait_rready, the accumulator control of mvu_pe_acc.sv and the output hold
+# registers). Every register of these blocks is updated once per clock cycle
+# as in the RTL, so that back-pressure scenarios can be run over millions of
+# cycles in seconds instead of with xsim.
+#
+# The data path is not computed. Instead, each input activation word carries
+# its output pixel and position (i, j) and each weight tile its neuron fold and
+# position (r, s) through the input buffer, the weight register and the
+# accumulator (the weights of the test benches do not depend on the pixel), so
+# that the model checks that every MAC pairs activation word j with weight tile
+# j and that every output accumulates the SF words of one pixel with the weights
+# of one neuron fold. Each output taken is compared with the next output
+# expected in the order [pixel][fold] and counted as wrong (not the sum of SF
+# MACs of one pixel and fold), lost (later outputs taken first) or duplicated
+# (taken before). Words of the input buffer which are overwritten before all
+# their NF-1 reads are also counted.
+#
+# The input activations and weights are driven as in the stream test benches:
+# - v3: mvau_stream_tb_v3.sv, no stalls, the output being ready when valid
+# - v4: mvau_stream_tb_v4.sv, the input valid is dropped in each output pixel at
+#       word rand_dly1 for rand_dly2 cycles, both drawn once in 1..SF-2
+# - v5: mvau_stream_tb_v5.sv, as v4 with the output ready following the output
+#       valid after a random delay of 50 to 150 cycles
+# - traffic: the traffic mode of mvau_stream_tb_v3.sv (+TRAFFIC), the input valid
+#            and output ready following the patterns traffic_in.mem and
+#            traffic_out.mem written by mvau_traffic.py
+# - random: the input valid is raised with probability p_in in every cycle and
+#           held until the word is taken, the output ready is set with
+#           probability p_out in every cycle
+# The weight stream is always valid and advances with wmem_wready, as in all
+# test benches. An output is taken in every cycle in which the output valid and
+# ready are set, and the latency is counted from reset to the last output
+# taken, as in latency.txt of the test benches. The output ready of v5 is
+# taken as 0 until its first delay elapses, as in a two-state simulator; in
+# xsim it is X during these 50 to 150 cycles.
+#
+# With the v3 test bench, the latency of the model is the one predicted by
+# mvau_cycle_model.py predict --stream for SF and NF of 1 to 8 (SF=1 with NF=1
+# over more than one pixel, which the predictor leaves out). The stalls under
+# the other test benches and traffic have not been checked against simulations
+# of the RTL, and the causes of the failed checks below are read from the RTL
+# and the test benches; they are to be confirmed with xsim (for e.g. with
+# mvau_stream_tb_v5.sv) before the model is used for what-if back-pressure runs:
+# - Lost outputs: the output hold register of mvau_stream.sv has a single entry,
+#   but the computation is only halted once wait_rready has been set for two
+#   cycles (NF=1) or sf_cnt reaches SF-2 (NF>1), so that with the output ready
+#   low, outputs still in the pipeline overwrite the held output. The test
+#   benches then wait for outputs that never come (no progress).
+# - Duplicated outputs: an output arriving while the previous one is taken is
+#   also written to the hold register and sent a second time.
+# - SF=1 with NF>1: nf_clr and sf_clr are registered, so that the input buffer
+#   is read once more than NF times per pixel and the outputs are wrong, even
+#   without stalls (see mvau_cycle_model.py).
+# - v4 and v5 with SF=2: the test benches advance the input word on wready
+#   alone, so that the word offered while the input valid is dropped is skipped
+#   (mismatched MACs).
+# Outputs taken back to back (SF=1, NF=1) pass the checks of the model but not
+# the ones of the v3 and v4 test benches, which only sample the first cycle of
+# each output valid pulse. The throughput reported for a back-pressure scenario
+# can only be the one of the RTL if no check fails.
+#
+# The following are reported: the cycles per output pixel and the efficiency
+# with respect to SF*NF, the MAC cycles, the stall cycles of the input, weight
+# and output streams and the occupancy of the input buffer (words still to be
+# read). The exit status is 1 if any check fails, the model stops making
+# progress or the latency differs from a given latency.txt.
+#
+# It can be called from the command line as follows:
+# python mvau_stream_model.py --ifm_ch 4 --ifm_dim 6 -s 2 -p 2                   - Models mvau_stream_tb_v3
+# python mvau_stream_model.py -s 2 -p 2 --tb v5 --seed 3                          - Models mvau_stream_tb_v5
+# python mvau_stream_model.py -s 2 -p 2 --tb random --p_in 0.7 --pixels 100000     - Random stalls over 100000 pixels
+# python mvau_stream_model.py -s 2 -p 2 --lat_file ../sim/latency.txt             - Compares with a v3 simulation
+# python mvau_stream_model.py -s 2 -p 2 --tb traffic --traffic_dir ../sim/traffic/<point> --lat_file ../sim/traffic/<point>/latency.txt
+#                                                                                 - Compares with a traffic point of mvau_traffic.py
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import random
+import sys
+import os
+import time
+from collections import namedtuple
+from mvau_cycle_model import ofm_dim, fold_factors, read_latency
+
+# Variable: IDLE, WRITE, READ
+# States of the state machine of the stream control block
+IDLE, WRITE, READ = 0, 1, 2
+
+# Variable: StreamStats
+# Results of a model run. cycles is the number of cycles run, latency the
+# number of cycles up to the last output taken (None if not all outputs were
+# taken), outputs the number of outputs taken (one for each neuron fold of each
+# pixel), mac the number of cycles the accumulators were enabled, in_stall,
+# in_idle, wgt_stall and out_stall the cycles in which the input was valid but
+# not ready, ready but not valid, the weights valid but not ready and the output
+# valid but not ready, occ_mean, occ_max and occ_full the mean and maximum
+# occupancy of the input buffer and the cycles it was full, and bad_mac,
+# bad_out, overwritten, lost and dup the number of failed checks
+StreamStats = namedtuple('StreamStats', ['sf', 'nf', 'pixels', 'cycles', 'latency', 'outputs', 'mac',
+                                         'in_stall', 'in_idle', 'wgt_stall', 'out_stall',
+                                         'occ_mean', 'occ_max', 'occ_full', 'bad_mac', 'bad_out', 'overwritten',
+                                         'lost', 'dup'])
+
+# Function: acc_add
+# This function adds one MAC to the tag of an accumulator
+#
+# Parameters:
+#   acc - Tag of the accumulator (pixel, fold, number of MACs, checks passed), None if cleared
+#   act - Tag of the activation word (i, j), None if not written
+#   wgt - Tag of the weight tile (r, s), None if not streamed
+#
+# Returns:
+#
+#   acc - Tag of the accumulator after the MAC
+def acc_add(acc, act, wgt):
+    if(act is None or wgt is None):
+        return (-1, -1, 1 if acc is None else acc[2]+1, False)
+    if(acc is None):
+        acc = (act[0], wgt[0], 0, True)
+    pix, r, n, ok = acc
+    return (pix, r, n+1, ok and act[0] == pix and wgt[0] == r and act[1] == n and wgt[1] == n)
+
+# Function: stream_model
+# This function runs the model of the stream control path until all outputs are taken
+#
+# Parameters:
+#   sf - Number of SIMD wide chunks of a row of the weight matrix (MatrixW/SIMD)
+#   nf - Number of PE high chunks of the weight matrix (MatrixH/PE)
+#   pixels - Number of output pixels
+#   tb - Test bench driving the unit, 'v3', 'v4', 'v5', 'traffic' or 'random'
+#   p_in - Probability of the input valid in each cycle ('random')
+#   p_out - Probability of the output ready in each cycle ('random')
+#   seed - Seed of the random delays and stalls
+#   max_idle - Number of cycles without any word or output taken after which the run is stopped,
+#              by default 10*SF*NF+1000
+#   pats - Patterns of the input valid and output ready, lists of 0 and 1 of the same length ('traffic')
+#
+# Returns:
+#
+#   stats - StreamStats record
+def stream_model(sf, nf, pixels, tb='v3', p_in=1.0, p_out=1.0, seed=1, max_idle=None, pats=None):
+    rng = random.Random(seed)
+    rand = rng.random
+    if(max_idle is None):
+        max_idle = 10*sf*nf+1000
+    ### Counters are SF_T=clog2(SF) and NF_T=clog2(NF) bits wide, at least one bit
+    sf_mask = (1 << max(1, (sf-1).bit_length()))-1
+    nf_mask = (1 << max(1, (nf-1).bit_length()))-1
+    sf_last, sf_prelast, nf_last = (sf-1) & sf_mask, (sf-2) & sf_mask, (nf-1) & nf_mask
+    ### Stall position and length of mvau_stream_tb_v4/v5, drawn once
+    rand_dly1 = max(1, rng.randint(min(1, sf-2), max(1, sf-2)))
+    rand_dly2 = max(1, rng.randint(min(1, sf-2), max(1, sf-2)))
+    words = sf*pixels
+
+    ### Registers of the test bench
+    i_inp = j_inp = dly_cnt = sent = in_v = in_done = 0
+    x_inp = r_inp = s_inp = in_wgt_v = 0
+    rready = rr_armed = 0
+    rr_fire = -1
+    ### Registers of the control block, the input buffer and the stream unit
+    ap_start, wready, state = 1, 0, IDLE
+    sf_cnt = sf_clr = nf_cnt = nf_clr = wait_rready_dly = 0
+    wait_rready = do_local = do_reg = clr_d0 = clr_d1 = out_acc_v = 0
+    buf = [None]*(sf_mask+1)
+    live = [0]*(sf_mask+1)
+    bout = wgt_reg = mac_act = mac_wgt = acc = None
+    out_v = hold_v = 0
+    out = hold = None
+
+    outputs, total = 0, nf*pixels
+    exp = 0
+    mac_cnt = in_stall = in_idle = wgt_stall = out_stall = 0
+    occ = occ_sum = occ_max = occ_full = 0
+    bad_mac = bad_out = overwritten = lost = dup = 0
+    latency = None
+    n = progress = 0
+    while(outputs < total and n-progress < max_idle):
+        ### Output ready of the test bench, set after a random delay by v5
+        if(tb == 'v5'):
+            if(rr_fire == n):
+                rready, rr_armed, rr_fire = out_v, out_v, -1
+            elif(rr_fire < 0 and out_v != rr_armed):
+                rr_fire = n+rng.randint(50, 150)
+        elif(tb == 'random'):
+            rready = 1 if rand() < p_out else 0
+        elif(tb == 'traffic'):
+            ### Registered from the pattern, starting after reset
+            rready = pats[1][(n-1) % len(pats[1])] if n > 0 else 0
+        else:
+            rready = out_v
+
+        ### Control block, combinational signals
+        inp_active = wready & in_v
+        ren = 0
+        if(nf == 1):
+            wen = do_cb = inp_active
+            halt = wait_rready & wait_rready_dly
+        else:
+            if(state == READ and not inp_active):
+                wen = 0
+                ren = do_cb = 0 if (nf_clr & sf_clr) else 1
+            else:
+                wen = do_cb = inp_active
+            halt = 1 if (sf_cnt == sf_prelast and wait_rready) else 0
+        sf_full = 1 if (sf_cnt == sf_last and do_cb) else 0
+        wmem_wready = do_cb
+
+        ### Statistics
+        if(in_v and not wready):
+            in_stall += 1
+        elif(wready and not in_v):
+            in_idle += 1
+        if(in_wgt_v and not wmem_wready):
+            wgt_stall += 1
+        if(out_v and not rready):
+            out_stall += 1
+        occ_sum += occ
+        if(occ > occ_max):
+            occ_max = occ
+        if(occ == sf):
+            occ_full += 1
+        if(inp_active):
+            progress = n
+
+        ### Output taken by the test bench, checked against the next output expected
+        if(out_v and rready):
+            if(out is None or not out[3] or out[2] != sf):
+                bad_out += 1
+                exp += 1
+            elif(out[0]*nf+out[1] < exp):
+                dup += 1
+            else:
+                lost += out[0]*nf+out[1]-exp
+                exp = out[0]*nf+out[1]+1
+            outputs += 1
+            progress = n
+            if(outputs == total):
+                latency = n+1
+
+        ### Rising edge, all registers being updated from their values before the edge
+        wready_prev, wait_rready_prev = wready, wait_rready
+
+        ### Rising edge: input buffer (write through) and weight register
+        if(wen):
+            if(live[sf_cnt] > 0):
+                overwritten += 1
+                occ -= 1
+            buf[sf_cnt] = bout_next = (i_inp, j_inp)
+            live[sf_cnt] = nf-1
+            if(nf > 1):
+                occ += 1
+        else:
+            bout_next = buf[sf_cnt]
+            if(ren and live[sf_cnt] > 0):
+                live[sf_cnt] -= 1
+                if(live[sf_cnt] == 0):
+                    occ -= 1
+
+        ### Rising edge: accumulator (mvu_pe_acc) and output registers of the stream unit
+        if(do_reg):
+            mac_cnt += 1
+            if(mac_act is None or mac_wgt is None or mac_act[1] != mac_wgt[1]):
+                bad_mac += 1
+            acc_next = acc_add(None if clr_d1 else acc, mac_act, mac_wgt)
+        else:
+            acc_next = None if clr_d1 else acc
+        take = out_acc_v and out_v
+        if(out_v and not rready):
+            out_next = out
+        elif(out_acc_v):
+            out_next = acc
+        elif(hold_v):
+            out_next = hold
+        else:
+            out_next = out
+        if(out_acc_v):
+            out_v_next = 1
+        elif(out_v and rready):
+            out_v_next = 0
+        else:
+            out_v_next = 1 if hold_v else out_v
+        if(not out_v and hold_v):
+            hold_v = 0
+        elif(take):
+            hold_v = 1
+        if(take):
+            hold = acc
+        wait_rready = 0 if rready else (1 if out_v else wait_rready)
+        acc, out, out_v = acc_next, out_next, out_v_next
+        out_acc_v, clr_d1, clr_d0 = clr_d0, clr_d0, sf_clr
+        mac_act, mac_wgt = bout, wgt_reg
+        bout, wgt_reg = bout_next, (r_inp, s_inp)
+        do_reg, do_local = do_local, (in_v & wready) | (in_wgt_v & wmem_wready)
+
+        ### Rising edge: control block
+        if(nf == 1):
+            wait_rready_dly = wait_rready_prev
+            wready = 0 if halt else 1
+        else:
+            nf_zero = nf_cnt == 0
+            if(state == IDLE):
+                if(wait_rready_prev):
+                    state = WRITE if (inp_active and not sf_full) else IDLE
+                elif(inp_active):
+                    state = READ if (nf_zero and sf_full) else WRITE
+                else:
+                    state = READ if (nf_zero == bool(sf_full)) else IDLE
+            elif(state == WRITE):
+                state = IDLE if (halt or not inp_active) else (READ if sf_full else WRITE)
+            else:
+                state = IDLE if halt else (WRITE if inp_active else (IDLE if (nf_clr and sf_clr) else READ))
+            nf_full = nf_cnt == nf_last and sf_full
+            if(ap_start or nf_full):
+                wready_next = 1
+            else:
+                wready_next = 0 if sf_full else wready
+            nf_cnt_next = 0 if (nf_clr and sf_clr) else ((nf_cnt+1) & nf_mask if sf_clr else nf_cnt)
+            nf_clr = 1 if nf_cnt == nf_last else 0
+            nf_cnt, wready = nf_cnt_next, wready_next
+        sf_cnt = 0 if sf_full else ((sf_cnt+1) & sf_mask if do_cb else sf_cnt)
+        sf_clr = sf_full
+        ap_start = 0
+
+        ### Rising edge: test bench
+        last = i_inp == pixels-1 and j_inp == sf-1
+        if(tb == 'random'):
+            accepted = in_v and wready_prev
+            if(accepted):
+                sent += 1
+            in_v_next = 1 if (in_v and not accepted) or (sent < words and rand() < p_in) else 0
+            advance = accepted and not last
+        elif(tb == 'traffic'):
+            ### The input valid is held until the word is taken and dropped after the last word
+            accepted = in_v and wready_prev
+            if(in_v and not wready_prev):
+                in_v_next = 1
+            elif(in_done or (in_v and last)):
+                in_v_next = 0
+            else:
+                in_v_next = pats[0][n % len(pats[0])]
+            if(accepted and last):
+                in_done = 1
+            advance = accepted and not last
+        elif(tb == 'v3'):
+            in_v_next = (1-in_v) if (pixels == 1 and sf == 1) else (0 if last else 1)
+            advance = wready_prev and not last
+        else:
+            if(dly_cnt == rand_dly2):
+                in_v_next = 1
+            elif(j_inp == rand_dly1):
+                in_v_next = 0
+            elif(pixels == 1 and sf == 1):
+                in_v_next = 1-in_v
+            elif(pixels == 1):
+                in_v_next = (1 if j_inp == sf-1 else 0) if tb == 'v5' else (0 if j_inp == sf-1 else 1)
+            elif(sf == 1):
+                in_v_next = 0 if i_inp == pixels-1 else 1
+            else:
+                in_v_next = 0 if last else 1
+            ### The word is held at rand_dly1 until the delay counter reaches rand_dly2
+            advance = wready_prev and not last and (j_inp == sf-1 or dly_cnt == rand_dly2 or j_inp != rand_dly1)
+            dly_cnt = 0 if dly_cnt == rand_dly2 else (dly_cnt+1 if j_inp == rand_dly1 else dly_cnt)
+        if(advance):
+            if(j_inp == sf-1):
+                i_inp, j_inp = i_inp+1, 0
+            else:
+                j_inp += 1
+        in_v = in_v_next
+        wlast = x_inp == pixels-1 and r_inp == nf-1 and s_inp == sf-1
+        if(wmem_wready and not wlast):
+            if(s_inp < sf-1):
+                s_inp += 1
+            elif(r_inp < nf-1):
+                r_inp, s_inp = r_inp+1, 0
+            else:
+                x_inp, r_inp, s_inp = x_inp+1, 0, 0
+        in_wgt_v = 0 if wlast else 1
+        n += 1
+
+    return StreamStats(sf, nf, pixels, n, latency, outputs, mac_cnt, in_stall, in_idle, wgt_stall, out_stall,
+                       occ_sum/max(1, n), occ_max, occ_full, bad_mac, bad_out, overwritten, lost, dup)
+
+# Function: print_stats
+# This function prints the results of a model run
+#
+# Parameters:
+#   st - StreamStats record
+#   elapsed - Run time of the model in seconds
+#
+# Returns:
+#
+# None
+def print_stats(st, elapsed):
+    ii = st.cycles/max(1, st.outputs/st.nf)
+    print(f'SF: {st.sf}, NF: {st.nf}, Output pixels: {st.pixels}')
+    print(f'Cycles: {st.cycles}, Outputs taken: {st.outputs} of {st.nf*st.pixels}, Latency: {st.latency}')
+    print(f'Cycles per output pixel: {ii:.2f} (SF*NF = {st.sf*st.nf}), Efficiency: {100.0*st.sf*st.nf/ii:.1f}%')
+    print(f'MAC cycles: {st.mac} ({100.0*st.mac/max(1, st.cycles):.1f}%)')
+    print(f'Input stall cycles (valid, not ready): {st.in_stall}, Input idle cycles (ready, not valid): {st.in_idle}')
+    print(f'Weight stall cycles: {st.wgt_stall}, Output stall cycles: {st.out_stall}')
+    print(f'Input buffer occupancy: mean {st.occ_mean:.2f}, max {st.occ_max} of {st.sf}, full {st.occ_full} cycles')
+    print(f'Mismatched MACs: {st.bad_mac}, Wrong outputs: {st.bad_out}, Words overwritten before read: {st.overwritten}')
+    print(f'Lost outputs: {st.lost}, Duplicated outputs: {st.dup}')
+    print(f'Modelled {st.cycles} cycles in {elapsed:.2f} s ({st.cycles/max(elapsed, 1e-9)/1e6:.2f} M cycles/s)')
+
+# Function: read_pattern
+# This function reads a traffic pattern written by mvau_traffic.py
+#
+# Parameters:
+#   fname - Memory file name (traffic_in.mem or traffic_out.mem)
+#
+# Returns:
+#
+#   pat - List of the signal in each cycle (0 or 1)
+def read_pattern(fname):
+    with open(fname) as f:
+        return [int(line) for line in f if line.strip()]
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for modelling the control path of the MVAU stream unit cycle by cycle')
+    parser.add_argument('-k','--kdim',default=2,type=int,
+                        help="Filter dimension")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+                        help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+                        help="Output feature map channels")
+    parser.add_argument('--ifm_dim', default=4, type=int,
+                        help="Input feature map dimensions")
+    parser.add_argument('-s','--simd',default=2,type=int,
+                        help="SIMD")
+    parser.add_argument('-p', '--pe', default=2,type=int,
+                        help="PE")
+    parser.add_argument('--stride', default=1,type=int,
+                        help="Convolution stride")
+    parser.add_argument('--pixels', default=None,type=int,
+                        help="Number of output pixels, OFMDim*OFMDim by default")
+    parser.add_argument('--tb', default='v3', choices=['v3', 'v4', 'v5', 'traffic', 'random'],
+                        help="Test bench whose stalls are modelled")
+    parser.add_argument('--p_in', default=1.0,type=float,
+                        help="Probability of the input valid in each cycle (random)")
+    parser.add_argument('--p_out', default=1.0,type=float,
+                        help="Probability of the output ready in each cycle (random)")
+    parser.add_argument('--seed', default=1,type=int,
+                        help="Seed of the random delays and stalls")
+    parser.add_argument('--traffic_dir', default='.',
+                        help="Folder of the traffic patterns traffic_in.mem and traffic_out.mem (traffic)")
+    parser.add_argument('--lat_file', default=None,
+                        help="Latency file (latency.txt) written by the test bench to compare with")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# runs the model and prints its results
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    sf, nf = fold_factors(args.ifm_ch, args.ofm_ch, args.kdim, args.simd, args.pe)
+    pixels = args.pixels if args.pixels is not None else ofm_dim(args.ifm_dim, args.kdim, args.stride)**2
+    pats = None
+    if(args.tb == 'traffic'):
+        try:
+            pats = [read_pattern(os.path.join(args.traffic_dir, f)) for f in ("traffic_in.mem", "traffic_out.mem")]
+        except:
+            print("Cannot read the traffic patterns of " + args.traffic_dir)
+            raise
+    started = time.time()
+    st = stream_model(sf, nf, pixels, args.tb, args.p_in, args.p_out, args.seed, pats=pats)
+    print_stats(st, time.time()-started)
+    ok = st.latency is not None and st.bad_mac == 0 and st.bad_out == 0 and st.overwritten == 0 and st.lost == 0 and st.dup == 0
+    if(st.latency is None):
+        print(f'No progress for {10*sf*nf+1000} cycles, stopped')
+    ### Possible causes of the failed checks in the RTL, to be confirmed with xsim, see the header of this file
+    if(st.lost > 0):
+        print('Outputs lost, possibly as the single output hold register is overwritten before the computation is halted')
+    if(st.dup > 0):
+        print('Outputs duplicated, possibly as an output arriving while the previous one is taken is held and sent again')
+    if(sf == 1 and nf > 1 and (st.overwritten > 0 or st.bad_out > 0)):
+        print('SF=1 with NF>1: possibly as the input buffer is read once more than NF times per pixel')
+    if(args.tb in ('v4', 'v5') and st.bad_mac > 0):
+        print(f'{args.tb} test bench: possibly as an input word is skipped while the input valid is dropped')
+    if(args.lat_file is not None):
+        lat = read_latency(args.lat_file)
+        print(f'Recorded latency: {lat}, Difference: {None if st.latency is None else lat-st.latency}')
+        ok = ok and lat == st.latency
+    sys.exit(0 if ok else 1)
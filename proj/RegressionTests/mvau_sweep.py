@@ -0,0 +1,371 @@
+#
+# Python Script: Regression Test Sweep Specification (mvau_sweep.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script reads the sweep specification files run by regtest_mvau.py
+# and expands them to the list of configuration sets of a regression test. A
+# sweep specification is a JSON file holding:
+# - name: Name of the sweep specification
+# - arch: MVAU unit to be tested, 'batch' or 'stream'
+# - axes: A list of axes, each being a dictionary of parameters and their values.
+#         The values of the parameters of one axis are zipped, i.e., they must
+#         have the same length, while the configuration sets are the Cartesian
+#         product of all axes. The parameters are ifm_ch, ifm_dim, ofm_ch, kdim,
+#         inp_wl, inp_sgn, wgt_wl, wgt_sgn, out_wl, simd and pe
+# - flavours: Optional list of SIMD types to be run ('std', 'binwgt', 'xnor'),
+#             the type of each configuration set being set by its precisions
+# - scripts: Optional dictionary replacing the HLS and RTL test scripts of a SIMD
+#            type, for e.g. {"std": ["test_mvau_batch0_std.sh", "test_mvau_batch0_std_rtl.sh"]}
+# - clk_per: Optional clock constraints of RTL and HLS synthesis
+# - limits: Optional wall-clock (seconds) and memory (GB) limits of the stages of
+#           the flows, for e.g. {"synth": {"time": 14400, "mem": 16}}, beyond
+#           which a stage is killed and its configuration set fails (see mvau_monitor.py)
+# - simulator: Optional simulator of the v3 RTL simulations, 'xsim' or 'verilator'
+#              (see mvau_verilator.py in proj/sim)
+# - sim_threads: Optional number of threads of the Verilator model
+#
+# The input and weights signs default to unsigned and the output word length
+# to "auto", i.e., min(16, inp_wl+wgt_wl+ceil(log2(kdim*kdim*ifm_ch))). Before
+# any configuration set is numbered, invalid configuration sets (KDim larger
+# than IFMDim, SIMD not dividing IFM channels or PE not dividing OFM channels),
+# configuration sets of other SIMD types and duplicates are removed.
+#
+# The run time of each configuration set is estimated from the results of
+# previous sweeps (see mvau_exec_model.py), so that the run time of a sweep is
+# known before it is run and the longest configuration sets can be started
+# first by parallel runs.
+#
+# It can be called from the command line as follows:
+# python mvau_sweep.py <sweep file>                  - Lists the configuration sets of a sweep, longest first
+# python mvau_sweep.py <sweep file> -d <db> -j <n>   - Estimates the run time from a results database for n jobs
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import itertools
+import json
+import sys
+from collections import namedtuple, Counter
+from math import ceil, log2
+from mvau_fold_opt import simd_mode
+from mvau_exec_model import fit_exec, est_exec, lpt_makespan, fmt_time
+
+# Variable: param_defaults
+# Values of the parameters which may be left out of a sweep specification
+param_defaults = {'inp_sgn': 0, 'wgt_sgn': 0, 'out_wl': 'auto'}
+
+# Variable: spec_defaults
+# Values of the optional fields of a sweep specification
+spec_defaults = {'name': 'sweep', 'arch': 'batch', 'flavours': ['std', 'binwgt', 'xnor'],
+                 'scripts': {}, 'clk_per': [5.0, 10.0], 'limits': {}, 'simulator': 'xsim', 'sim_threads': 1}
+
+# Variable: flows
+# HLS test script, RTL test script, HLS run and RTL run of each unit and SIMD type.
+# The runs name the directories the HLS and RTL reports are read from
+flows = {('batch', 'std'): ['test_mvau_std.sh', 'test_mvau_std_rtl.sh', 'mvau_std', 'mvau'],
+         ('batch', 'binwgt'): ['test_mvau_binwgt.sh', 'test_mvau_binwgt_rtl.sh', 'mvau_binwgt', 'mvau'],
+         ('batch', 'xnor'): ['test_mvau_xnor.sh', 'test_mvau_xnor_rtl.sh', 'mvau_xnor', 'mvau'],
+         ('stream', 'std'): ['test_mvau_stream_std.sh', 'test_mvau_stream_std_rtl.sh', 'mvau_stream_std', 'mvau_stream'],
+         ('stream', 'binwgt'): ['test_mvau_stream_binwgt.sh', 'test_mvau_stream_binwgt_rtl.sh', 'mvau_stream_binwgt', 'mvau_stream'],
+         ('stream', 'xnor'): ['test_mvau_stream_xnor.sh', 'test_mvau_stream_xnor_rtl.sh', 'mvau_stream_xnor', 'mvau_stream']}
+
+# Variable: flavour_names
+# Names of the SIMD types used in the report keys and log
+flavour_names = {'std': 'STD', 'binwgt': 'BIN WGT', 'xnor': 'XNOR'}
+
+# Variable: SweepPoint
+# One configuration set. The first nine fields are the configuration written to the
+# output file, op_sgn is the enumerated value of the signs used by the RTL
+SweepPoint = namedtuple('SweepPoint', ['ifm_ch', 'ifm_dim', 'ofm_ch', 'kdim', 'inp_wl', 'wgt_wl', 'out_wl',
+                                       'simd', 'pe', 'inp_sgn', 'wgt_sgn', 'op_sgn', 'flavour'])
+
+# Function: read_spec
+# This function reads a sweep specification and sets its optional fields
+#
+# Parameters:
+#   spec_file - Sweep specification file name
+#
+# Returns:
+#
+#   spec - Dictionary of the sweep specification
+def read_spec(spec_file):
+    try:
+        with open(spec_file) as f:
+            spec = json.load(f)
+    except:
+        print("Cannot read the sweep specification")
+        raise
+    spec = dict(spec_defaults, **spec)
+    if(spec['arch'] not in ('batch', 'stream')):
+        raise ValueError("Unit (%s) must be batch or stream" % spec['arch'])
+    if(spec['simulator'] not in ('xsim', 'verilator')):
+        raise ValueError("Simulator (%s) must be xsim or verilator" % spec['simulator'])
+    return spec
+
+# Function: expand_axes
+# This function expands the axes of a sweep specification
+#
+# Parameters:
+#   axes - List of dictionaries of parameter values
+#
+# Returns:
+#
+#   params - List of dictionaries, one value of each parameter
+def expand_axes(axes):
+    zipped = []
+    for axis in axes:
+        lens = set(len(v) for v in axis.values())
+        if(len(lens) > 1):
+            raise ValueError("Parameters of an axis (%s) must have the same number of values" % ", ".join(axis))
+        zipped.append([dict(zip(axis, vals)) for vals in zip(*axis.values())])
+    return [dict(param_defaults, **{k: v for d in prod for k, v in d.items()})
+            for prod in itertools.product(*zipped)]
+
+# Function: auto_out_wl
+# This function returns the output word length needed to hold a dot product,
+# limited to 16 bits
+#
+# Parameters:
+#   inp_wl - Input activation precision
+#   wgt_wl - Weight precision
+#   kdim - Kernel dimensions
+#   ifm_ch - Input feature map channels
+#
+# Returns:
+#
+#   out_wl - Output precision
+def auto_out_wl(inp_wl, wgt_wl, kdim, ifm_ch):
+    return min(16, inp_wl+wgt_wl+ceil(log2(kdim*kdim*ifm_ch)))
+
+# Function: check_point
+# This function checks whether a configuration set can be run
+#
+# Parameters:
+#   p - Dictionary of parameter values
+#
+# Returns:
+#
+#   reason - Reason why the configuration set cannot be run, None if it can
+def check_point(p):
+    if(p['kdim'] > p['ifm_dim']):
+        return "KDim larger than IFMDim"
+    if(p['ifm_ch'] % p['simd'] != 0):
+        return "SIMD does not divide IFM channels"
+    if(p['ofm_ch'] % p['pe'] != 0):
+        return "PE does not divide OFM channels"
+    return None
+
+# Function: sweep_points
+# This function expands a sweep specification to its configuration sets,
+# removing invalid configuration sets, other SIMD types and duplicates
+#
+# Parameters:
+#   spec - Dictionary of the sweep specification
+#   verbose - If True, removed configuration sets are listed
+#   skipped - List to which the removed configuration sets are appended
+#             along with the reason, None if not needed
+#
+# Returns:
+#
+#   points - List of SweepPoint records
+def sweep_points(spec, verbose=True, skipped=None):
+    points = []
+    seen = set()
+    for p in expand_axes(spec['axes']):
+        p = {k: int(v) if k != 'out_wl' else v for k, v in p.items()}
+        if(p['out_wl'] == 'auto'):
+            p['out_wl'] = auto_out_wl(p['inp_wl'], p['wgt_wl'], p['kdim'], p['ifm_ch'])
+        pt = SweepPoint(p['ifm_ch'], p['ifm_dim'], p['ofm_ch'], p['kdim'], p['inp_wl'], p['wgt_wl'], int(p['out_wl']),
+                        p['simd'], p['pe'], p['inp_sgn'], p['wgt_sgn'], p['inp_sgn']+2*p['wgt_sgn'],
+                        simd_mode(p['inp_wl'], p['wgt_wl']))
+        reason = check_point(p)
+        if(reason is None and pt.flavour not in spec['flavours']):
+            reason = "SIMD type not in the sweep"
+        elif(reason is None and pt in seen):
+            reason = "Duplicate"
+        if(reason is not None):
+            if(verbose):
+                print(f'Skipping {list(pt[:9])}: {reason}')
+            if(skipped is not None):
+                skipped.append((pt, reason))
+            continue
+        seen.add(pt)
+        points.append(pt)
+    return points
+
+# Function: plan_axes
+# This function returns the axes of a sweep plan (read by read_plan of mvau_fold_opt.py),
+# which are zipped in the same way as the arrays of the regression test scripts
+#
+# Parameters:
+#   plan - Dictionary of numpy arrays
+#
+# Returns:
+#
+#   axes - List of dictionaries of parameter values
+def plan_axes(plan):
+    groups = [{'ifm_ch': 'ifm_ch_arr', 'ifm_dim': 'ifm_dim_arr', 'ofm_ch': 'ofm_ch_arr'},
+              {'kdim': 'kdim_arr'},
+              {'inp_wl': 'inp_wl_arr', 'inp_sgn': 'inp_wl_sgn', 'wgt_wl': 'wgt_wl_arr',
+               'wgt_sgn': 'wgt_wl_sgn', 'out_wl': 'out_wl_arr'},
+              {'simd': 'simd', 'pe': 'pe'}]
+    return [{k: plan[v].tolist() for k, v in g.items()} for g in groups]
+
+# Function: flow_scripts
+# This function returns the test scripts and runs of a configuration set
+#
+# Parameters:
+#   spec - Dictionary of the sweep specification
+#   flavour - SIMD type
+#
+# Returns:
+#
+#   hls_script, rtl_script, hls_run, rtl_run - Test scripts and runs
+def flow_scripts(spec, flavour):
+    hls_script, rtl_script, hls_run, rtl_run = flows[(spec['arch'], flavour)]
+    if(flavour in spec['scripts']):
+        hls_script, rtl_script = spec['scripts'][flavour]
+        ### Reports of the HLS runs are named after the test script
+        hls_run = hls_script.replace("test_", "", 1).replace(".sh", "")
+    return hls_script, rtl_script, hls_run, rtl_run
+
+# Function: script_args
+# This function returns the arguments of the HLS and RTL test scripts. Only the
+# HLS script of the standard batch unit takes the signs, while the RTL scripts
+# take the binary flags along with the signs for the standard batch unit
+#
+# Parameters:
+#   arch - MVAU unit, 'batch' or 'stream'
+#   pt - SweepPoint record
+#
+# Returns:
+#
+#   hls_args, rtl_args - Lists of arguments
+def script_args(arch, pt):
+    layer = [pt.ifm_ch, pt.ifm_dim, pt.ofm_ch, pt.kdim]
+    fold = [pt.out_wl, pt.simd, pt.pe]
+    if(arch == 'batch' and pt.flavour == 'std'):
+        hls_args = layer + [pt.inp_wl, pt.inp_sgn, pt.wgt_wl, pt.wgt_sgn] + fold
+        rtl_args = layer + [pt.inp_wl, 0, pt.wgt_wl, 0, pt.op_sgn] + fold
+    else:
+        hls_args = layer + [pt.inp_wl, pt.wgt_wl] + fold
+        rtl_args = layer + [pt.inp_wl, int(pt.flavour == 'xnor'), pt.wgt_wl, int(pt.flavour != 'std')] + fold
+    return [str(a) for a in hls_args], [str(a) for a in rtl_args]
+
+# Function: golden_args
+# This function returns the arguments of gen_mvau_golden.py writing the input
+# activation, expected output and weight memory files of a configuration set
+# in place of the HLS C-simulation, with the binary flags and signs set in the
+# same way as for the RTL test scripts. The weight memory files are written to
+# the simulation directory, from which the simulator reads them, and to the
+# design directory read by the synthesis
+#
+# Parameters:
+#   arch - MVAU unit, 'batch' or 'stream'
+#   pt - SweepPoint record
+#
+# Returns:
+#
+#   args - List of arguments, run from the simulation directory
+def golden_args(arch, pt):
+    op_sgn = pt.op_sgn if(arch == 'batch' and pt.flavour == 'std') else 0
+    args = {'ifm_ch': pt.ifm_ch, 'ifm_dim': pt.ifm_dim, 'ofm_ch': pt.ofm_ch, 'kdim': pt.kdim,
+            'inp_wl': pt.inp_wl, 'inp_bin': int(pt.flavour == 'xnor'), 'wgt_wl': pt.wgt_wl,
+            'wgt_bin': int(pt.flavour != 'std'), 'op_sgn': op_sgn, 'out_wl': pt.out_wl,
+            'simd': pt.simd, 'pe': pt.pe, 'wmem_dir': ['.', '../src/mvau_top']}
+    return [a for k, v in args.items() for a in ['--'+k] + [str(x) for x in (v if isinstance(v, list) else [v])]]
+
+# Function: longest_first
+# This function orders configuration sets by their estimated run time, longest first
+#
+# Parameters:
+#   config_lst - List of configuration set numbers and SweepPoint records
+#   model - Run time model (ExecModel of mvau_exec_model.py)
+#
+# Returns:
+#
+#   config_lst - Ordered list of configuration set numbers and SweepPoint records
+def longest_first(config_lst, model):
+    return sorted(config_lst, key=lambda c: -sum(est_exec(model, c[1])))
+
+# Function: shape_first
+# This function groups the configuration sets sharing a hardware shape, i.e., the
+# same configuration apart from the input feature map dimensions, so that their
+# RTL simulations are run one after the other from the same snapshot (see
+# mvau_snapshot.py). Groups are kept in the order of their first configuration
+# set and the configuration sets of a group are ordered by decreasing input
+# feature map dimensions, so that the snapshot is elaborated for the largest one
+#
+# Parameters:
+#   config_lst - List of configuration set numbers and SweepPoint records
+#
+# Returns:
+#
+#   config_lst - Ordered list of configuration set numbers and SweepPoint records
+def shape_first(config_lst):
+    first = dict()
+    for idx, (_, pt) in enumerate(config_lst):
+        first.setdefault(pt._replace(ifm_dim=0), idx)
+    return sorted(config_lst, key=lambda c: (first[c[1]._replace(ifm_dim=0)], -c[1].ifm_dim))
+
+# Function: print_plan
+# This function lists the configuration sets of a sweep, longest first, with the
+# estimated run time of their HLS and RTL flows, the configuration sets removed
+# from the sweep and the estimated run time of the sweep
+#
+# Parameters:
+#   spec - Dictionary of the sweep specification
+#   config_lst - List of configuration set numbers and SweepPoint records to be run
+#   skipped - List of removed SweepPoint records and reasons
+#   model - Run time model (ExecModel of mvau_exec_model.py)
+#   jobs - Number of configuration sets run in parallel
+#
+# Returns:
+#
+#   None
+def print_plan(spec, config_lst, skipped, model, jobs=1):
+    print("Set\tIFM_Ch\tIFM_Dim\tOFM_Ch\tKDim\tInp_Act\tWgt_Prec\tOut_Act\tSIMD\tPE\tType\tRTL Script\tHLS Est.\tRTL Est.")
+    for config_set, pt in longest_first(config_lst, model):
+        hls_exec, rtl_exec = est_exec(model, pt)
+        print("\t".join(str(c) for c in [config_set] + list(pt[:9]) +
+                        [flavour_names[pt.flavour], flow_scripts(spec, pt.flavour)[1], fmt_time(hls_exec), fmt_time(rtl_exec)]))
+    for reason, n in Counter(r for _, r in skipped).items():
+        print(f'Removed {n} configuration sets: {reason}')
+    if(model.n == 0):
+        print("No results of previous sweeps, run times are default estimates")
+    else:
+        print(f'Run times estimated from {model.n} configuration sets of previous sweeps')
+    times = [sum(est_exec(model, pt)) for _, pt in config_lst]
+    print(f'{len(config_lst)} configuration sets of {spec["arch"]} unit, estimated run time '
+          f'{fmt_time(sum(times))} in series, {fmt_time(lpt_makespan(times, jobs))} with {jobs} jobs')
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for listing the configuration sets of a sweep')
+    parser.add_argument('spec_file',
+                        help="Sweep specification file")
+    parser.add_argument('-d','--db',default="mvau_results.db",
+                        help="Results database the run times are estimated from")
+    parser.add_argument('-j','--jobs',default=1,type=int,
+                        help="Number of configuration sets run in parallel")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# lists the configuration sets of the sweep with their estimated run times
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    spec = read_spec(args.spec_file)
+    skipped = []
+    points = sweep_points(spec, False, skipped)
+    print_plan(spec, list(enumerate(points)), skipped, fit_exec(args.db, spec['arch']), args.jobs)
+    sys.exit(0)
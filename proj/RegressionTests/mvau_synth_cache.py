@@ -0,0 +1,259 @@
+#
+# Python Script: Synthesis Result Cache (mvau_synth_cache.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script implements a local on-disk cache of RTL synthesis results.
+# The key of each entry is a hash of the full synthesis input set, i.e., the
+# synthesis Tcl script (which defines the FPGA part), its arguments, the RTL
+# sources, weight memory files and the constraint file (which defines the clock).
+# The input set and the reports written by synthesis are found by scanning the
+# synthesis Tcl script. On a cache hit, the reports are restored instead of
+# running Vivado again. The cache is bounded in size and the least recently
+# used entries are evicted first.
+#
+# It is called from the synthesis folder by the RTL test scripts as follows:
+# python mvau_synth_cache.py lookup mvau_synth.tcl <pe> - Restores the reports, exits with '0' on a hit and '1' on a miss
+# python mvau_synth_cache.py store mvau_synth.tcl <pe>  - Stores the reports after a successful synthesis
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+# Variable: stale_tmp_age
+# Age in seconds after which a temporary entry left by an interrupted store is removed
+stale_tmp_age = 3600
+
+# Function: parse_synth_tcl
+# This function scans a synthesis Tcl script for the files read and the
+# reports written by it. Commented lines are ignored
+#
+# Parameters:
+#   tcl_file - Synthesis Tcl script
+#   tcl_args - Arguments passed to the Tcl script, the first one being the number of PEs if weight memories are read
+#
+# Returns:
+#
+#   inputs - Sorted list of input files
+#   outputs - List of reports and netlists written by synthesis
+def parse_synth_tcl(tcl_file, tcl_args):
+    inputs = []
+    outputs = []
+    out_dir = "."
+    with open(tcl_file) as tcl:
+        for line in tcl:
+            line = line.strip()
+            if(line.startswith("#")):
+                continue
+            m = re.match(r'set\s+outputDir\s+(\S+)', line)
+            if m:
+                out_dir = m.group(1)
+            m = re.match(r'read_verilog\s+(?:-sv\s+)?\[\s*glob\s+(\S+)\s*\]', line)
+            if m:
+                inputs += glob.glob(m.group(1))
+            m = re.match(r'read_xdc\s+.*?(\S+)$', line)
+            if m:
+                inputs.append(m.group(1))
+            m = re.match(r'read_mem\s+(\S+)', line)
+            if m:
+                ### Weight memories are read in a loop over the number of PEs
+                if("$p" in m.group(1)):
+                    inputs += [m.group(1).replace("$p", str(p)) for p in range(int(tcl_args[0]))]
+                else:
+                    inputs.append(m.group(1))
+            for pattern in [r'-file\s+(\S+)', r'\[open\s+"(\S+)"\s+w\]',
+                            r'write_verilog\s+.*-force\s+(\S+)', r'write_sdf\s+-force\s+(\S+)']:
+                m = re.search(pattern, line)
+                if m:
+                    outputs.append(m.group(1).replace("$outputDir", out_dir))
+    return sorted(set(inputs)), outputs
+
+# Function: hash_inputs
+# This function computes the cache key from the synthesis input set
+#
+# Parameters:
+#   tcl_file - Synthesis Tcl script
+#   tcl_args - Arguments passed to the Tcl script
+#   inputs - List of input files
+#
+# Returns:
+#
+#   key - Hex digest of the synthesis input set
+def hash_inputs(tcl_file, tcl_args, inputs):
+    key = hashlib.sha256()
+    key.update(open(tcl_file, "rb").read())
+    key.update(("\0".join(tcl_args)+"\0").encode())
+    for f in inputs:
+        key.update((f+"\0").encode())
+        with open(f, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                key.update(chunk)
+    return key.hexdigest()
+
+# Function: dir_size
+# This function returns the total size of the files in a directory
+#
+# Parameters:
+#   path - Directory
+#
+# Returns:
+#
+#   size - Size in bytes
+def dir_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            size += os.path.getsize(os.path.join(root, f))
+    return size
+
+# Function: evict
+# This function removes least recently used entries until
+# the size of the cache is below the given limit. Temporary entries
+# left by an interrupted store are removed once they are older than
+# stale_tmp_age
+#
+# Parameters:
+#   cache_dir - Cache directory
+#   max_size - Maximum size of the cache in bytes
+#
+# Returns:
+#
+# None
+def evict(cache_dir, max_size):
+    entries = []
+    for e in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, e)
+        if(not os.path.isdir(path)):
+            continue
+        if(e.startswith(".tmp")):
+            ### Recent ones may still be written by a concurrent run
+            if(time.time() - os.path.getmtime(path) > stale_tmp_age):
+                print("Removing stale synthesis cache entry %s" % e)
+                shutil.rmtree(path, ignore_errors=True)
+        elif(not e.startswith(".")):
+            entries.append((os.path.getmtime(path), dir_size(path), path))
+    total = sum(e[1] for e in entries)
+    for mtime, size, path in sorted(entries):
+        if(total <= max_size):
+            break
+        print("Evicting synthesis cache entry %s" % os.path.basename(path))
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+# Function: lookup
+# This function restores the synthesis reports if the input set is found
+# in the cache. The entry is marked as recently used
+#
+# Parameters:
+#   cache_dir - Cache directory
+#   tcl_file - Synthesis Tcl script
+#   tcl_args - Arguments passed to the Tcl script
+#
+# Returns:
+#
+#   hit - True if the reports are restored, False if they are not cached or an input file is missing
+def lookup(cache_dir, tcl_file, tcl_args):
+    try:
+        inputs, outputs = parse_synth_tcl(tcl_file, tcl_args)
+        key = hash_inputs(tcl_file, tcl_args, inputs)
+    except OSError as e:
+        print("Synthesis cache miss: %s missing" % (e.filename or tcl_file))
+        return False
+    entry = os.path.join(cache_dir, key)
+    if(not os.path.isdir(entry)):
+        print("Synthesis cache miss: %s" % key)
+        return False
+    try:
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        for i, out in enumerate(meta['outputs']):
+            if(os.path.dirname(out) != ""):
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, "out%d" % i), out)
+        os.utime(entry)
+    except (OSError, ValueError, KeyError):
+        print("Cannot restore synthesis cache entry: %s" % key)
+        return False
+    print("Synthesis cache hit: %s" % key)
+    return True
+
+# Function: store
+# This function stores the synthesis reports in the cache. The entry is
+# written to a temporary directory first so that concurrent runs never
+# see an incomplete entry
+#
+# Parameters:
+#   cache_dir - Cache directory
+#   tcl_file - Synthesis Tcl script
+#   tcl_args - Arguments passed to the Tcl script
+#   max_size - Maximum size of the cache in bytes
+#
+# Returns:
+#
+# None
+def store(cache_dir, tcl_file, tcl_args, max_size):
+    inputs, outputs = parse_synth_tcl(tcl_file, tcl_args)
+    key = hash_inputs(tcl_file, tcl_args, inputs)
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp", dir=cache_dir)
+    stored = []
+    for out in outputs:
+        if(os.path.isfile(out)):
+            shutil.copyfile(out, os.path.join(tmp, "out%d" % len(stored)))
+            stored.append(out)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({'tcl': tcl_file, 'args': tcl_args, 'inputs': inputs,
+                   'outputs': stored, 'time': time.time()}, f, indent=1)
+    try:
+        os.rename(tmp, entry)
+        print("Synthesis results stored in cache: %s" % key)
+    except OSError:
+        ### Entry already stored by a concurrent run
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict(cache_dir, max_size)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for caching RTL synthesis results')
+    parser.add_argument('cmd', choices=['lookup', 'store'],
+                        help="Restore results from the cache or store results in the cache")
+    parser.add_argument('tcl_file',
+                        help="Synthesis Tcl script")
+    parser.add_argument('tcl_args', nargs='*',
+                        help="Arguments passed to the synthesis Tcl script")
+    parser.add_argument('--cache_dir',
+                        default=os.environ.get('MVAU_SYNTH_CACHE',
+                                               os.path.join(os.path.expanduser("~"), ".cache", "mvau_synth")),
+                        help="Cache directory")
+    parser.add_argument('--max_size', type=int,
+                        default=int(os.environ.get('MVAU_SYNTH_CACHE_SIZE', 2048)),
+                        help="Maximum size of the cache in MB")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# looks up or stores the synthesis results
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.cmd == 'lookup'):
+        sys.exit(0 if lookup(args.cache_dir, args.tcl_file, args.tcl_args) else 1)
+    store(args.cache_dir, args.tcl_file, args.tcl_args, args.max_size*2**20)
+    sys.exit(0)
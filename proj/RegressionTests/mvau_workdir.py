@@ -0,0 +1,134 @@
+#
+# Python Script: Isolated Work Directories for Regression Tests (mvau_workdir.py)
+#
+# Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+#
+# This python script creates a scratch copy of the MVAU RTL and FINN HLS trees
+# for a single configuration set. All files generated by the HLS and RTL flows
+# (mvau_top.v, mvau_defn.sv, mvau_weight_mem*.sv, *.mem files and the Vivado
+# projects) are then written to the scratch copy instead of the shared
+# directories, allowing a number of configuration sets to be run in parallel.
+#
+# This material is based upon work supported, in part, by Science Foundation
+# Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+# European Union's Horizon 2020 research and innovation programme under the
+# Marie Sklodowska-Curie grant agreement Grant No.754489.  #
+
+import os
+import shutil
+
+# Variable: mvau_copy_dirs
+# Sub-directories of MVAU_RTL_ROOT copied to the work directory
+mvau_copy_dirs = ["proj/sim", "proj/src", "proj/syn", "proj/RegressionTests"]
+
+# Variable: ignore_names
+# Generated files and directories which are not copied to the work directory,
+# including the snapshot caches, event log, journal and results database of a sweep
+ignore_names = ["*_project", "xsim.dir", ".Xil", "hls-syn-*", "*.log", "*.jou", "*.wdb", "*.pb", "*.xlsx",
+                "sweep_work", "shards", "snapshots", "mvau_snapshots", "traffic", "__pycache__",
+                "mvau_events.jsonl", "mvau_journal.jsonl", "*.db", "*.lock", "out_dump.mem"]
+
+# Function: ignore_patterns
+# This function returns the ignore function of copytree, leaving out the generated
+# files along with the work directories and the snapshot cache (MVAU_SNAPSHOT_CACHE)
+# of the sweep, whatever their names
+#
+# Parameters:
+#   work_root - Directory in which work directories of all configuration sets are created
+#
+# Returns:
+#
+#   ignore - Function returning the names not copied from a directory
+def ignore_patterns(work_root):
+    names = ignore_names + [os.path.basename(os.path.abspath(work_root))]
+    if(os.environ.get('MVAU_SNAPSHOT_CACHE')):
+        names.append(os.path.basename(os.path.abspath(os.environ['MVAU_SNAPSHOT_CACHE'])))
+    return shutil.ignore_patterns(*names)
+
+# Function: make_work_dir
+# This function creates the work directory for a configuration set
+# and copies the MVAU RTL and FINN HLS trees in it
+#
+# Parameters:
+#   work_root - Directory in which work directories of all configuration sets are created
+#   config_set - Configuration set number
+#   mvau_env - The path to the MVAU RTL directory (MVAU_RTL_ROOT)
+#   finn_env - The path to the FINN HLS library (FINN_HLS_ROOT)
+#
+# Returns:
+#
+#   mvau_work - The path to the copy of the MVAU RTL directory
+#   finn_work - The path to the copy of the FINN HLS library
+def make_work_dir(work_root, config_set, mvau_env, finn_env):
+    work_dir = os.path.abspath(os.path.join(work_root, "config_%d" % config_set))
+    mvau_work = os.path.join(work_dir, "mvau_rtl")
+    finn_work = os.path.join(work_dir, "finn_hls")
+    ignore = ignore_patterns(work_root)
+    try:
+        if(os.path.isdir(work_dir)):
+            shutil.rmtree(work_dir)
+        for d in mvau_copy_dirs:
+            shutil.copytree(os.path.join(mvau_env, d), os.path.join(mvau_work, d),
+                            symlinks=True, ignore=ignore)
+        shutil.copytree(finn_env, finn_work, symlinks=True, ignore=ignore)
+    except:
+        print("Cannot create the work directory for config set: %d" % config_set)
+        raise
+    return mvau_work, finn_work
+
+# Function: make_rtl_dir
+# This function creates a copy of the MVAU RTL tree for the RTL flow of a
+# configuration set, so that the RTL flow can run at the same time as the
+# HLS flow, which writes its memory files to the MVAU RTL tree it is given
+#
+# Parameters:
+#   work_root - Directory in which work directories of all configuration sets are created
+#   config_set - Configuration set number
+#   mvau_env - The path to the MVAU RTL directory (MVAU_RTL_ROOT)
+#
+# Returns:
+#
+#   rtl_work - The path to the copy of the MVAU RTL directory used by the RTL flow
+def make_rtl_dir(work_root, config_set, mvau_env):
+    rtl_work = os.path.abspath(os.path.join(work_root, "config_%d" % config_set, "mvau_rtl_flow"))
+    ignore = ignore_patterns(work_root)
+    try:
+        if(os.path.isdir(rtl_work)):
+            shutil.rmtree(rtl_work)
+        for d in mvau_copy_dirs:
+            shutil.copytree(os.path.join(mvau_env, d), os.path.join(rtl_work, d),
+                            symlinks=True, ignore=ignore)
+    except:
+        print("Cannot create the RTL work directory for config set: %d" % config_set)
+        raise
+    return rtl_work
+
+# Function: work_env
+# This function returns a copy of the environment with the FINN HLS
+# and MVAU RTL root variables pointing to the work directory
+#
+# Parameters:
+#   mvau_work - The path to the copy of the MVAU RTL directory
+#   finn_work - The path to the copy of the FINN HLS library
+#
+# Returns:
+#
+#   env - Environment to be passed to the test scripts
+def work_env(mvau_work, finn_work):
+    env = dict(os.environ)
+    env['MVAU_RTL_ROOT'] = mvau_work
+    env['FINN_HLS_ROOT'] = finn_work
+    return env
+
+# Function: remove_work_dir
+# This function removes the work directory of a configuration set
+#
+# Parameters:
+#   work_root - Directory in which work directories of all configuration sets are created
+#   config_set - Configuration set number
+#
+# Returns:
+#
+# None
+def remove_work_dir(work_root, config_set):
+    shutil.rmtree(os.path.join(work_root, "config_%d" % config_set), ignore_errors=True)
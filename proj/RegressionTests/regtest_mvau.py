@@ -1,12 +1,12 @@
 #
-# Python Script: Regression Test Script for MVAU Batch (regtest_mvau.py)
+# Python Script: Regression Test Script for MVAU Batch and Stream (regtest_mvau.py)
 #
 # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
 #
-# This python script runs a regression test for the MVAU batch based on a
-# given set of parameters. It generates and runs HLS and RTL flows and compares
-# performance of both in terms of FPGA resource utilization, timing and run time
-# All performance numbers are written to an output excel file
+# This python script runs a regression test for the MVAU batch or stream based on
+# a sweep specification (see mvau_sweep.py). It generates and runs HLS and RTL flows
+# and compares performance of both in terms of FPGA resource utilization, timing
+# and run time. All performance numbers are written to an output excel file
 #
 # This material is based upon work supported, in part, by Science Foundation
 # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
@@ -15,6 +15,7 @@
 
 import numpy as np
 import argparse
+import json
 import os
 import sys
 import subprocess
@@ -22,8 +23,19 @@ import pandas as pd
 import time
 from openpyxl.utils import get_column_letter
 import argparse
-from signal import signal, SIGINT
+from signal import signal, SIGINT, SIG_IGN
 from math import ceil, log2
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from mvau_workdir import make_work_dir, make_rtl_dir, work_env, remove_work_dir
+from mvau_journal import SweepJournal, config_key, hash_files
+from mvau_results_db import ResultsDB
+from mvau_reports import parse_util_rpt, parse_timing_summary, parse_hls_export, parse_cosim_rpt
+from mvau_fold_opt import read_plan
+from mvau_sweep import read_spec, sweep_points, plan_axes, flow_scripts, script_args, golden_args, flavour_names, longest_first, shape_first, print_plan
+from mvau_flow_dag import FlowDAG
+from mvau_events import span, run_timed, killed_stages, read_events
+from mvau_exec_model import fit_exec
+from mvau_sched import SlotScheduler, job_mem
 
 # Class: MyHanlder
 # Handles unexpected termination or explicit termination by Ctrl+C by calling the
@@ -79,6 +91,23 @@ class MyHandler:
 #
 #   None
 def write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file):
+    with span('write_rpt'):
+        return write_rpt_excel(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
+
+# Function: write_rpt_excel
+# This function writes the Excel output file for write_rpt_file
+#
+# Parameters:
+#   rpt_dict - Dictionary containing all performance measures to be written
+#   rpt_col_names - Column names for various meausres written to the output excel file
+#   config_dict - Configurations for which the regression test is being run
+#   config_col_names - Configuration parameters against which the tests are being run. Acts as column names for the output excel file
+#   out_file - Output excel file name
+#
+# Returns:
+#
+#   0
+def write_rpt_excel(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file):
     try:
         print("Writing the results to an Excel file")
         clen = len(rpt_col_names)//2
@@ -125,21 +154,20 @@ def extract_hls_data(log_file,param):
     tp = 0
     try:
         print("Extracting data from HLS log file")
+        export = parse_hls_export(log_file)
         ### Going through each parameter for which data to be captured
-        with open(log_file) as log_line:
-            for line in log_line:
-                for p in param:
-                    if p in line:
-                        block.append(int(float(line.split()[1])))
-                if "CP achieved post-synthesis" in line:
-                    tp = round((float(line.split()[-1]))*10**3)/10**3
+        for (section, name, val) in export.rows:
+            for p in param:
+                if p in name:
+                    block.append(int(float(val)))
+        if(export.cp_post_synth is not None):
+            tp = round(export.cp_post_synth*10**3)/10**3
 
         return block, tp
 
     except:
         print("Cannot read the HLS reports file")
         raise
-        exit(1)
 
 # Function: extract_rtl_block_data
 # This function extracts performance data from RTL simulation and synthesis
@@ -155,21 +183,18 @@ def extract_rtl_block_data(log_file,param):
     block = []
     try:
         print("Extracting data from RTL utilization report")
+        rows = parse_util_rpt(log_file)
         ### Going through each parameter for which data to be captured
         for p in param:
-            with open(log_file) as log_line:
-                for line in log_line:
-                    line = line.rstrip()
-                    if p in line:
-                        if(len(line.split("|")) > 1):
-                            block.append(int(float(line.split("|")[2])))
+            for row in rows:
+                if p in row.name:
+                    block.append(int(float(row.used)))
 
         return block
 
     except:
         print("Cannot read the RTL utilization report")
         raise
-        exit(1)
 
 # Function: extract_rtl_timing_data
 # This function extracts timing information for RTL synthesis
@@ -186,19 +211,12 @@ def extract_rtl_timing_data(log_file, clk_per):
     try:
         print("Extracting data from RTL timing report")
 
-        # with open(log_file) as log_line:
-        #     tp = float(log_line.read().rsplit()[-1])
-        with open(log_file) as log_line:
-            for line in log_line:
-                line = line.rstrip()
-                if(('Setup' in line) and ('Worst Slack' in line)):
-                    tp_string = line.split(',')[1].split(' ')[-1]
-                    tp_len = len(tp_string)
-                    tp = clk_per - round((float(tp_string[:tp_len-2]))*10**3)/10**3
+        summary = parse_timing_summary(log_file)
+        if(len(summary.setup_slack) > 0):
+            tp = clk_per - round(summary.setup_slack[-1]*10**3)/10**3
 
         print(f'critical path delay: {tp}')
         return tp
-        # return round((clk_per-tp)*10**3)/10**3
     except:
         print("Cannot read the RTL timing report")
         raise
@@ -217,10 +235,9 @@ def extract_hls_latency(log_file):
     lat = 0
     try:
         print("Extracting latency information from HLS run")
-        with open(log_file) as log_line:
-            for line in log_line:
-                if "Verilog" in line:
-                    lat = line.replace(' ', '').split("|")[7]
+        for row in parse_cosim_rpt(log_file):
+            if(row.rtl == "Verilog"):
+                lat = row.values[4]
         return int(float(lat))
     except:
         print("Cannot read the HLS latency report file")
@@ -235,14 +252,15 @@ def extract_hls_latency(log_file):
 #
 # Returns:
 #
-#   rtl_lat - RTL latency
+#   rtl_lat - RTL latency, 'N/A' if the simulation was split into shards (see mvau_shard.py)
 def extract_rtl_latency(log_file):
     lat = 0
     try:
         print("Extracting latency information from RTL run")
         with open(log_file) as log_line:
             for line in log_line:
-                lat = int(float(line.replace(' ','')))
+                line = line.replace(' ','').strip()
+                lat = 'N/A' if(line == 'N/A') else int(float(line))
         return lat
     except:
         print("Cannot read the RTL latency report file")
@@ -311,6 +329,36 @@ def calc_savings(hls_lst, rtl_lst):
             sv_lst.append(round(((sv[0] - sv[1])/sv[0]*100)*10**2)/10**2)
     return sv_lst
 
+# Function: report_files
+# This function defines all the paths where the various log files are present
+#
+# Parameters:
+#   hls_run - Directory from where HLS reports are to be read
+#   rtl_run - Directory from where RTL reports are to be read
+#   finn_tb - The path to FINN HLS library
+#   mvau_env - The path to RTL directory
+#
+# Returns:
+#   rpt_files - Dictionary of report file names
+def report_files(hls_run, rtl_run, finn_tb, mvau_env):
+    # Directory from where HLS reports to be read
+    hls_syn_dir = hls_run.replace("_","-")
+    hls_dir = finn_tb+"/hls-syn-"+hls_syn_dir+"/sol1/impl/report/verilog/"
+    # Directory from where RTL reports to be read
+    rtl_dir = mvau_env+"/proj/syn/"+rtl_run+"_project/"
+    rpt_files = dict()
+    # Constructing HLS report filename
+    rpt_files['hls_log'] = hls_dir+"Testbench_"+hls_run+"_export.rpt"
+    # Constructing HLS latency report filename
+    rpt_files['hls_lat'] = finn_tb+"/hls-syn-"+hls_syn_dir+"/sol1/sim/report/Testbench_"+hls_run+"_cosim.rpt"
+    rpt_files['hls_exec'] = finn_tb+"/hls_exec.rpt"
+    # Constructing RTL reports filename
+    rpt_files['rtl_util'] = rtl_dir+"post_opt_util.rpt"
+    rpt_files['rtl_time'] = rtl_dir+"post_opt_timing_summary.rpt"
+    rpt_files['rtl_lat'] = mvau_env+"/proj/sim/latency.txt"
+    rpt_files['rtl_exec'] = mvau_env+"/proj/syn/rtl_exec.rpt"
+    return rpt_files
+
 # Function: extract_data
 # This function calls all of the above extraction function and combines
 # them in one place for further processing. It defines all the paths where
@@ -327,22 +375,14 @@ def calc_savings(hls_lst, rtl_lst):
 # Returns:
 #   pd_list - A list which is a combination of HLS and RTL performance measures and the differences between them
 def extract_data(hls_run, rtl_run, clk_per, finn_tb, mvau_env):
-    # Directory from where HLS reports to be read
-    hls_syn_dir = hls_run.replace("_","-")
-    hls_dir = finn_tb+"/hls-syn-"+hls_syn_dir+"/sol1/impl/report/verilog/"
-    # Constructing HLS report filename
-    hls_logfile = hls_dir+"Testbench_"+hls_run+"_export.rpt"
-    # Constructing HLS latency report filename
-    hls_latfile = finn_tb+"/hls-syn-"+hls_syn_dir+"/sol1/sim/report/Testbench_"+hls_run+"_cosim.rpt"
-    hls_execfile = finn_tb+"/hls_exec.rpt"
-
-    # Directory from where RTL reports to be read
-    rtl_dir = mvau_env+"/proj/syn/"+rtl_run+"_project/"
-    # Constructing RTL reports filename
-    rtl_utilfile = rtl_dir+"post_opt_util.rpt"
-    rtl_timefile = rtl_dir+"post_opt_timing_summary.rpt"
-    rtl_latfile = mvau_env+"/proj/sim/latency.txt"
-    rtl_execfile = mvau_env+"/proj/syn/rtl_exec.rpt"
+    rpt_files = report_files(hls_run, rtl_run, finn_tb, mvau_env)
+    hls_logfile = rpt_files['hls_log']
+    hls_latfile = rpt_files['hls_lat']
+    hls_execfile = rpt_files['hls_exec']
+    rtl_utilfile = rpt_files['rtl_util']
+    rtl_timefile = rpt_files['rtl_time']
+    rtl_latfile = rpt_files['rtl_lat']
+    rtl_execfile = rpt_files['rtl_exec']
 
     # Parameters for which HLS data needs to be extracted
     hls_param = ["LUT","FF","DSP","BRAM"]
@@ -381,188 +421,442 @@ def extract_data(hls_run, rtl_run, clk_per, finn_tb, mvau_env):
 
     return pd_lst
 
+# Function: call_script
+# This function calls a test script, which exits with 1 on success, and
+# times it as the 'hls' or 'rtl' stage in the event log (see mvau_events.py).
+# The test fails if any of its stages was killed for exceeding its limits
+#
+# Parameters:
+#   flow - Name of the flow, 'HLS' or 'RTL'
+#   script - Test script
+#   args - List of arguments of the test script
+#   cwd - Directory from where the test script is called
+#   env - Environment passed on to the test script, None to use the current environment
+#   flavour - SIMD type
+#   config_set - Configuration set number
+#
+# Returns:
+#
+#   True if the test passed
+def call_script(flow, script, args, cwd, env, flavour, config_set=None):
+    start = time.time()
+    sp = run_timed(flow.lower(), ['./'+script] + args, cwd, env, config_set, 1)
+    if(sp!=1):
+        print(f'{flow} {flavour_names[flavour]} Test Failed')
+        return False
+    killed = killed_stages(config_set, start)
+    if(len(killed) > 0):
+        print(f'{flow} {flavour_names[flavour]} Test Failed, stages killed for exceeding their limits: {killed}')
+        return False
+    return True
+
+# Function: can_overlap
+# This function checks whether the HLS and RTL flows of a configuration set can
+# be run at the same time. The RTL flow then reads the golden data written by
+# gen_mvau_golden.py instead of the HLS C-simulation, which is not possible for
+# test scripts given by the sweep specification (for e.g. the MLP layers, whose
+# weights are read from the HLS test bench)
+#
+# Parameters:
+#   spec - Dictionary of the sweep specification
+#   pt - Configuration set (SweepPoint)
+#
+# Returns:
+#
+#   True if the flows can be run at the same time
+def can_overlap(spec, pt):
+    return pt.flavour not in spec['scripts']
+
+# Function: check_wmem
+# This function checks that the weight memory files of all PEs were written to
+# the simulation directory, from which the simulator reads them, along with the
+# golden output. Files copied with the RTL work directory are older than the
+# golden output and are reported as stale
+#
+# Parameters:
+#   sim_dir - Simulation directory
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   True if the weight memory files of all PEs are present and up to date
+def check_wmem(sim_dir, pe):
+    gold_time = os.path.getmtime(os.path.join(sim_dir, "out_act.mem"))
+    wmem = [os.path.join(sim_dir, "weight_mem%d.mem" % p) for p in range(pe)]
+    missing = [os.path.basename(f) for f in wmem if not os.path.isfile(f)]
+    stale = [os.path.basename(f) for f in wmem if os.path.isfile(f) and os.path.getmtime(f) < gold_time]
+    if(len(missing) > 0 or len(stale) > 0):
+        print(f'Weight memory files of {sim_dir} missing: {missing}, older than the golden output: {stale}')
+        return False
+    return True
+
+# Function: run_config
+# This function runs the HLS and RTL flows for one configuration set and
+# extracts the performance data. The test scripts are selected based on the
+# MVAU unit of the sweep and the input activation and weight precision
+# (XNOR, binary weights or standard)
+#
+# When an RTL work directory is given, the flows are run as a graph of stages
+# (see mvau_flow_dag.py) instead of one after the other: the HLS flow runs at the
+# same time as the generation of the golden data followed by the RTL flow, which
+# runs in the RTL work directory so that the memory files written by the HLS
+# flow do not overwrite the ones being simulated
+#
+# Parameters:
+#   config_set - Configuration set number
+#   pt - Configuration set (SweepPoint)
+#   spec - Dictionary of the sweep specification
+#   finn_tb - Directory of the FINN HLS test bench
+#   mvau_env - Directory of the MVAU RTL directory
+#   mvau_tb - Directory of the Regression Test directory
+#   env - Environment passed on to the test scripts, None to use the current environment
+#   rtl_work - Copy of the MVAU RTL directory (made by make_rtl_dir) in which the RTL flow
+#              is run at the same time as the HLS flow, None to run the flows one after the other
+#
+# Returns:
+#
+#   rpt_dict_key - Key of the configuration set in the report dictionary
+#   rpt_lst - List of performance measures, None if the HLS or RTL test failed
+#   rpt_hashes - Dictionary of hashes of the reports the performance measures are extracted from
+def run_config(config_set, pt, spec, finn_tb, mvau_env, mvau_tb, env=None, rtl_work=None):
+    hls_script, rtl_script, hls_run, rtl_run = flow_scripts(spec, pt.flavour)
+    hls_args, rtl_args = script_args(spec['arch'], pt)
+    print("#######################################")
+    print(f'### MVAU {spec["arch"].capitalize()} Configuration Set: {config_set}')
+    print(f'### IFM Channels: {pt.ifm_ch}')
+    print(f'### IFM Dimensions: {pt.ifm_dim}')
+    print(f'### OFM Channels: {pt.ofm_ch}')
+    print(f'### Kernel Dimensions: {pt.kdim}')
+    print(f'### Input precision: {pt.inp_wl}')
+    print(f'### Weight precision: {pt.wgt_wl}')
+    print(f'### Output precision: {pt.out_wl}')
+    print(f'### SIMD: {pt.simd}')
+    print(f'### PE: {pt.pe}')
+    print(f'### SIMD: {flavour_names[pt.flavour]}')
+    print("#######################################")
+    if(rtl_work is None):
+        ### Calling the HLS test script
+        if(not call_script('HLS', hls_script, hls_args, finn_tb, env, pt.flavour, config_set)):
+            return None, None, None
+        ### Calling the RTL test script
+        if(not call_script('RTL', rtl_script, rtl_args, mvau_tb, env, pt.flavour, config_set)):
+            return None, None, None
+    else:
+        ### Running the HLS flow at the same time as the RTL flow in its work directory
+        rtl_env = dict(os.environ if env is None else env)
+        rtl_env['MVAU_RTL_ROOT'] = rtl_work
+        gold_cmd = [sys.executable, rtl_work+'/proj/sim/gen_mvau_golden.py'] + golden_args(spec['arch'], pt)
+        dag = FlowDAG()
+        dag.add('hls', lambda: call_script('HLS', hls_script, hls_args, finn_tb, env, pt.flavour, config_set))
+        dag.add('golden', lambda: run_timed('golden', gold_cmd, rtl_work+'/proj/sim', env, config_set) == 0
+                and check_wmem(rtl_work+'/proj/sim', pt.pe))
+        dag.add('rtl', lambda: call_script('RTL', rtl_script, rtl_args, rtl_work+'/proj/RegressionTests',
+                                           rtl_env, pt.flavour, config_set), ['golden'])
+        status = dag.run()
+        if(not all(status.values())):
+            print(f'Stages of config set {config_set}: {status}')
+            return None, None, None
+        ### RTL reports are read from the RTL work directory
+        mvau_env = rtl_work
+    ### Extracting results
+    rpt_dict_key = "Config set: "+str(config_set)+" ("+flavour_names[pt.flavour]+")"
+    with span('extract', config_set):
+        rpt_lst = extract_data(hls_run, rtl_run, spec['clk_per'], finn_tb, mvau_env)
+        rpt_hashes = hash_files(report_files(hls_run, rtl_run, finn_tb, mvau_env).values())
+
+    return rpt_dict_key, rpt_lst, rpt_hashes
+
+# Function: init_worker
+# Initializer of the worker processes of a parallel sweep. Ctrl+C is
+# only handled by the main process which writes the output file
+def init_worker():
+    signal(SIGINT, SIG_IGN)
+
+# Function: run_config_isolated
+# This function runs one configuration set in its own work directory,
+# so that it can be run in parallel with other configuration sets.
+# The work directory is removed if the run is successful and kept
+# for debugging otherwise
+#
+# Parameters:
+#   config_set - Configuration set number
+#   pt - Configuration set (SweepPoint)
+#   spec - Dictionary of the sweep specification
+#   finn_env - The path to the FINN HLS library
+#   mvau_env - The path to the MVAU RTL directory
+#   work_root - Directory in which the work directories are created
+#   overlap - If True, the HLS and RTL flows are run at the same time
+#
+# Returns:
+#
+#   config_set - Configuration set number
+#   rpt_dict_key - Key of the configuration set in the report dictionary
+#   rpt_lst - List of performance measures, None if the run failed
+#   rpt_hashes - Dictionary of hashes of the reports
+def run_config_isolated(config_set, pt, spec, finn_env, mvau_env, work_root, overlap=False):
+    mvau_work, finn_work = make_work_dir(work_root, config_set, mvau_env, finn_env)
+    rtl_work = make_rtl_dir(work_root, config_set, mvau_work) if overlap else None
+    rpt_dict_key, rpt_lst, rpt_hashes = run_config(config_set, pt, spec, finn_work+'/tb/', mvau_work,
+                                                   mvau_work+'/proj/RegressionTests',
+                                                   work_env(mvau_work, finn_work), rtl_work)
+    if(rpt_lst is not None):
+        remove_work_dir(work_root, config_set)
+    return config_set, rpt_dict_key, rpt_lst, rpt_hashes
+
+# Function: store_stages
+# This function stores the stages of a configuration set timed in the
+# event log in the results database
+#
+# Parameters:
+#   db - ResultsDB object
+#   sweep - Name of the sweep
+#   config_set - Configuration set number
+#   event_file - Event log file, None if the stages are not timed
+#   since - Start time (seconds since the epoch) of the sweep
+#
+# Returns:
+#
+#   None
+def store_stages(db, sweep, config_set, event_file, since):
+    if(event_file is None or not os.path.isfile(event_file)):
+        return
+    df = read_events(event_file)
+    df = df[(df['config_set'] == config_set) & (df['start'] >= since)]
+    db.add_stages(sweep, config_set, df.to_dict('records'))
+
+# Function: log_config
+# This function logs the configuration sets completed to config_log.txt
+#
+# Parameters:
+#   config_set - Configuration set number
+#   first - True to start a new log file
+def log_config(config_set, first):
+    with open("config_log.txt","w" if first else "a") as f:
+        f.write(f'Config set: {config_set}\n')
+
 # Function: main
-# The main top level function which defines the parameters to be evaluated,
+# The main top level function which expands the sweep specification to the configuration sets,
 # configures the column names for the Excel output file, handles unexpected events,
 # and runs the regression tests for various configuration parameters. After running HLS and
 # RTL tests, it calls the extract_data function to do the main data extraction and then calls a
 # function to write to the output Excel file
 #
+# When more than one job is requested, configuration sets are run in parallel by a pool of
+# processes, each configuration set in its own copy of the MVAU RTL and FINN HLS trees. A failing
+# configuration set does not stop the others in that case, and the script exits with an error
+# once all of them have finished. A configuration set is only started when a licence token and
+# its estimated memory are free (see mvau_sched.py), the longest waiting one being started first
+#
+# The HLS and RTL flows of a configuration set can be run at the same time instead of one after
+# the other, the RTL flow running in its own copy of the MVAU RTL tree in the work directory
+#
+# The RTL simulations of all configuration sets share a cache of simulation snapshots, elaborated
+# once for each hardware shape (see mvau_snapshot.py), and serial runs group the configuration sets
+# of the same hardware shape so that they are simulated one after the other from the same snapshot.
+# The simulator field of the sweep specification runs them with Verilator instead of xsim
+# (see mvau_verilator.py), its models being built in the same cache. The Verilator backend has
+# not been validated against xsim yet, so it is refused unless it is forced
+#
+# Every completed configuration set is appended to a journal file. When the regression test
+# is restarted, the configuration sets found in the journal are not run again and their
+# performance measures are taken from the journal
+#
+# The performance measures of each configuration set are also inserted in a results database
+# as soon as the configuration set completes, under the name of the sweep. The stages of all
+# configuration sets are timed in an event log (see mvau_events.py), their child processes being
+# monitored and killed if they exceed the limits of the sweep specification (see mvau_monitor.py),
+# and stored in the results database, whether the configuration set fails or not. The execution times
+# of previous sweeps in the database are used to estimate the run time of each configuration set,
+# and parallel runs start the longest configuration sets first. A dry run only lists the
+# configuration sets to be run with their estimated run times
+#
 # Parameters:
-#   kdim_arr - An array containing specifications about kernel dimensions
-#   ifm_ch_arr -  An array containing specifications about input feature map size
-#   ofm_ch_arr -  An array containing specifications about output feature map size
-#   ifm_dim_arr - An array containing specifications about input feature map dimension
-#   inp_wl_arr -  An array containing specification about input word length
-#   inp_wl_sgn -  An array containing specification about input vector sign, corresponds to inp_wl_arr
-#   wgt_wl_arr -  An array containing specification about weights precision
-#   wgt_wl_sgn -  An array containing specification about sign of weights, corresponds to wgt_wl_sgn
-#   simd - An array containing specification about number of SIMDs
-#   pe -   An array containing specification about number of PEs
+#   spec - Dictionary of the sweep specification (read by read_spec of mvau_sweep.py)
 #   finn_tb - Directory of the FINN HLS directory
 #   mvau_env - Directory of the MVAU RTL directory
 #   mvau_tb - Directory of the Regression Test directory
 #   out_file - Output excel file
-def main(kdim_arr, ifm_ch_arr, ofm_ch_arr, ifm_dim_arr,
-         inp_wl_arr, inp_wl_sgn, wgt_wl_arr, wgt_wl_sgn,
-         simd, pe, clk_per, finn_tb, mvau_env, mvau_tb, out_file):
+#   jobs - Number of configuration sets run in parallel
+#   work_root - Directory in which work directories are created for parallel runs
+#   journal_file - Journal file of completed configuration sets
+#   restart - If True, the journal is emptied and all configuration sets are run
+#   db_file - Results database file
+#   sweep - Name of the sweep in the results database, current date and time if None
+#   dry_run - If True, the configuration sets are listed and not run
+#   licences - Number of tool licence tokens of parallel runs, None for one for every job
+#   mem - Memory budget (GB) of parallel runs, None for the memory of the host
+#   overlap - If True, the HLS and RTL flows of each configuration set are run at the same time
+#   event_file - Event log file, None to not time the stages
+#   interval - Interval (seconds) at which the child processes of each stage are sampled
+#   shards - Number of shards of output pixels simulated in parallel by the v3 RTL simulations (see mvau_shard.py)
+#   snapshot_dir - Cache of the simulation snapshots shared by all configuration sets (see mvau_snapshot.py)
+#   force_verilator - If True, the experimental Verilator backend can be selected by the sweep specification
+def main(spec, finn_tb, mvau_env, mvau_tb, out_file,
+         jobs=1, work_root="sweep_work", journal_file="mvau_journal.jsonl", restart=False,
+         db_file="mvau_results.db", sweep=None, dry_run=False, licences=None, mem=None, overlap=False,
+         event_file=None, interval=1.0, shards=1, snapshot_dir="mvau_snapshots", force_verilator=False):
     config_col_names = ["IFM_Ch","IFM_Dim", "OFM_Ch", "KDim","Inp_Act","Wgt_Prec","Out_Act","SIMD","PE"]
     rpt_col_names = ["HLS LUT", "HLS FF", "HLS DSPs", "HLS BRAM", "HLS Time", "HLS Latency", "HLS Exec. Time", "HLS Timing Met",
                      "RTL LUT", "RTL FF", "RTL DSPs", "RTL BRAM", "RTL Time", "RTL Latency", "RTL Exec. Time", "RTL Timing Met"]
-    config_set = 0
     config_dict = dict()
     rpt_dict = dict()
-    success = 0 ### A non-zero value indicates at least one run is successful
-    op_sgn = 0 ### Default value, both input activation and weights are unsigned
+    clk_per = spec['clk_per']
+
+    ### The Verilator backend is only used when forced until it is validated against xsim
+    if(spec['simulator'] == 'verilator'):
+        print("Verilator simulator is experimental and unvalidated against xsim")
+        if(not force_verilator):
+            print("Use --force_verilator to run the RTL simulations with Verilator anyway")
+            sys.exit(1)
 
     ### Handling Ctrl+C gracefully
     signal(SIGINT, MyHandler(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file))
 
-    for ifm_ch, ifm_dim, ofm_ch in zip(ifm_ch_arr, ifm_dim_arr, ofm_ch_arr):
-        for kdim in kdim_arr:
-            ### Skipping if kdim>ifm_dim
-            if(kdim > ifm_dim):
-                continue
-            for inp_wl, inp_sgn, wgt_wl, wgt_sgn, out_wl in zip(inp_wl_arr, inp_wl_sgn, wgt_wl_arr, wgt_wl_sgn, out_wl_arr):
-                #out_wl = 16#min(16,inp_wl+wgt_wl+ceil(log2(kdim*kdim*ifm_ch)))
-                ### Setting up parameter of operator signs
-                if(inp_sgn==1 and wgt_sgn==1):
-                    op_sgn = 3
-                elif(inp_sgn == 1 and wgt_sgn == 0):
-                    op_sgn = 1
-                elif(inp_sgn == 0 and wgt_sgn == 1):
-                    op_sgn = 2
-                else:
-                    op_sgn = 0
-
-                for s,p in zip(simd, pe):
-                    print(s, ifm_ch, p, ofm_ch)
-                    ### Skipping this config set when ifm channel is not an integer multiple of SIMD
-                    if(ifm_ch%s!=0 or s>ifm_ch):
-                        continue
-                    ### Skipping this config set when ofm channel is not an integer multiple of PE
-                    if(ofm_ch%p!=0 or p>ofm_ch):
-                        continue
-                    # ### temporary skip to run MLPs
-                    # if(s != ifm_ch or p != ofm_ch):
-                    #     print(s, ifm_ch, p, ofm_ch)
-                    #     continue
-                    ### Preparing a dict to write to a file with config details
-                    config_dict_key = str(config_set)
-                    config_dict[config_dict_key] = [ifm_ch, ifm_dim, ofm_ch, kdim, inp_wl, wgt_wl, out_wl, s, p]
-                    print("#######################################")
-                    print(f'### MVAU Batch Configuration Set: {config_set}')
-                    print(f'### IFM Channels: {ifm_ch}')
-                    print(f'### IFM Dimensions: {ifm_dim}')
-                    print(f'### OFM Channels: {ofm_ch}')
-                    print(f'### Kernel Dimensions: {kdim}')
-                    print(f'### Input precision: {inp_wl}')
-                    print(f'### Weight precision: {wgt_wl}')
-                    print(f'### Output precision: {out_wl}')
-                    print(f'### SIMD: {s}')
-                    print(f'### PE: {p}')
-                    if(inp_wl == 1 and wgt_wl == 1): ### XNOR
-                        print(f'### SIMD: XNOR')
-                        print("#######################################")
-                        ### Calling the HLS test script
-                        sp = subprocess.call(['./test_mvau_xnor.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(wgt_wl), str(out_wl), str(s), str(p)],
-                                             cwd = finn_tb)
-                        if(sp!=1):
-                            print("HLS XNOR Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        ### Calling the RTL test script
-                        sp = subprocess.call(['./test_mvau_xnor_rtl.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(1), str(wgt_wl), str(1), str(out_wl),
-                                              str(s), str(p)],
-                                             cwd = mvau_tb)
-                        if(sp!=1):
-                            print("RTL XNOR Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        success = 1 ### Run successfull
-                        ### Extracting results
-                        rpt_dict_key = "Config set: "+str(config_set)+" (XNOR)"
-                        rpt_lst = extract_data('mvau_xnor','mvau',
-                                               clk_per, finn_tb, mvau_env)
-                        rpt_dict[rpt_dict_key] = rpt_lst
-                    elif(wgt_wl == 1):
-                        print(f'### SIMD: Binary Weights')
-                        print("#######################################")
-                        ### Calling the HLS test script
-                        sp = subprocess.call(['./test_mvau_binwgt.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(wgt_wl), str(out_wl), str(s), str(p)],
-                                             cwd = finn_tb)
-                        if(sp!=1):
-                            print("HLS Binary Weight Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        ### Calling the RTL test script
-                        sp = subprocess.call(['./test_mvau_binwgt_rtl.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(0), str(wgt_wl), str(1), str(out_wl),
-                                              str(s), str(p)],
-                                             cwd = mvau_tb)
-                        if(sp!=1):
-                            print("RTL Binary Weight Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        success = 1 ### Run successfull
-                        ### Extracting results
-                        rpt_dict_key = "Config set: "+str(config_set)+" (BIN WGT)"
-                        rpt_lst = extract_data('mvau_binwgt','mvau',
-                                               clk_per, finn_tb, mvau_env)
-                        rpt_dict[rpt_dict_key] = rpt_lst
-                    else:
-                        print(f'### SIMD: Standard')
-                        print("#######################################")
-                        ### Calling the HLS test script
-                        sp = subprocess.call(['./test_mvau_std.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(inp_sgn), str(wgt_wl), str(wgt_sgn),
-                                              str(out_wl), str(s), str(p)],
-                                             cwd = finn_tb)
-                        if(sp!=1):
-                            print("HLS Standard Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        ### Calling the RTL test script
-                        sp = subprocess.call(['./test_mvau_std_rtl.sh',
-                                              str(ifm_ch), str(ifm_dim), str(ofm_ch), str(kdim),
-                                              str(inp_wl), str(0), str(wgt_wl), str(0), str(op_sgn),
-                                              str(out_wl), str(s), str(p)],
-                                             cwd = mvau_tb)
-                        if(sp!=1):
-                            print("RTL Standard Test Failed")
-                            if(success==1):
-                                write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
-                            sys.exit(1)
-                        success = 1 ### Run successfull
-                        ### Extracting results
-                        rpt_dict_key = "Config set: "+str(config_set)+" (STD)"
-                        rpt_lst = extract_data('mvau_std','mvau',
-                                               clk_per, finn_tb, mvau_env)
-                        rpt_dict[rpt_dict_key] = rpt_lst
-
-                    print(f'"RTL and Synthesis complete for config set: {config_set}"')
-                    if(config_set == 0):
-                        with open("config_log.txt","w") as f:
-                            f.write(f'Config set: {config_set}\n')
-                    else:
-                        with open("config_log.txt","a") as f:
-                            f.write(f'Config set: {config_set}\n')
-                    config_set = config_set + 1
-
-    write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
+    ### Configuration sets to be run, invalid ones and duplicates are removed before numbering
+    skipped = []
+    config_lst = list(enumerate(sweep_points(spec, True, skipped)))
+    for config_set, pt in config_lst:
+        ### Preparing a dict to write to a file with config details
+        config_dict[str(config_set)] = list(pt[:9])
+    ### Configuration sets are identified in the journal by their configuration and RTL test script
+    config_keys = {config_set: config_key(pt[:9], pt.inp_sgn, pt.wgt_sgn, pt.op_sgn, clk_per,
+                                          flow_scripts(spec, pt.flavour)[1])
+                   for config_set, pt in config_lst}
+    ### Run time model fitted to the previous sweeps
+    model = fit_exec(db_file, spec['arch'])
+
+    ### Listing the configuration sets not found in the journal, without running them
+    if(dry_run):
+        if(not restart and os.path.isfile(journal_file)):
+            journal = SweepJournal(journal_file)
+            config_lst = [c for c in config_lst if journal.lookup(config_keys[c[0]]) is None]
+        print_plan(spec, config_lst, skipped, model, jobs)
+        return 0
+
+    ### Registering the sweep in the results database
+    if(sweep is None):
+        sweep = time.strftime("%Y%m%d-%H%M%S")
+    db = ResultsDB(db_file)
+    db.add_sweep(sweep, "regtest_mvau_"+spec['arch'], config_col_names, rpt_col_names)
+    print(f'Results written to sweep {sweep} of {db_file}')
+
+    ### Skipping configuration sets completed by a previous run
+    journal = SweepJournal(journal_file, restart)
+    run_lst = []
+    for config_set, pt in config_lst:
+        rec = journal.lookup(config_keys[config_set])
+        if(rec is None):
+            run_lst.append((config_set, pt))
+            continue
+        ### Renumbering the report key in case configuration sets were added or removed
+        rpt_dict_key = "Config set: "+str(config_set)+rec['rpt_key'][rec['rpt_key'].index(" ("):]
+        rpt_dict[rpt_dict_key] = rec['rpt']
+        db.add_result(sweep, config_set, rpt_dict_key, config_dict[str(config_set)], rec['rpt'])
+        print(f'Config set {config_set} found in {journal_file}, skipping')
+    config_lst = run_lst
+
+    ### Event log, stage limits, sampling interval, simulation shards, snapshots and simulator inherited by the worker processes and test scripts
+    if(event_file is not None):
+        event_file = os.path.abspath(event_file)
+        os.environ['MVAU_EVENT_LOG'] = event_file
+        print(f'Stages timed in {event_file}')
+    if(len(spec['limits']) > 0):
+        os.environ['MVAU_LIMITS'] = json.dumps(spec['limits'])
+        print(f'Stage limits: {spec["limits"]}')
+    os.environ['MVAU_MONITOR_INTERVAL'] = str(interval)
+    os.environ['MVAU_SIM_SHARDS'] = str(shards)
+    os.environ['MVAU_SNAPSHOT_CACHE'] = os.path.abspath(snapshot_dir)
+    os.environ['MVAU_SIMULATOR'] = spec['simulator']
+    os.environ['MVAU_VERILATOR_THREADS'] = str(spec['sim_threads'])
+    if(spec['simulator'] == 'verilator'):
+        print(f'RTL simulations run with Verilator (experimental, unvalidated), {spec["sim_threads"]} threads per model')
+    if(shards > 1):
+        print(f'RTL simulations split into {shards} shards, the RTL latency is not reported (N/A)')
+    started = time.time()
+
+    ### Overlapped flows take a licence token each
+    if(overlap and licences is not None and licences < 2):
+        print("Two licence tokens are needed to run the HLS and RTL flows at the same time, running them one after the other")
+        overlap = False
+    if(overlap and licences is None):
+        licences = 2*jobs
+
+    if(jobs <= 1):
+        ### Configuration sets of the same hardware shape one after the other, reusing their snapshot
+        config_lst = shape_first(config_lst)
+        for config_set, pt in config_lst:
+            rtl_work = make_rtl_dir(work_root, config_set, mvau_env) if(overlap and can_overlap(spec, pt)) else None
+            rpt_dict_key, rpt_lst, rpt_hashes = run_config(config_set, pt, spec, finn_tb, mvau_env, mvau_tb,
+                                                           None, rtl_work)
+            if(rtl_work is not None and rpt_lst is not None):
+                remove_work_dir(work_root, config_set)
+            store_stages(db, sweep, config_set, event_file, started)
+            if(rpt_lst is None):
+                if(len(rpt_dict) > 0):
+                    write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
+                sys.exit(1)
+            rpt_dict[rpt_dict_key] = rpt_lst
+            journal.append(config_keys[config_set], config_set, rpt_dict_key, rpt_lst, rpt_hashes)
+            db.add_result(sweep, config_set, rpt_dict_key, config_dict[str(config_set)], rpt_lst)
+            print(f'"RTL and Synthesis complete for config set: {config_set}"')
+            log_config(config_set, config_set == config_lst[0][0])
+        rpt_items = sorted(rpt_dict.items(), key=lambda kv: int(kv[0].split()[2]))
+        rpt_dict.clear()
+        rpt_dict.update(rpt_items)
+        write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
+        return 0
+
+    ### Running the configuration sets in parallel, each in its own work directory,
+    ### longest first so that short ones fill up the jobs at the end of the sweep
+    finn_env = os.path.dirname(os.path.normpath(finn_tb))
+    failed = []
+    sched = SlotScheduler(jobs, licences, mem)
+    queue = []
+    for config_set, pt in longest_first(config_lst, model):
+        flows = 2 if(overlap and can_overlap(spec, pt)) else 1
+        queue.append((config_set, pt, job_mem(pt, flows), flows))
+    running = dict()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as executor:
+        while(len(queue) > 0 or len(running) > 0):
+            ### Starting the longest configuration sets which fit the free licences and memory
+            while(len(queue) > 0):
+                idx = sched.pick([(m, lic) for _, _, m, lic in queue])
+                if(idx is None):
+                    break
+                config_set, pt, pt_mem, pt_lic = queue.pop(idx)
+                sched.start(pt_mem, pt_lic)
+                running[executor.submit(run_config_isolated, config_set, pt, spec, finn_env, mvau_env,
+                                        work_root, pt_lic == 2)] = (config_set, pt_mem, pt_lic)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                config_set, pt_mem, pt_lic = running.pop(future)
+                sched.finish(pt_mem, pt_lic)
+                ### An exception in the worker only fails its configuration set, the others are still run
+                try:
+                    config_set, rpt_dict_key, rpt_lst, rpt_hashes = future.result()
+                except Exception as e:
+                    print(f'Config set {config_set} raised {type(e).__name__}: {e}')
+                    rpt_lst = None
+                store_stages(db, sweep, config_set, event_file, started)
+                if(rpt_lst is None):
+                    print(f'Config set {config_set} failed, work directory kept in {work_root}')
+                    failed.append(config_set)
+                    continue
+                rpt_dict[rpt_dict_key] = rpt_lst
+                journal.append(config_keys[config_set], config_set, rpt_dict_key, rpt_lst, rpt_hashes)
+                db.add_result(sweep, config_set, rpt_dict_key, config_dict[str(config_set)], rpt_lst)
+                print(f'"RTL and Synthesis complete for config set: {config_set}"')
+                log_config(config_set, len(rpt_dict) == 1)
+
+    ### Keeping the output file in the order of the configuration sets
+    rpt_items = sorted(rpt_dict.items(), key=lambda kv: int(kv[0].split()[2]))
+    rpt_dict.clear()
+    rpt_dict.update(rpt_items)
+    if(len(rpt_dict) > 0):
+        write_rpt_file(rpt_dict, rpt_col_names, config_dict, config_col_names, out_file)
+    if(len(failed) > 0):
+        print(f'Failed config sets: {sorted(failed)}')
+        sys.exit(1)
     return 0
 
 # Function: parser
@@ -574,78 +868,65 @@ def parser():
     parser = argparse.ArgumentParser(description='Python data script for regression test for FINN HLS and RTL implementation')
     parser.add_argument('-o','--out_file',default="mvau_report.xlsx",
 			help="Output file")
+    parser.add_argument('-j','--jobs',default=1,type=int,
+			help="Number of configuration sets run in parallel")
+    parser.add_argument('-w','--work_dir',default="sweep_work",
+			help="Directory for the work directories of parallel runs")
+    parser.add_argument('--journal',default="mvau_journal.jsonl",
+			help="Journal file of completed configuration sets")
+    parser.add_argument('--restart',action='store_true',
+			help="Ignore the journal and run all configuration sets")
+    parser.add_argument('--db',default="mvau_results.db",
+			help="Results database file")
+    parser.add_argument('--sweep',default=None,
+			help="Name of the sweep in the results database")
+    parser.add_argument('-s','--spec',default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweeps", "mvau.json"),
+			help="Sweep specification file")
+    parser.add_argument('--plan',default=None,
+			help="Sweep plan (written by mvau_fold_opt.py or mvau_net_plan.py) replacing the configurations of the sweep specification")
+    parser.add_argument('--licences',default=None,type=int,
+			help="Number of tool licence tokens shared by parallel runs, one for every job by default")
+    parser.add_argument('--mem',default=None,type=float,
+			help="Memory budget (GB) of parallel runs, the memory of the host by default")
+    parser.add_argument('--overlap',action='store_true',
+			help="Run the HLS and RTL flows of each configuration set at the same time, using golden data for the RTL flow")
+    parser.add_argument('--events',default="mvau_events.jsonl",
+			help="Event log timing the stages of all configuration sets")
+    parser.add_argument('--interval',default=1.0,type=float,
+			help="Interval (seconds) at which the child processes of each stage are sampled")
+    parser.add_argument('--shards',default=1,type=int,
+			help="Number of shards of output pixels simulated in parallel by each RTL simulation")
+    parser.add_argument('--snapshots',default="mvau_snapshots",
+			help="Cache of the RTL simulation snapshots, shared by all configuration sets")
+    parser.add_argument('--force_verilator',action='store_true',
+			help="Allow the sweep specification to select the experimental Verilator simulator, not yet validated against xsim")
+    parser.add_argument('-n','--dry_run',action='store_true',
+			help="List the configuration sets with their estimated run times without running them")
     return parser
 
 # Function: __main__
 # Entry point of the file, retrieves the command line argument,
-# defines different parameters and environment variables and
+# reads the sweep specification and environment variables and
 # calls the main function to run the regression tests
 if __name__ == '__main__':
 
-    kdim_arr    = np.array([4])#3,4,5,6,7,8,9])
-    ### Keep the length of the following three arrays same
-    ifm_ch_arr  = np.array([64])
-                            # 2,4,8,16,32,64,
-                            # 64,64,64,64,64,64,
-                            # 64,64,64,64,64,64])
-    ofm_ch_arr  = np.array([64])
-                            # ,64,64,64,64,64,
-                            # 2,4,8,16,32,64])
-    ifm_dim_arr = np.array([8])
-                            # ,32,32,32,32,32,
-                            # 32,32,32,32,32,32,
-                            # 2,4,8,16,32,64])
-
-    ### Keep the length of the following two arrays same
-    inp_wl_arr  = np.array([4])#,3,4])
-    inp_wl_sgn  = np.array([0])#,0,0]) ## 0 for unsigned and 1 for signed
-    wgt_wl_arr  = np.array([4])#,3,4])
-    wgt_wl_sgn  = np.array([0])#,0,0]) ## 0 for unsigned and 1 for signed
-    out_wl_arr = np.array([16])#,16,16])
-    #   min(16,inp_wl+wgt_wl+ceil(log2(kdim*kdim*ifm_ch)))
-
-    ### Keep the length of the following two arrays same
-    pe = np.array([32])
-    # 2,2,2,2,2,2,2,
-    # 4,4,4,4,4,4,4,
-    # 8,8,8,8,8,8,8,
-    # 16,16,16,16,16,16,16,
-    # 32,32,32,32,32,32,32,
-    # 64,64,64,64,64,64,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64])
-
-    simd = np.array([32])
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 1,2,4,8,16,32,64,
-    # 2,2,2,2,2,2,2,
-    # 4,4,4,4,4,4,4,
-    # 8,8,8,8,8,8,8,
-    # 16,16,16,16,16,16,16,
-    # 32,32,32,32,32,32,32,
-    # 64,64,64,64,64,64,64])
-
-    clk_per = [5.0, 10.0] # [rtl, hls]
-
-    # ### Keep the length of the following two arrays same
-
     args = parser().parse_args()
+    spec = read_spec(args.spec)
+    ### Reading the configurations from a sweep plan, keeping the unit and test scripts of the sweep
+    if(args.plan is not None):
+        spec['axes'] = plan_axes(read_plan(args.plan))
     out_file = args.out_file
+    jobs = args.jobs
+    work_root = os.path.abspath(args.work_dir)
 
-    mvau_env = os.environ.get('MVAU_RTL_ROOT')
+    mvau_env = os.environ.get('MVAU_RTL_ROOT', '')
     mvau_tb = mvau_env+'/proj/RegressionTests'
-    finn_env = os.environ.get('FINN_HLS_ROOT')
+    finn_env = os.environ.get('FINN_HLS_ROOT', '')
     finn_tb = finn_env+'/tb/'
 
-    main(kdim_arr, ifm_ch_arr, ofm_ch_arr, ifm_dim_arr, inp_wl_arr, inp_wl_sgn,
-         wgt_wl_arr, wgt_wl_sgn, simd, pe, clk_per, finn_tb, mvau_env, mvau_tb, out_file)
+    main(spec, finn_tb, mvau_env, mvau_tb, out_file,
+         jobs, work_root, args.journal, args.restart, args.db, args.sweep, args.dry_run,
+         args.licences, args.mem, args.overlap, args.events, args.interval, args.shards, args.snapshots,
+         args.force_verilator)
 
     sys.exit(0)
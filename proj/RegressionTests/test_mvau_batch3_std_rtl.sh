@@ -4,6 +4,8 @@
 # 1) Generates parameter definition file
 # 2) Runs RTL functional simulation
 # 3) Runs RTL synthesis
+# Stages are timed by mvau_events.py when MVAU_EVENT_LOG is set
+span="python $MVAU_RTL_ROOT/proj/RegressionTests/mvau_events.py run"
 echo "Generating parameter file"
 cd $MVAU_RTL_ROOT/proj/src/mvau_top/
 ifm_ch=${1:-4}
@@ -19,65 +21,25 @@ out_wl=${10:-16}
 simd=${11:-2}
 pe=${12:-2}
 
-echo "Generating Verilog Top-Level Wrapper"
-python gen_mvau_top.py --ifm_ch ${ifm_ch} --ifm_dim ${ifm_dim} --ofm_ch ${ofm_ch} --kdim ${kdim} --inp_wl ${inp_wl} --inp_bin ${inp_bin} --wgt_wl ${wgt_wl} --wgt_bin ${wgt_bin} --op_sgn ${op_sgn} --out_wl ${out_wl} --simd ${simd} --pe ${pe}
+echo "Generating MVAU design and simulation files"
+$span gen -- python $MVAU_RTL_ROOT/proj/sim/gen_mvau_artifacts.py --ifm_ch ${ifm_ch} --ifm_dim ${ifm_dim} --ofm_ch ${ofm_ch} --kdim ${kdim} --inp_wl ${inp_wl} --inp_bin ${inp_bin} --wgt_wl ${wgt_wl} --wgt_bin ${wgt_bin} --op_sgn ${op_sgn} --out_wl ${out_wl} --simd ${simd} --pe ${pe}
 if [ $? -eq 0 ]; then
-    echo "Verilog top level wrapper file generation successfull"
+    echo "Design and simulation files generation successfull"
 else
-    echo "Verilog top level wrapper file generation failed"
+    echo "Design and simulation files generation failed"
     exit 0
 fi
 
-echo "Generating MVAU weight files"
-python gen_mvau_weight_mem_merged.py --pe ${pe}
-if [ $? -eq 0 ]; then
-    echo "Weight top level file generation successfull"
-else
-    echo "Weight top level file generation failed"
-    exit 0
-fi
-
-rm mvau_weight_mem[0-9]*.sv
-for((p=0; p<${pe}; p++))
-do
-    python gen_mvau_weight_mem.py --wmem_id ${p}
-    if [ $? -eq 0 ]; then
-	echo "Weight memories generation successfull"
-    else
-	echo "Weight memories failed"
-	exit 0
-    fi
-done
-
 ### temporary creating new set of weight memories for IP generation
-./create_mem.sh weight_mem_batch3.mem
+python $MVAU_RTL_ROOT/proj/sim/mvau_wgt_layout.py split weight_mem_batch3.mem --kdim ${kdim} --ifm_ch ${ifm_ch} --ofm_ch ${ofm_ch} --wgt_wl ${wgt_wl} --simd ${simd} --pe ${pe}
 
 cd $MVAU_RTL_ROOT/proj/sim
-cut -c3- inp_act.mem > temp
-cp temp inp_act.mem
+python $MVAU_RTL_ROOT/proj/sim/mvau_mem.py strip inp_act.mem
 ### temporary creating new set of weight memories for IP generation
-./create_mem.sh weight_mem_batch3.mem
-
-echo "Generating parameter file"
-python gen_mvau_defn.py --ifm_ch ${ifm_ch} --ifm_dim ${ifm_dim} --ofm_ch ${ofm_ch} --kdim ${kdim} --inp_wl ${inp_wl} --inp_bin ${inp_bin} --wgt_wl ${wgt_wl} --wgt_bin ${wgt_bin} --op_sgn ${op_sgn} --out_wl ${out_wl} --simd ${simd} --pe ${pe}
-if [ $? -eq 0 ]; then
-    echo "Parameter file generation successfull"
-else
-    echo "Parameter file generation failed"
-    exit 0
-fi
-
-echo "Generating Project file for simulation"
-python gen_mvau_files.py --pe ${pe}
-if [ $? -eq 0 ]; then
-    echo "Simulation project file generation successfull"
-else
-    echo "Simulation project file generation failed"
-    exit 0
-fi
+python $MVAU_RTL_ROOT/proj/sim/mvau_wgt_layout.py split weight_mem_batch3.mem --kdim ${kdim} --ifm_ch ${ifm_ch} --ofm_ch ${ofm_ch} --wgt_wl ${wgt_wl} --simd ${simd} --pe ${pe}
 
 echo "Running behavorial simulation of RTL"
-bash mvau_test_v3.sh
+$span --ok 1 sim -- bash mvau_test_v3.sh
 if [ $? -eq 0 ]; then
     echo "RTL simulation failed"
     exit 0
@@ -108,12 +70,17 @@ fi
 
 echo "Synthesizing MVAU Batch RTL"
 cd $MVAU_RTL_ROOT/proj/syn
-vivado -mode batch -source mvau_synth.tcl -tclargs ${pe}
-if [ $? -eq 0 ]; then
-    echo "RTL synthesis successfull"
+if python $MVAU_RTL_ROOT/proj/RegressionTests/mvau_synth_cache.py lookup mvau_synth.tcl ${pe}; then
+    echo "RTL synthesis results restored from cache"
 else
-    echo "RTL synthesis failed"
-    exit 0
+    $span synth -- vivado -mode batch -source mvau_synth.tcl -tclargs ${pe}
+    if [ $? -eq 0 ]; then
+        echo "RTL synthesis successfull"
+        python $MVAU_RTL_ROOT/proj/RegressionTests/mvau_synth_cache.py store mvau_synth.tcl ${pe}
+    else
+        echo "RTL synthesis failed"
+        exit 0
+    fi
 fi
 # cd $MVAU_RTL_ROOT/proj/sim
 # bash mvau_timesim_test.sh
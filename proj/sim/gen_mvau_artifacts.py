@@ -0,0 +1,193 @@
+ #
+ # Python Script: MVAU Design Files Generator (gen_mvau_artifacts.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file generates the complete set of design and simulation files for
+ # one configuration of the MVAU in a single process, i.e., the Verilog top
+ # level wrapper, the weight memories and their top level file, the parameter
+ # package and the simulation project file. It calls the generator functions of
+ # the individual scripts directly, so it can also be imported and called by the
+ # regression test scripts without starting a new interpreter for each file.
+ #
+ # The files are rendered in memory (mvau_gen_file.py) and only written if their
+ # contents changed, and only the weight memories beyond the PE of the
+ # configuration are removed, so that the files shared by neighbouring
+ # configurations keep their timestamps and the tools reading them can skip
+ # them. The number of files written and left unchanged is printed.
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import sys
+import os
+import re
+import glob
+import argparse
+from collections import namedtuple
+
+# Variable: mvau_root
+# Path to the MVAU RTL directory, relative to this file
+mvau_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+sys.path.insert(0, os.path.join(mvau_root, "proj", "src", "mvau_top", "mvau_stream"))
+sys.path.insert(0, os.path.join(mvau_root, "proj", "src", "mvau_top"))
+sys.path.insert(0, os.path.join(mvau_root, "proj", "sim"))
+from gen_mvau_top import gen_mvau_top
+from gen_mvau_weight_mem import gen_mvau_weight_mem
+from gen_mvau_weight_mem_merged import gen_mvau_weight_mem_merged
+from gen_mvau_stream_top import gen_mvau_stream_top
+from gen_mvau_defn import gen_mvau_defn
+from gen_mvau_files import gen_mvau_files
+
+# Variable: MvauConfig
+# A named tuple holding one configuration of the MVAU. The fields are in the
+# same order as the arguments of the regression test shell scripts
+MvauConfig = namedtuple('MvauConfig', ['ifm_ch', 'ifm_dim', 'ofm_ch', 'kdim', 'inp_wl', 'inp_bin',
+                                       'wgt_wl', 'wgt_bin', 'op_sgn', 'out_wl', 'simd', 'pe',
+                                       'mmv', 'stride'],
+                        defaults=[4, 4, 4, 2, 8, 0, 1, 1, 0, 16, 2, 2, 1, 1])
+
+# Function: remove_stale_wmem
+# This function removes the weight memory files left over from a configuration
+# with a larger PE
+#
+# Parameters:
+#   src_dir - Folder of the weight memory files
+#   pe - Number of processing elements of the configuration
+#
+# Returns:
+#
+#   removed - List of the removed files
+def remove_stale_wmem(src_dir, pe):
+    removed = []
+    for f in sorted(glob.glob(os.path.join(src_dir, "mvau_weight_mem[0-9]*.sv"))):
+        m = re.fullmatch(r"mvau_weight_mem(\d+)\.sv", os.path.basename(f))
+        if(m is not None and int(m.group(1)) >= pe):
+            os.remove(f)
+            removed.append(f)
+    return removed
+
+# Function: report
+# This function prints the number of generated files written and left unchanged
+#
+# Parameters:
+#   changed - List of the values returned by the generator functions
+#   removed - List of the removed files
+#
+# Returns:
+#
+# None
+def report(changed, removed=()):
+    print(f'Design files: {sum(changed)} written, {len(changed)-sum(changed)} unchanged, {len(removed)} removed')
+
+# Function: gen_mvau_artifacts
+# This function generates all design and simulation files of the MVAU batch unit.
+# Weight memory files left over from a configuration with a larger PE are removed
+#
+# Parameters:
+#   cfg - MVAU configuration (MvauConfig)
+#   root - The path to the MVAU RTL directory
+#
+# Returns:
+#
+# None
+def gen_mvau_artifacts(cfg, root=mvau_root):
+    src_dir = os.path.join(root, "proj", "src", "mvau_top")
+    sim_dir = os.path.join(root, "proj", "sim")
+
+    changed = [gen_mvau_top(cfg.kdim,cfg.inp_wl,cfg.inp_bin,cfg.ifm_ch,cfg.ofm_ch,cfg.ifm_dim,
+                            cfg.wgt_wl,cfg.wgt_bin,cfg.op_sgn,cfg.out_wl,cfg.simd,cfg.pe,
+                            cfg.mmv,cfg.stride,src_dir)]
+    changed.append(gen_mvau_weight_mem_merged(cfg.pe,src_dir))
+    removed = remove_stale_wmem(src_dir, cfg.pe)
+    for p in range(cfg.pe):
+        changed.append(gen_mvau_weight_mem(p,src_dir))
+    changed.append(gen_mvau_defn(cfg.kdim,cfg.inp_wl,cfg.inp_bin,cfg.ifm_ch,cfg.ofm_ch,cfg.ifm_dim,
+                                 cfg.wgt_wl,cfg.wgt_bin,cfg.op_sgn,cfg.out_wl,cfg.simd,cfg.pe,
+                                 cfg.mmv,cfg.stride,sim_dir))
+    changed.append(gen_mvau_files(cfg.pe,sim_dir))
+    report(changed, removed)
+
+# Function: gen_mvau_stream_artifacts
+# This function generates all design and simulation files of the MVAU stream unit
+#
+# Parameters:
+#   cfg - MVAU configuration (MvauConfig)
+#   root - The path to the MVAU RTL directory
+#
+# Returns:
+#
+# None
+def gen_mvau_stream_artifacts(cfg, root=mvau_root):
+    stream_dir = os.path.join(root, "proj", "src", "mvau_top", "mvau_stream")
+    sim_dir = os.path.join(root, "proj", "sim")
+
+    changed = [gen_mvau_stream_top(cfg.kdim,cfg.inp_wl,cfg.inp_bin,cfg.ifm_ch,cfg.ofm_ch,cfg.ifm_dim,
+                                   cfg.wgt_wl,cfg.wgt_bin,cfg.out_wl,cfg.simd,cfg.pe,
+                                   cfg.stride,cfg.mmv,cfg.op_sgn,stream_dir)]
+    changed.append(gen_mvau_defn(cfg.kdim,cfg.inp_wl,cfg.inp_bin,cfg.ifm_ch,cfg.ofm_ch,cfg.ifm_dim,
+                                 cfg.wgt_wl,cfg.wgt_bin,cfg.op_sgn,cfg.out_wl,cfg.simd,cfg.pe,
+                                 cfg.mmv,cfg.stride,sim_dir))
+    report(changed)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python data script for generating all MVAU design and simulation files')
+    parser.add_argument('-k','--kdim',default=2,type=int,
+			help="Filter dimension")
+    parser.add_argument('-i','--inp_wl',default=8,type=int,
+			help="Input word length")
+    parser.add_argument('--inp_bin',default=0,type=int,
+                        help="Inputs binary or fixed point")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+			help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+			help="Output feature map channels")
+    parser.add_argument('--ifm_dim', default=4, type=int,
+			help="Input feature map dimensions")
+    parser.add_argument('-w','--wgt_wl',default=1,type=int,
+                        help="Weight word length")
+    parser.add_argument('--wgt_bin',default=1,type=int,
+                        help="Weights binary or fixed point")
+    parser.add_argument('--op_sgn',default=0,type=int,
+                        help="Enumerated values for signed/unsigned input activation/weights")
+    parser.add_argument('-o','--out_wl', default=16, type=int,
+			help="Output word length")
+    parser.add_argument('-s','--simd',default=2,type=int,
+			help="SIMD")
+    parser.add_argument('-p', '--pe', default=2,type=int,
+			help="PE")
+    parser.add_argument('-m', '--mmv', default=1,type=int,
+			help="MMV")
+    parser.add_argument('--stride', default=1,type=int,
+			help="Convolution stride")
+    parser.add_argument('--stream', action='store_true',
+			help="Generate files for the MVAU stream unit")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# generates all files of the batch or stream unit
+if __name__ == "__main__":
+
+    ## Reading the argument list passed to this script
+    args = parser().parse_args()
+    cfg = MvauConfig(args.ifm_ch,args.ifm_dim,args.ofm_ch,args.kdim,
+                     args.inp_wl,args.inp_bin,args.wgt_wl,args.wgt_bin,
+                     args.op_sgn,args.out_wl,args.simd,args.pe,
+                     args.mmv,args.stride)
+
+    ## Generating the design and simulation files
+    if(args.stream):
+        gen_mvau_stream_artifacts(cfg)
+    else:
+        gen_mvau_artifacts(cfg)
+
+    sys.exit(0)
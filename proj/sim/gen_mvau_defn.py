@@ -13,7 +13,9 @@
 
 import numpy as np
 import sys
+import os
 import argparse
+from mvau_gen_file import GenFile
 
 # Function: gen_mvau_defn 
 # This function takes in a number of parameters and generates the parameter
@@ -32,12 +34,13 @@ import argparse
 #   pe - Number of processing elements (PE)
 #   mmv - Number of images
 #   stride - Convolution stride
+#   out_dir - Directory where the file is written
 #
 # Returns:
 #
-# None
-def gen_mvau_defn(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,stride=1):
-    mvau_defn = open("mvau_defn.sv","wt")
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_defn(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,stride=1,out_dir="."):
+    mvau_defn = GenFile(os.path.join(out_dir,"mvau_defn.sv"))
     #stride=1
     pad=0
     #mmv=1    
@@ -115,6 +118,7 @@ def gen_mvau_defn(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,str
     mvau_defn.write("`endif\n")
 
     mvau_defn.close()
+    return mvau_defn.changed
 
 # Function: parser
 # This function defines an ArgumentParser object for command line arguments
@@ -15,16 +15,23 @@
  
 import numpy as np
 import sys
+import os
 import argparse
+from mvau_gen_file import GenFile
 
 # Function: gen_mvau_files
 # This function generates the file by using a series of write commands
 #
 # Parameter:
 # pe - Number of processing elements
-def gen_mvau_files(pe):
-    fname = "mvau_files.prj"
-    mvau_files = open(fname,"wt")
+# out_dir - Directory where the file is written
+#
+# Returns:
+#
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_files(pe,out_dir="."):
+    fname = os.path.join(out_dir,"mvau_files.prj")
+    mvau_files = GenFile(fname)
 
     mvau_files.write("sv work mvau_tb_v1.sv\n")
     mvau_files.write("sv work mvau_tb_v3.sv\n")
@@ -50,6 +57,7 @@ def gen_mvau_files(pe):
     #mvau_files.write("sv work ../src/mvau_top/mvau_stream/mvu_pe/mvu_pe_binacc.sv\n")
 
     mvau_files.close()
+    return mvau_files.changed
 
 # Function: parser
 # This function defines an ArgumentParser object for command line arguments
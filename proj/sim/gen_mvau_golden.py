@@ -0,0 +1,231 @@
+ #
+ # Python Script: MVAU Golden Model Generator (gen_mvau_golden.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file implements a bit-exact NumPy reference of the MVAU batch and
+ # stream datapath. The input feature maps are lowered using im2col and
+ # multiplied with the weight matrix using integer arithmetic that follows
+ # the SIMD, adder and accumulator units of the RTL (including truncation
+ # to TDstI bits). The input activation, expected output and weight memory
+ # files are written in the same layout as the ones dumped by the FINN HLS
+ # C-simulation, so that RTL-only regression tests can skip HLS entirely.
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import sys
+import os
+import argparse
+from mvau_mem import write_mem
+from mvau_wgt_layout import write_wgt_banks, write_wgt_stream
+
+# Function: simd_mode
+# This function selects the type of SIMD unit in the same way
+# as the generate blocks of mvu_pe.sv
+#
+# Parameters:
+#   iwl - Input activation word length
+#   iwb - '1' if input activation is binary (+1/-1), else '0'
+#   wwl - Weight precision
+#   wwb - '1' if weights are binary (+1/-1), else '0'
+#
+# Returns:
+#
+#   mode - One of 'xnor', 'bin_act', 'bin_wgt' or 'std'
+def simd_mode(iwl,iwb,wwl,wwb):
+    if(iwb == 1 and iwl == 1):
+        if(wwb == 1 and wwl == 1):
+            return 'xnor'
+        return 'bin_act'
+    elif(wwb == 1 and wwl == 1):
+        return 'bin_wgt'
+    return 'std'
+
+# Function: gen_rand_data
+# This function generates random data of a given word length. The data is
+# returned as the integer value used in the arithmetic, the bit pattern
+# written to the memory files is obtained by masking with 2^wl-1
+#
+# Parameters:
+#   rng - NumPy random generator
+#   shape - Shape of the data to be generated
+#   wl - Word length
+#   sgn - '1' if the data is signed, else '0'
+#
+# Returns:
+#
+#   data - Array of integers (int64)
+def gen_rand_data(rng,shape,wl,sgn):
+    if(sgn == 1):
+        return rng.integers(-2**(wl-1), 2**(wl-1), size=shape, dtype=np.int64)
+    return rng.integers(0, 2**wl, size=shape, dtype=np.int64)
+
+# Function: im2col
+# This function lowers the input feature maps to the input activation
+# matrix. Each row holds one output pixel with the kernel elements ordered
+# as (KDim row, KDim column, IFMCh), channels being the innermost dimension
+#
+# Parameters:
+#   ifm - Input feature maps, MMV x IFMDim x IFMDim x IFMCh
+#   kdim - Kernel dimension
+#   stride - Convolution stride
+#
+# Returns:
+#
+#   act - Input activation matrix, MMV x OFMDim^2 x (KDim^2*IFMCh)
+def im2col(ifm,kdim,stride=1):
+    mmv, ifmd, _, ifmc = ifm.shape
+    ofmd = (ifmd-kdim)//stride+1
+    win = np.lib.stride_tricks.sliding_window_view(ifm, (kdim,kdim), axis=(1,2))
+    win = win[:, :(ofmd-1)*stride+1:stride, :(ofmd-1)*stride+1:stride]
+    ### (MMV, OFMDim, OFMDim, IFMCh, KDim, KDim) -> (MMV, OFMDim, OFMDim, KDim, KDim, IFMCh)
+    win = win.transpose(0,1,2,4,5,3)
+    return win.reshape(mmv, ofmd*ofmd, kdim*kdim*ifmc)
+
+# Function: mvau_matmul
+# This function performs the matrix-matrix multiplication of the
+# input activation and weight matrix the way the SIMD units do it,
+# and truncates the result to the output word length
+#
+# Parameters:
+#   act - Input activation matrix, ... x MatrixW
+#   wgt - Weight matrix, MatrixH x MatrixW
+#   mode - SIMD type as returned by simd_mode
+#   owl - Output activation word length
+#
+# Returns:
+#
+#   out - Output activation matrix (unsigned bit pattern), ... x MatrixH
+def mvau_matmul(act,wgt,mode,owl):
+    if(mode == 'xnor'):
+        ### XNOR followed by popcount
+        out = act @ wgt.T + (1-act) @ (1-wgt).T
+    elif(mode == 'bin_act'):
+        ### 1'b0 => -1, 1'b1 => +1
+        out = (2*act-1) @ wgt.T
+    elif(mode == 'bin_wgt'):
+        out = act @ (2*wgt-1).T
+    else:
+        out = act @ wgt.T
+    return out & (2**owl-1)
+
+# Function: gen_mvau_golden
+# This function generates random input feature maps and weights,
+# computes the expected output and writes all memory files
+#
+# Parameters:
+#   kdim - Kernel dimension.
+#   iwl - Input activation word length.
+#   iwb - '1' if input word length '1' bit, else '0'.
+#   ifmc - Number of input feature map channels.
+#   ofmc - Number of output feature map channels.
+#   ifmd - Input feature map dimension.
+#   wwl - Weight precision.
+#   wwb - '1' if weights are '1' bit, else '0'
+#   op_sgn - Enumerated values showing signedness of input activation/weights
+#   owl - Output activation word length
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#   mmv - Number of images
+#   stride - Convolution stride
+#   seed - Seed of the random number generator
+#   out_dir - Directory for inp_act.mem, out_act.mem and inp_wgt.mem
+#   wmem_dir - Directory for the weight memory files (weight_mem<p>.mem), or a list
+#              of directories each of which is written with the weight memory files
+#
+# Returns:
+#
+#   act, wgt, out - Input activation, weight and output matrices
+def gen_mvau_golden(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv=1,stride=1,
+                    seed=None,out_dir=".",wmem_dir="."):
+    matrix_w = kdim*kdim*ifmc
+    matrix_h = ofmc
+    if(kdim > ifmd or matrix_w%simd != 0 or matrix_h%pe != 0):
+        raise ValueError("Invalid MVAU configuration: KDim=%d, IFMDim=%d, MatrixW=%d, MatrixH=%d, SIMD=%d, PE=%d"
+                         % (kdim, ifmd, matrix_w, matrix_h, simd, pe))
+    mode = simd_mode(iwl,iwb,wwl,wwb)
+    ### Binary data is always generated as bit patterns
+    act_sgn = 1 if (mode == 'std' and op_sgn in (1,3)) else 0
+    wgt_sgn = 1 if (mode == 'std' and op_sgn in (2,3)) else 0
+
+    rng = np.random.default_rng(seed)
+    ifm = gen_rand_data(rng, (mmv,ifmd,ifmd,ifmc), iwl, act_sgn)
+    wgt = gen_rand_data(rng, (matrix_h,matrix_w), wwl, wgt_sgn)
+    act = im2col(ifm,kdim,stride)
+    out = mvau_matmul(act,wgt,mode,owl)
+
+    ### Input activation: [MMV][OFMDim^2][SF] words of [0:SIMD-1][TSrcI-1:0]
+    act_bits = (act & (2**iwl-1)).reshape(-1, simd)
+    write_mem(os.path.join(out_dir,"inp_act.mem"), act_bits, iwl)
+    ### Output activation: [MMV][OFMDim^2][MatrixH] words of TDstI bits
+    write_mem(os.path.join(out_dir,"out_act.mem"), out.reshape(-1,1), owl)
+
+    ### Weight memories: row nf*PE+p of the weight matrix goes to PE p
+    for d in ([wmem_dir] if isinstance(wmem_dir, str) else wmem_dir):
+        write_wgt_banks(wgt, simd, pe, wwl, d)
+    ### Weight stream: [NF][SF] words of [PE-1:0][0:SIMD-1][TW-1:0]
+    write_wgt_stream(os.path.join(out_dir,"inp_wgt.mem"), wgt, simd, pe, wwl)
+
+    return act, wgt, out
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python data script for generating MVAU golden input/output data')
+    parser.add_argument('-k','--kdim',default=2,type=int,
+			help="Filter dimension")
+    parser.add_argument('-i','--inp_wl',default=8,type=int,
+			help="Input word length")
+    parser.add_argument('--inp_bin',default=0,type=int,
+                        help="Inputs binary or fixed point")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+			help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+			help="Output feature map channels")
+    parser.add_argument('--ifm_dim', default=4, type=int,
+			help="Input feature map dimensions")
+    parser.add_argument('-w','--wgt_wl',default=1,type=int,
+                        help="Weight word length")
+    parser.add_argument('--wgt_bin',default=1,type=int,
+                        help="Weights binary or fixed point")
+    parser.add_argument('--op_sgn',default=0,type=int,
+                        help="Enumerated values for signed/unsigned input activation/weights")
+    parser.add_argument('-o','--out_wl', default=16, type=int,
+			help="Output word length")
+    parser.add_argument('-s','--simd',default=2,type=int,
+			help="SIMD")
+    parser.add_argument('-p', '--pe', default=2,type=int,
+			help="PE")
+    parser.add_argument('-m', '--mmv', default=1,type=int,
+			help="MMV")
+    parser.add_argument('--stride', default=1,type=int,
+			help="Convolution stride")
+    parser.add_argument('--seed', default=None,type=int,
+			help="Seed for the random number generator")
+    parser.add_argument('--wmem_dir', nargs='+', default=["."],
+			help="Directories where the weight memory files are written")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# calls the gen_mvau_golden function with the required arguments
+if __name__ == "__main__":
+
+    ## Reading the argument list passed to this script
+    args = parser().parse_args()
+
+    ## Generating the golden data
+    gen_mvau_golden(args.kdim,args.inp_wl,args.inp_bin,
+                    args.ifm_ch,args.ofm_ch,args.ifm_dim,
+                    args.wgt_wl,args.wgt_bin,args.op_sgn,
+                    args.out_wl,args.simd,args.pe,args.mmv,args.stride,
+                    args.seed,".",args.wmem_dir)
+
+    sys.exit(0)
@@ -0,0 +1,179 @@
+ #
+ # Python Script: MVAU Output Comparator (mvau_cmp.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file compares all outputs of the DUT, dumped by the v3 test benches
+ # when run with the plusarg +DUMP_OUT (out_dump.mem), with the golden data
+ # (out_act.mem), instead of stopping the simulation at the first mismatch.
+ # Both files hold one output element of TDstI bits per word in the order
+ # [MMV][OFMDim*OFMDim][MatrixH], output channel c of an output pixel being
+ # computed by PE c%PE in neuron fold c/PE. The whole output is compared at
+ # once using NumPy and the following are reported:
+ # - The number of outputs compared, missing (the DUT produced fewer outputs
+ #   than expected) and extra, and the number of mismatches, including outputs
+ #   with unknown (X/Z) bits
+ # - The number of mismatches of each PE and of each neuron fold, and the full
+ #   map of mismatches per neuron fold and PE
+ # - The first mismatches with their image, output pixel, output channel, PE and fold
+ # The exit status is 0 if all outputs match and 1 otherwise.
+ #
+ # The dimensions are read from the package file (mvau_defn.sv) of the
+ # configuration set being simulated.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_cmp.py                                      - Compares out_dump.mem with out_act.mem
+ # python mvau_cmp.py -n 50 -m cmp_map.csv                 - Lists the first 50 mismatches and writes the full map
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import re
+import sys
+import argparse
+from mvau_mem import mem_chars, decode_mem, nib_lut
+
+# Function: read_defn
+# This function reads the integer parameters of a package file written by
+# gen_mvau_defn.py along with the derived dimensions of the output
+#
+# Parameters:
+#   defn_file - Package file name
+#
+# Returns:
+#
+#   params - Dictionary of the parameters, for e.g. params['PE']
+def read_defn(defn_file):
+    try:
+        with open(defn_file) as f:
+            defn = f.read()
+    except:
+        print("Cannot read the package file")
+        raise
+    params = {k: int(v) for k, v in re.findall(r'parameter\s+int\s+(\w+)\s*=\s*(\d+)\s*;', defn)}
+    params['OFMDim'] = (params['IFMDim']-params['KDim']+2*params['PAD'])//params['STRIDE']+1
+    params['MatrixH'] = params['OFMCh']
+    params['MatrixW'] = params['KDim']*params['KDim']*params['IFMCh']
+    return params
+
+# Function: read_out
+# This function reads a file of output elements, marking the elements with
+# unknown (X/Z) bits as dumped by the simulator
+#
+# Parameters:
+#   fname - File name
+#   wl - Word length of each element
+#
+# Returns:
+#
+#   data - Array of elements (int64), unknown bits read as 0
+#   unknown - Boolean array, True for the elements with unknown bits
+def read_out(fname,wl):
+    with open(fname,"rb") as mem_file:
+        chars = mem_chars(mem_file.read())
+    bad = nib_lut[chars] == 255
+    chars = np.where(bad, ord('0'), chars).astype(np.uint8)
+    return decode_mem(chars,1,wl)[:,0], bad.any(axis=1)
+
+# Function: compare_out
+# This function compares the outputs of the DUT with the golden data
+#
+# Parameters:
+#   dut - Array of output elements of the DUT
+#   dut_unknown - Boolean array, True for the outputs of the DUT with unknown bits
+#   gold - Array of golden output elements
+#   matrix_h - Number of output channels (MatrixH)
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   stats - Dictionary with the number of outputs compared ('compared'), missing
+#           ('missing'), extra ('extra') and mismatching ('mismatches') and unknown
+#           ('unknown'), the indices of the mismatches ('idx') and the map of
+#           mismatches, neuron folds x PEs ('fold_map')
+def compare_out(dut,dut_unknown,gold,matrix_h,pe):
+    n = min(len(dut), len(gold))
+    bad = (dut[:n] != gold[:n]) | dut_unknown[:n]
+    idx = np.flatnonzero(bad)
+    ### Output channel nf*PE+p is computed by PE p in neuron fold nf
+    fold_map = np.bincount(idx % matrix_h, minlength=matrix_h).reshape(matrix_h//pe, pe)
+    return {'compared': n, 'missing': max(0, len(gold)-len(dut)), 'extra': max(0, len(dut)-len(gold)),
+            'mismatches': len(idx), 'unknown': int(dut_unknown[:n].sum()), 'idx': idx, 'fold_map': fold_map}
+
+# Function: print_report
+# This function prints the mismatch statistics
+#
+# Parameters:
+#   stats - Dictionary returned by compare_out
+#   dut - Array of output elements of the DUT
+#   dut_unknown - Boolean array, True for the outputs of the DUT with unknown bits
+#   gold - Array of golden output elements
+#   params - Dictionary of the parameters of the package file
+#   first - Number of mismatches listed
+#
+# Returns:
+#
+# None
+def print_report(stats,dut,dut_unknown,gold,params,first):
+    matrix_h, pe = params['MatrixH'], params['PE']
+    pixels = params['OFMDim']*params['OFMDim']
+    ndig = -(-params['TDstI']//4)
+    print(f'Outputs compared: {stats["compared"]}, missing: {stats["missing"]}, extra: {stats["extra"]}')
+    print(f'Mismatches: {stats["mismatches"]} ({stats["unknown"]} with unknown bits)')
+    if(stats['mismatches'] == 0):
+        return
+    idx = stats['idx']
+    print(f'Output pixels with mismatches: {len(np.unique(idx//matrix_h))} of {stats["compared"]//matrix_h}')
+    print("Mismatches per PE:   " + " ".join(str(c) for c in stats['fold_map'].sum(axis=0)))
+    print("Mismatches per fold: " + " ".join(str(c) for c in stats['fold_map'].sum(axis=1)))
+    print(f'First {min(first, len(idx))} mismatches:')
+    print("Image\tPixel\tChannel\tPE\tFold\tDUT\tGolden")
+    for e in idx[:first]:
+        pix, ch = divmod(int(e), matrix_h)
+        out = "x"*ndig if dut_unknown[e] else f'{dut[e]:0{ndig}x}'
+        print(f'{pix//pixels}\t{pix%pixels}\t{ch}\t{ch%pe}\t{ch//pe}\t0x{out}\t0x{gold[e]:0{ndig}x}')
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for comparing the outputs of the MVAU with the golden data')
+    parser.add_argument('--dump', default="out_dump.mem",
+			help="Outputs dumped by the test bench")
+    parser.add_argument('--golden', default="out_act.mem",
+			help="Golden outputs")
+    parser.add_argument('--defn', default="mvau_defn.sv",
+			help="Package file of the configuration set")
+    parser.add_argument('-n','--first', default=10, type=int,
+			help="Number of mismatches listed")
+    parser.add_argument('-m','--map_file', default=None,
+			help="CSV file for the map of mismatches per neuron fold (rows) and PE (columns)")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# compares the outputs and sets the exit status
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    params = read_defn(args.defn)
+    try:
+        dut, dut_unknown = read_out(args.dump, params['TDstI'])
+        gold, _ = read_out(args.golden, params['TDstI'])
+    except:
+        print("Cannot read the output files")
+        raise
+    stats = compare_out(dut, dut_unknown, gold, params['MatrixH'], params['PE'])
+    print_report(stats, dut, dut_unknown, gold, params, args.first)
+    if(args.map_file is not None):
+        np.savetxt(args.map_file, stats['fold_map'], fmt='%d', delimiter=',')
+    if(stats['mismatches'] > 0 or stats['missing'] > 0 or stats['extra'] > 0):
+        print("Data MisMatch")
+        sys.exit(1)
+    print("All outputs match")
+    sys.exit(0)
@@ -0,0 +1,78 @@
+ #
+ # Python Script: MVAU Generated File Writer (mvau_gen_file.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file provides the file object used by the generator scripts of the
+ # design and simulation files (gen_mvau_top.py, gen_mvau_weight_mem*.py,
+ # gen_mvau_stream_top.py, gen_mvau_defn.py and gen_mvau_files.py). A file is
+ # rendered in memory by the same series of write commands and, when it is
+ # closed, its hash is compared with the hash of the existing file. The file is
+ # only written if its contents changed, so that the timestamps of the files
+ # left unchanged between two neighbouring configurations are kept and make
+ # style tools and incremental flows can skip them. A changed file is written
+ # to a temporary file first and renamed, so that it is never left incomplete.
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import io
+import os
+import hashlib
+
+# Function: file_hash
+# This function computes the hash of the contents of a file
+#
+# Parameters:
+#   fname - File name
+#
+# Returns:
+#
+#   digest - SHA-256 hex digest of the file, None if the file does not exist
+def file_hash(fname):
+    if(not os.path.isfile(fname)):
+        return None
+    with open(fname, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# Class: GenFile
+# File object rendering a generated file in memory and writing it
+# on close only if its contents changed
+#
+# Attributes:
+#    fname - Name of the generated file
+#    changed - True if the file was written on close, False if it was left unchanged
+class GenFile(io.StringIO):
+    # Constructor: __init__
+    # The constructor opens an empty file in memory
+    #
+    # Parameters:
+    #   fname - Name of the generated file
+    def __init__(self, fname):
+        super().__init__()
+        self.fname = fname
+        self.changed = False
+
+    # Method: close
+    # This method compares the hash of the rendered contents with the hash
+    # of the existing file and writes the file if they differ
+    def close(self):
+        if(self.closed):
+            return
+        data = self.getvalue().encode()
+        super().close()
+        if(hashlib.sha256(data).hexdigest() == file_hash(self.fname)):
+            return
+        tmp = self.fname + ".tmp%d" % os.getpid()
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.fname)
+        except:
+            print("Cannot write " + self.fname)
+            if(os.path.exists(tmp)):
+                os.remove(tmp)
+            raise
+        self.changed = True
@@ -0,0 +1,262 @@
+ #
+ # Python Script: MVAU Memory File Codec (mvau_mem.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file reads and writes the hex memory files exchanged by the test
+ # benches ($readmemh), HLS and the python scripts, i.e., inp_act.mem,
+ # out_act.mem, inp_wgt.mem and weight_mem<p>.mem. A number of elements of
+ # an arbitrary word length are packed into each memory word, either with
+ # element 0 in the most significant position, as in the [0:SIMD-1][TSrcI-1:0]
+ # layout of the test benches, or in the least significant position, as in
+ # [PE-1:0][TDstI-1:0]. Nested layouts such as [PE-1:0][0:SIMD-1][TW-1:0] are
+ # written by reordering the elements of each word before packing.
+ #
+ # All words are packed and unpacked at once using NumPy, without formatting
+ # or parsing elements one at a time, and files with words of a fixed width
+ # (the ones written by HLS or this script) are viewed as a 2D array of
+ # characters without copying. The '0x' prefix dumped by HLS is stripped
+ # when reading.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_mem.py strip <files>   - Removes the '0x' prefix from memory files in place
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import sys
+import argparse
+
+# Variable: hex_lut
+# ASCII codes of the hex digits of all nibbles
+hex_lut = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+# Variable: nib_lut
+# Nibble of each ASCII code, 255 for characters which are not hex digits
+nib_lut = np.full(256, 255, dtype=np.uint8)
+nib_lut[hex_lut] = np.arange(16)
+nib_lut[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10,16)
+
+# Variable: chunk_bits
+# Number of bits encoded at once when writing, bounding the memory of large files
+chunk_bits = 1 << 26
+
+# Function: check_wl
+# This function checks that a word length can be held by int64
+#
+# Parameters:
+#   wl - Word length of each element
+#
+# Returns:
+#
+# None
+def check_wl(wl):
+    if(wl < 1 or wl > 63):
+        raise ValueError("Word length (%d) must be between 1 and 63" % wl)
+
+# Function: encode_mem
+# This function packs the elements of each row into one memory word
+# and formats the words as hex digits
+#
+# Parameters:
+#   data - Array of elements, the last axis being packed into one word.
+#          Signed elements are written as their two's complement bit pattern
+#   wl - Word length of each element
+#   msb_first - True if element 0 is in the most significant position
+#
+# Returns:
+#
+#   digits - Array of ASCII codes, rows x hex digits per word
+def encode_mem(data,wl,msb_first=True):
+    check_wl(wl)
+    data = np.asarray(data)
+    data = data.reshape(-1, data.shape[-1] if data.ndim > 1 else 1)
+    if(not msb_first):
+        data = data[:,::-1]
+    rows, n = data.shape
+    nbits = n*wl
+    ndig = -(-nbits//4)
+    data = data.astype(np.uint64) & np.uint64(2**wl-1)
+    if(wl%4 == 0):
+        ### Each element is a whole number of hex digits
+        shift = np.arange(wl-4,-1,-4, dtype=np.uint64)
+        nib = ((data[:,:,None] >> shift) & np.uint64(15)).astype(np.uint8).reshape(rows, ndig)
+    else:
+        shift = np.arange(wl-1,-1,-1, dtype=np.uint64)
+        bits = ((data[:,:,None] >> shift) & np.uint64(1)).astype(np.uint8).reshape(rows, nbits)
+        bits = np.pad(bits, ((0,0),(ndig*4-nbits,0)))
+        nib = np.packbits(bits.reshape(rows, ndig, 4), axis=2)[:,:,0] >> 4
+    return hex_lut[nib]
+
+# Function: write_mem
+# This function writes an array of elements to a memory file
+# to be read by $readmemh, one word per line
+#
+# Parameters:
+#   fname - File name
+#   data - Array of elements, the last axis being packed into one word
+#   wl - Word length of each element
+#   msb_first - True if element 0 is in the most significant position
+#
+# Returns:
+#
+# None
+def write_mem(fname,data,wl,msb_first=True):
+    data = np.asarray(data)
+    data = data.reshape(-1, data.shape[-1] if data.ndim > 1 else 1)
+    rows = max(1, chunk_bits//(data.shape[1]*wl))
+    with open(fname,"wb") as mem_file:
+        for r in range(0, data.shape[0], rows):
+            digits = encode_mem(data[r:r+rows],wl,msb_first)
+            lines = np.empty((digits.shape[0], digits.shape[1]+1), dtype=np.uint8)
+            lines[:,:-1] = digits
+            lines[:,-1] = ord('\n')
+            mem_file.write(lines.tobytes())
+
+# Function: mem_chars
+# This function returns the hex digits of all words of a memory file without
+# the '0x' prefix. Words of a fixed width are returned as a view of the file
+# contents, while words of different widths are zero extended to the widest one
+#
+# Parameters:
+#   buf - Contents of the memory file (bytes)
+#
+# Returns:
+#
+#   chars - Array of ASCII codes, rows x hex digits per word
+def mem_chars(buf):
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    nl = buf.find(b'\n')
+    w = nl+1
+    if(nl > 0 and len(buf)%w == 0 and np.all(arr[nl::w] == ord('\n'))):
+        chars = arr.reshape(-1, w)[:,:nl]
+        ### Windows line endings
+        if(np.all(chars[:,-1] == ord('\r'))):
+            chars = chars[:,:-1]
+        if(chars.shape[1] > 2 and np.all(chars[:,1] | 32 == ord('x')) and np.all(chars[:,0] == ord('0'))):
+            chars = chars[:,2:]
+        if(np.all(nib_lut[chars] != 255)):
+            return chars
+    words = [w[2:] if w[:2] in (b'0x', b'0X') else w for w in buf.split()]
+    width = max((len(w) for w in words), default=0)
+    if(width == 0):
+        return np.zeros((0,0), dtype=np.uint8)
+    words = b''.join(w.rjust(width, b'0') for w in words)
+    return np.frombuffer(words, dtype=np.uint8).reshape(-1, width)
+
+# Function: decode_mem
+# This function unpacks the elements of memory words given as hex digits
+#
+# Parameters:
+#   chars - Array of ASCII codes, rows x hex digits per word
+#   n - Number of elements in each word
+#   wl - Word length of each element
+#   sgn - '1' if the elements are signed, else '0'
+#   msb_first - True if element 0 is in the most significant position
+#
+# Returns:
+#
+#   data - Array of elements (int64), rows x n
+def decode_mem(chars,n,wl,sgn=0,msb_first=True):
+    check_wl(wl)
+    nib = nib_lut[chars]
+    if(np.any(nib == 255)):
+        raise ValueError("Memory file has characters which are not hex digits")
+    rows = nib.shape[0]
+    nbits = n*wl
+    ndig = -(-nbits//4)
+    ### Words are zero extended or truncated to the packed width as done by $readmemh
+    if(nib.shape[1] < ndig):
+        nib = np.pad(nib, ((0,0),(ndig-nib.shape[1],0)))
+    nib = nib[:,nib.shape[1]-ndig:]
+    data = np.zeros((rows, n), dtype=np.int64)
+    if(wl%4 == 0):
+        nib = nib.reshape(rows, n, wl//4)
+        for k in range(wl//4):
+            data = (data << 4) | nib[:,:,k]
+    else:
+        bits = np.unpackbits(nib[:,:,None], axis=2)[:,:,4:].reshape(rows, ndig*4)
+        bits = bits[:,ndig*4-nbits:].reshape(rows, n, wl)
+        for k in range(wl):
+            data = (data << 1) | bits[:,:,k]
+    if(sgn == 1):
+        data -= ((data >> (wl-1)) & 1) << wl
+    if(not msb_first):
+        data = data[:,::-1]
+    return data
+
+# Function: read_mem
+# This function reads a memory file written by $writememh, HLS or write_mem
+#
+# Parameters:
+#   fname - File name
+#   n - Number of elements in each word
+#   wl - Word length of each element
+#   sgn - '1' if the elements are signed, else '0'
+#   msb_first - True if element 0 is in the most significant position
+#
+# Returns:
+#
+#   data - Array of elements (int64), words x n
+def read_mem(fname,n,wl,sgn=0,msb_first=True):
+    with open(fname,"rb") as mem_file:
+        buf = mem_file.read()
+    return decode_mem(mem_chars(buf),n,wl,sgn,msb_first)
+
+# Function: write_chars
+# This function writes the hex digits of memory words, one word per line
+#
+# Parameters:
+#   fname - File name
+#   chars - Array of ASCII codes, rows x hex digits per word (as returned by mem_chars)
+#
+# Returns:
+#
+# None
+def write_chars(fname,chars):
+    lines = np.empty((chars.shape[0], chars.shape[1]+1), dtype=np.uint8)
+    lines[:,:-1] = chars
+    lines[:,-1] = ord('\n')
+    with open(fname,"wb") as mem_file:
+        mem_file.write(lines.tobytes())
+
+# Function: strip_mem
+# This function removes the '0x' prefix from a memory file in place
+#
+# Parameters:
+#   fname - File name
+#
+# Returns:
+#
+# None
+def strip_mem(fname):
+    with open(fname,"rb") as mem_file:
+        chars = mem_chars(mem_file.read())
+    write_chars(fname,chars)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for converting MVAU memory files')
+    parser.add_argument('cmd', choices=['strip'],
+			help="Remove the '0x' prefix from memory files")
+    parser.add_argument('files', nargs='+',
+			help="Memory files")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# converts the memory files
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    for f in args.files:
+        strip_mem(f)
+
+    sys.exit(0)
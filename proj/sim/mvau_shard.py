@@ -0,0 +1,257 @@
+ #
+ # Python Script: MVAU Sharded Simulation (mvau_shard.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file runs the RTL simulation of the v3 test benches as several xsim
+ # processes in parallel. The output pixels of the MVAU are computed
+ # independently of each other, so the OFMDim*OFMDim output pixels (ACT_MatrixW)
+ # are split into K contiguous ranges, the shards. For each shard, a folder
+ # (shards/shard<k>) is created with its slices of the input activation
+ # (inp_act.mem) and golden output (out_act.mem) files and links to the weight
+ # memory files. The test bench is elaborated once for the largest shard (see
+ # mvau_snapshot.py) and all shards are simulated at the same time from this
+ # snapshot, each with its number of output pixels (+ACT_MatrixW=<n>) and its
+ # outputs dumped (+DUMP_OUT). The results are then merged:
+ # - The outputs of each shard are compared with its golden data (see
+ #   mvau_cmp.py) and the mismatches are reported with their image and output
+ #   pixel in the whole output. The simulation passes if all shards pass
+ # - The logs of the simulations of the shards are merged into xsim.log
+ # - The latency of each shard is reported and their sum written to
+ #   shard_latency.txt. As every shard fills the pipeline of the MVAU, the sum
+ #   exceeds the latency of a single simulation by the fill latency of K-1
+ #   shards, so it is not a latency of the MVAU. latency.txt is written as N/A
+ #   when there is more than one shard, and reported as such by the regression
+ #   tests
+ # The exit status is 0 if all outputs match and 1 otherwise.
+ #
+ # With --verilator (MVAU_SIMULATOR=verilator), the unit is built once with
+ # Verilator and the shards are run by its C++ harness instead (see
+ # mvau_verilator.py), each using the threads of the model.
+ #
+ # The simulations are timed by mvau_events.py when MVAU_EVENT_LOG is set, as
+ # stages xsim (vlsim) nested in the stage of the parent process.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_shard.py -k 4                 - Simulates the batch unit (mvau_tb_v3) in 4 shards
+ # python mvau_shard.py -k 4 --stream        - Simulates the stream unit (mvau_stream_tb_v3) in 4 shards
+ # python mvau_shard.py -k 8 --verilator     - Simulates the batch unit with Verilator in 8 shards
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import os
+import sys
+import glob
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from mvau_mem import mem_chars, write_chars
+from mvau_cmp import read_defn, read_out, compare_out
+from mvau_snapshot import elaborate, simulate
+import mvau_verilator
+
+# Function: shard_ranges
+# This function splits the output pixels into contiguous ranges of nearly equal size
+#
+# Parameters:
+#   pixels - Number of output pixels (ACT_MatrixW)
+#   shards - Number of shards, at most one for each pixel
+#
+# Returns:
+#
+#   ranges - List of the first and last+1 output pixel of each shard
+def shard_ranges(pixels,shards):
+    bounds = np.linspace(0, pixels, min(shards, pixels)+1).round().astype(int)
+    return [(int(p0), int(p1)) for p0, p1 in zip(bounds[:-1], bounds[1:])]
+
+# Function: split_mem
+# This function splits a memory file of the form [images][pixels][words per pixel]
+# into the output pixel ranges of the shards, keeping its digits as they are
+#
+# Parameters:
+#   fname - Memory file name
+#   pixels - Number of output pixels (ACT_MatrixW)
+#   per_pix - Number of words of each output pixel
+#   ranges - List of the output pixel ranges of the shards
+#
+# Returns:
+#
+#   slices - List of the words of each shard, array of ASCII codes (see mem_chars)
+def split_mem(fname,pixels,per_pix,ranges):
+    with open(fname,"rb") as mem_file:
+        chars = mem_chars(mem_file.read())
+    if(chars.shape[0] % (pixels*per_pix) != 0):
+        raise ValueError("%s has %d words, not a multiple of %d pixels x %d words" % (fname, chars.shape[0], pixels, per_pix))
+    chars = chars.reshape(-1, pixels, per_pix, chars.shape[1])
+    return [chars[:,p0:p1].reshape(-1, chars.shape[3]) for p0, p1 in ranges]
+
+# Function: make_shards
+# This function creates the folder of each shard with its memory files
+#
+# Parameters:
+#   sim_dir - Simulation folder (proj/sim)
+#   params - Dictionary of the parameters of the package file (returned by read_defn)
+#   ranges - List of the output pixel ranges of the shards
+#
+# Returns:
+#
+#   shard_dirs - List of the folders of the shards
+def make_shards(sim_dir,params,ranges):
+    pixels = params['OFMDim']*params['OFMDim']
+    inp = split_mem(os.path.join(sim_dir,"inp_act.mem"), pixels, params['MatrixW']//params['SIMD'], ranges)
+    out = split_mem(os.path.join(sim_dir,"out_act.mem"), pixels, params['MatrixH'], ranges)
+    ### Weight memories are read by the test bench and the DUT from the current folder
+    mems = [m for m in glob.glob(os.path.join(sim_dir,"*.mem"))
+            if os.path.basename(m) not in ("inp_act.mem", "out_act.mem", "out_dump.mem")]
+    shutil.rmtree(os.path.join(sim_dir,"shards"), ignore_errors=True)
+    shard_dirs = []
+    for k in range(len(ranges)):
+        d = os.path.join(sim_dir,"shards","shard%d" % k)
+        os.makedirs(d)
+        write_chars(os.path.join(d,"inp_act.mem"), inp[k])
+        write_chars(os.path.join(d,"out_act.mem"), out[k])
+        for m in mems:
+            os.symlink(m, os.path.join(d,os.path.basename(m)))
+        shard_dirs.append(d)
+    return shard_dirs
+
+# Function: run_shard
+# This function simulates one shard
+#
+# Parameters:
+#   shard_dir - Folder of the shard
+#   snap_dir - Folder of the snapshot (returned by elaborate of mvau_snapshot.py)
+#              or of the Verilator model (returned by build of mvau_verilator.py)
+#   unit - Unit simulated, 'batch' or 'stream'
+#   pixels - Number of output pixels of the shard
+#   verilator - True to run the Verilator model instead of xsim
+#
+# Returns:
+#
+#   ok - True if the simulation completed
+def run_shard(shard_dir,snap_dir,unit,pixels,verilator=False):
+    with open(os.path.join(shard_dir,"shard.log"),"wt") as log:
+        if(verilator):
+            return mvau_verilator.simulate(shard_dir, snap_dir, pixels, log = log) == 0
+        return simulate(shard_dir, snap_dir, unit, pixels, log = log) == 0
+
+# Function: merge_shards
+# This function compares the outputs of all shards and merges their logs and latencies.
+# The latency of a single shard is the latency of the whole simulation, that of
+# more shards is not known (N/A)
+#
+# Parameters:
+#   sim_dir - Simulation folder (proj/sim)
+#   shard_dirs - List of the folders of the shards
+#   ranges - List of the output pixel ranges of the shards
+#   done - List of the shards which completed their simulation (returned by run_shard)
+#   params - Dictionary of the parameters of the package file
+#   first - Number of mismatches listed
+#
+# Returns:
+#
+#   ok - True if all outputs of all shards match
+def merge_shards(sim_dir,shard_dirs,ranges,done,params,first):
+    matrix_h, pe, wl = params['MatrixH'], params['PE'], params['TDstI']
+    pixels = params['OFMDim']*params['OFMDim']
+    ndig = -(-wl//4)
+    ok = all(done)
+    total_lat = 0
+    listed = []
+    fold_map = np.zeros((matrix_h//pe, pe), dtype=int)
+    print("Shard\tPixels\t\tLatency\tCompared\tMissing\tMismatches")
+    with open(os.path.join(sim_dir,"xsim.log"),"wt") as log:
+        for k, (d, (p0, p1)) in enumerate(zip(shard_dirs, ranges)):
+            if(os.path.isfile(os.path.join(d,"shard.log"))):
+                with open(os.path.join(d,"shard.log")) as f:
+                    log.write(f'### Shard {k}, output pixels {p0}-{p1-1}\n' + f.read())
+            try:
+                with open(os.path.join(d,"latency.txt")) as f:
+                    lat = int(f.read())
+                dut, dut_unknown = read_out(os.path.join(d,"out_dump.mem"), wl)
+            except (OSError, ValueError):
+                print(f'{k}\t{p0}-{p1-1}\t\t-\t-\t\t-\t-')
+                ok = False
+                continue
+            gold, _ = read_out(os.path.join(d,"out_act.mem"), wl)
+            stats = compare_out(dut, dut_unknown, gold, matrix_h, pe)
+            total_lat += lat
+            fold_map += stats['fold_map']
+            print(f'{k}\t{p0}-{p1-1}\t\t{lat}\t{stats["compared"]}\t\t{stats["missing"]}\t{stats["mismatches"]}')
+            ok = ok and stats['mismatches'] == 0 and stats['missing'] == 0 and stats['extra'] == 0
+            ### Image and output pixel of the mismatches in the whole output
+            for e in stats['idx'][:max(0, first-len(listed))]:
+                pix, ch = divmod(int(e), matrix_h)
+                out = "x"*ndig if dut_unknown[e] else f'{dut[e]:0{ndig}x}'
+                listed.append(f'{pix//(p1-p0)}\t{p0+pix%(p1-p0)}\t{ch}\t{ch%pe}\t{ch//pe}\t0x{out}\t0x{gold[e]:0{ndig}x}')
+    with open(os.path.join(sim_dir,"shard_latency.txt"),"wt") as f:
+        f.write("%d" % total_lat)
+    with open(os.path.join(sim_dir,"latency.txt"),"wt") as f:
+        f.write("%d" % total_lat if len(shard_dirs) == 1 else "N/A")
+    print(f'Latency of all shards: {total_lat}' + ("" if len(shard_dirs) == 1 else " (not the latency of a single simulation)"))
+    if(len(listed) > 0):
+        print("Mismatches per PE:   " + " ".join(str(c) for c in fold_map.sum(axis=0)))
+        print("Mismatches per fold: " + " ".join(str(c) for c in fold_map.sum(axis=1)))
+        print(f'First {len(listed)} mismatches:')
+        print("Image\tPixel\tChannel\tPE\tFold\tDUT\tGolden")
+        print("\n".join(listed))
+    return ok
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for simulating the MVAU in parallel shards of output pixels')
+    parser.add_argument('-k','--shards', default=2, type=int,
+			help="Number of shards")
+    parser.add_argument('-j','--jobs', default=None, type=int,
+			help="Number of shards simulated at the same time, all by default")
+    parser.add_argument('--stream', action='store_true',
+			help="Simulates the stream unit instead of the batch unit")
+    parser.add_argument('--verilator', action='store_true', default=os.environ.get('MVAU_SIMULATOR') == 'verilator',
+			help="Simulates with Verilator instead of xsim, the default if MVAU_SIMULATOR is verilator")
+    parser.add_argument('-t','--threads', default=int(os.environ.get('MVAU_VERILATOR_THREADS') or 1), type=int,
+			help="Number of threads of the Verilator model")
+    parser.add_argument('-n','--first', default=10, type=int,
+			help="Number of mismatches listed")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# creates and simulates the shards and merges their results
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.shards < 1):
+        print("Number of shards must be at least 1")
+        sys.exit(1)
+    sim_dir = os.path.dirname(os.path.abspath(__file__))
+    unit = 'stream' if args.stream else 'batch'
+    params = read_defn(os.path.join(sim_dir,"mvau_defn.sv"))
+    ranges = shard_ranges(params['OFMDim']*params['OFMDim'], args.shards)
+    try:
+        shard_dirs = make_shards(sim_dir, params, ranges)
+    except:
+        print("Cannot create the shards")
+        raise
+    if(args.verilator):
+        snap_dir = mvau_verilator.build(unit, params, args.threads)
+    else:
+        snap_dir = elaborate(unit, max(p1-p0 for p0, p1 in ranges))
+    if(snap_dir is None):
+        print("RTL files compilation failed")
+        sys.exit(1)
+    print(f'Simulating {params["OFMDim"]*params["OFMDim"]} output pixels in {len(ranges)} shards')
+    with ThreadPoolExecutor(max_workers=args.jobs or len(ranges)) as executor:
+        done = list(executor.map(lambda s: run_shard(s[0], snap_dir, unit, s[1][1]-s[1][0], args.verilator), zip(shard_dirs, ranges)))
+    if(merge_shards(sim_dir, shard_dirs, ranges, done, params, args.first)):
+        print("All outputs match")
+        sys.exit(0)
+    print("Data MisMatch")
+    sys.exit(1)
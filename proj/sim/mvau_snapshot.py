@@ -0,0 +1,307 @@
+ #
+ # Python Script: MVAU Simulation Snapshot Cache (mvau_snapshot.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file elaborates the v3 test benches once for each hardware shape of the
+ # MVAU and runs any number of simulations against the cached snapshot. The
+ # input activations, weights and golden outputs are read from memory files at
+ # run time, and the input feature map dimensions (IFMDim, PAD and STRIDE) only
+ # set the number of output pixels, which the test benches read from the plusarg
+ # +ACT_MatrixW=<n>. Two configurations whose design files differ only in these
+ # dimensions therefore share the same snapshot.
+ #
+ # A snapshot is identified by a hash of the test bench and of the contents of
+ # all files it is elaborated from (the project file sources and mvau_defn.sv),
+ # leaving out the lines setting IFMDim, PAD and STRIDE. It is elaborated in its
+ # own folder of the cache (MVAU_SNAPSHOT_CACHE, snapshots in this folder by
+ # default) with ACT_MatrixW set to the number of output pixels of the
+ # configuration, and elaborated again when a configuration of the same shape
+ # has more output pixels. A simulation links the snapshot in xsim.dir of the
+ # folder it is run from to the cached snapshot. Snapshots are locked while they
+ # are elaborated and simulated, so that configuration sets run in parallel can
+ # share the cache, and the least recently used snapshots beyond
+ # MVAU_SNAPSHOT_KEEP are removed.
+ #
+ # Elaboration and simulation are timed by mvau_events.py when MVAU_EVENT_LOG is
+ # set, as stages elab and xsim nested in the stage of the parent process.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_snapshot.py elab                      - Elaborates the batch unit (mvau_tb_v3), unless cached
+ # python mvau_snapshot.py sim -- --sv_seed 1        - Simulates it, passing the arguments after -- to xsim
+ # python mvau_snapshot.py elab --stream             - Same for the stream unit (mvau_stream_tb_v3)
+ # python mvau_snapshot.py list                      - Lists the cached snapshots
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import os
+import re
+import sys
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+import subprocess
+from contextlib import contextmanager
+from mvau_cmp import read_defn
+
+# Variable: sim_dir
+# Simulation folder (proj/sim)
+sim_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Variable: snapshot_tb
+# Test bench and project file of each unit
+snapshot_tb = {'batch': ('mvau_tb_v3', 'mvau_files.prj'),
+               'stream': ('mvau_stream_tb_v3', 'mvau_stream_files.prj')}
+
+# Variable: runtime_dims
+# Lines setting the dimensions which are not part of the hardware shape
+runtime_dims = re.compile(rb'\b(IFMDim|PAD|STRIDE)\s*=\s*\d+')
+
+# Variable: default_keep
+# Number of snapshots kept in the cache
+default_keep = 16
+
+# Function: cache_dir
+# This function returns the folder of the snapshot cache
+#
+# Returns:
+#
+#   cache - Folder of the cache, given by MVAU_SNAPSHOT_CACHE
+def cache_dir():
+    return os.path.abspath(os.environ.get('MVAU_SNAPSHOT_CACHE') or os.path.join(sim_dir, "snapshots"))
+
+# Function: span_cmd
+# This function returns the command timing a stage with mvau_events.py
+#
+# Parameters:
+#   stage - Name of the stage
+#
+# Returns:
+#
+#   cmd - List of the command and its arguments, followed by the command of the stage
+def span_cmd(stage):
+    return [sys.executable, os.path.join(sim_dir, "..", "RegressionTests", "mvau_events.py"), "run", stage, "--"]
+
+# Function: prj_sources
+# This function reads the sources of a project file
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#
+# Returns:
+#
+#   sources - List of the language, library and absolute path of each source
+def prj_sources(unit):
+    sources = []
+    with open(os.path.join(sim_dir, snapshot_tb[unit][1])) as f:
+        for line in f:
+            if(len(line.split()) == 3):
+                lang, lib, src = line.split()
+                sources.append((lang, lib, os.path.normpath(os.path.join(sim_dir, src))))
+    return sources
+
+# Function: snapshot_key
+# This function computes the key of the snapshot of a unit from its design files
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#
+# Returns:
+#
+#   key - Name of the snapshot in the cache
+def snapshot_key(unit):
+    h = hashlib.sha1(snapshot_tb[unit][0].encode())
+    files = [src for _, _, src in prj_sources(unit)] + [os.path.join(sim_dir, "mvau_defn.sv")]
+    for fname in files:
+        with open(fname, "rb") as f:
+            for line in f:
+                if(runtime_dims.search(line) is None):
+                    h.update(line)
+    return unit + "_" + h.hexdigest()[:16]
+
+# Function: snapshot_lock
+# This context manager locks a snapshot of the cache
+#
+# Parameters:
+#   snap_dir - Folder of the snapshot
+#   shared - True for a shared lock (simulation), False for an exclusive lock (elaboration)
+#   block - False to give up if the lock is held
+#
+# Returns:
+#
+#   True if the lock was taken
+@contextmanager
+def snapshot_lock(snap_dir, shared=False, block=True):
+    with open(snap_dir + ".lock", "a") as f:
+        try:
+            fcntl.flock(f, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if block else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# Function: read_capacity
+# This function reads the number of output pixels a snapshot was elaborated for
+#
+# Parameters:
+#   snap_dir - Folder of the snapshot
+#
+# Returns:
+#
+#   pixels - Number of output pixels, 0 if the snapshot is not complete
+def read_capacity(snap_dir):
+    try:
+        with open(os.path.join(snap_dir, "capacity.txt")) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+# Function: prune
+# This function removes the least recently used snapshots beyond the given number,
+# leaving out the snapshots being used
+#
+# Parameters:
+#   cache - Folder of the cache
+#   keep - Number of snapshots kept
+#
+# Returns:
+#
+#   None
+def prune(cache, keep):
+    snaps = [os.path.join(cache, d) for d in os.listdir(cache) if os.path.isdir(os.path.join(cache, d))]
+    snaps.sort(key=os.path.getmtime, reverse=True)
+    for snap_dir in snaps[keep:]:
+        with snapshot_lock(snap_dir, block=False) as locked:
+            if(locked):
+                shutil.rmtree(snap_dir, ignore_errors=True)
+                os.remove(snap_dir + ".lock")
+
+# Function: elaborate
+# This function returns the snapshot of the current design files of a unit,
+# elaborating it if it is not cached or has fewer output pixels
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#   pixels - Number of output pixels simulated
+#   log - File the output of xelab is written to, None for the standard output
+#
+# Returns:
+#
+#   snap_dir - Folder of the snapshot, None if the elaboration failed
+def elaborate(unit, pixels, log=None):
+    tb = snapshot_tb[unit][0]
+    cache = cache_dir()
+    os.makedirs(cache, exist_ok=True)
+    snap_dir = os.path.join(cache, snapshot_key(unit))
+    with snapshot_lock(snap_dir):
+        capacity = read_capacity(snap_dir)
+        if(capacity >= pixels):
+            print(f'Snapshot {os.path.basename(snap_dir)} of {capacity} output pixels reused', file=log, flush=True)
+            os.utime(snap_dir)
+            return snap_dir
+        shutil.rmtree(snap_dir, ignore_errors=True)
+        os.makedirs(snap_dir)
+        with open(os.path.join(snap_dir, "snapshot_files.prj"), "wt") as f:
+            f.writelines(f'{lang} {lib} {src}\n' for lang, lib, src in prj_sources(unit))
+        elab = ["xelab", "-prj", "snapshot_files.prj", "-i", sim_dir, "-generic_top", "ACT_MatrixW=%d" % pixels,
+                "-s", "run_"+tb, "work."+tb]
+        if(subprocess.call(span_cmd("elab") + elab, cwd = snap_dir, stdout = log, stderr = subprocess.STDOUT) != 0):
+            shutil.rmtree(snap_dir, ignore_errors=True)
+            return None
+        with open(os.path.join(snap_dir, "capacity.txt"), "wt") as f:
+            f.write("%d" % pixels)
+    prune(cache, int(os.environ.get('MVAU_SNAPSHOT_KEEP') or default_keep))
+    return snap_dir
+
+# Function: simulate
+# This function simulates a snapshot from a folder holding the memory files,
+# with all outputs dumped (+DUMP_OUT)
+#
+# Parameters:
+#   run_dir - Folder the simulation is run from
+#   snap_dir - Folder of the snapshot (returned by elaborate)
+#   unit - Unit simulated, 'batch' or 'stream'
+#   pixels - Number of output pixels simulated
+#   args - List of additional arguments of xsim
+#   log - File the output of xsim is written to, None for the standard output
+#
+# Returns:
+#
+#   status - Exit status of xsim
+def simulate(run_dir, snap_dir, unit, pixels, args=(), log=None):
+    tb = snapshot_tb[unit][0]
+    ### Only the snapshot is linked, snapshots elaborated in the folder are kept out of the cache
+    os.makedirs(os.path.join(run_dir, "xsim.dir"), exist_ok=True)
+    link = os.path.join(run_dir, "xsim.dir", "run_"+tb)
+    if(os.path.islink(link) or os.path.isfile(link)):
+        os.remove(link)
+    elif(os.path.isdir(link)):
+        shutil.rmtree(link)
+    os.symlink(os.path.join(snap_dir, "xsim.dir", "run_"+tb), link)
+    xsim = ["xsim", "run_"+tb, "-t", os.path.join(sim_dir, "mvau_xsim.tcl"),
+            "-testplusarg", "DUMP_OUT", "-testplusarg", "ACT_MatrixW=%d" % pixels] + list(args)
+    with snapshot_lock(snap_dir, shared=True):
+        return subprocess.call(span_cmd("xsim") + xsim, cwd = run_dir, stdout = log, stderr = subprocess.STDOUT)
+
+# Function: list_cache
+# This function lists the snapshots of the cache, including the Verilator
+# models of mvau_verilator.py, which have no number of output pixels
+#
+# Returns:
+#
+#   None
+def list_cache():
+    cache = cache_dir()
+    snaps = [d for d in os.listdir(cache) if os.path.isdir(os.path.join(cache, d))] if os.path.isdir(cache) else []
+    print(f'{len(snaps)} snapshots in {cache}')
+    print("Snapshot\t\t\tPixels\tLast used")
+    for d in sorted(snaps, key=lambda d: os.path.getmtime(os.path.join(cache, d)), reverse=True):
+        snap_dir = os.path.join(cache, d)
+        print(f'{d}\t{read_capacity(snap_dir) or "-"}\t{time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(snap_dir)))}')
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for elaborating the MVAU test benches once for each hardware shape')
+    parser.add_argument('cmd', choices=['elab', 'sim', 'list'],
+			help="Elaborate, simulate or list the cached snapshots")
+    parser.add_argument('--stream', action='store_true',
+			help="Stream unit instead of the batch unit")
+    parser.add_argument('xsim_args', nargs=argparse.REMAINDER,
+			help="Arguments of xsim, after --")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# elaborates or simulates the current configuration
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(args.cmd == 'list'):
+        list_cache()
+        sys.exit(0)
+    unit = 'stream' if args.stream else 'batch'
+    params = read_defn(os.path.join(sim_dir, "mvau_defn.sv"))
+    pixels = params['OFMDim']*params['OFMDim']
+    try:
+        snap_dir = elaborate(unit, pixels)
+    except:
+        print("Cannot elaborate the snapshot")
+        raise
+    if(snap_dir is None):
+        sys.exit(1)
+    if(args.cmd == 'sim'):
+        xsim_args = args.xsim_args[1:] if args.xsim_args[:1] == ['--'] else args.xsim_args
+        sys.exit(simulate(os.getcwd(), snap_dir, unit, pixels, xsim_args))
+    sys.exit(0)
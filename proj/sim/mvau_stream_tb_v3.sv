@@ -8,6 +8,17 @@
  * Compares output of DUT with outputs from a file.This file lists
  * a test bench for the matrix-vector activation streaming unit. This
  * test bench is part of the regression test for MVAU stream unit.
+ * With the plusarg +DUMP_OUT, all outputs of the DUT are written to
+ * out_dump.mem instead, to be compared with the golden data by mvau_cmp.py.
+ * The number of output pixels simulated is given at run time by the plusarg
+ * +ACT_MatrixW=<n>, up to the parameter ACT_MatrixW, so that one snapshot
+ * can be run for layers differing only in their output feature map
+ * dimensions (see mvau_snapshot.py).
+ * With the plusarg +TRAFFIC=<n>, the input valid and output ready follow the
+ * patterns of n cycles of traffic_in.mem and traffic_out.mem, repeated over
+ * the simulation (see mvau_traffic.py). The input valid is held until the word
+ * is taken, the outputs are taken on each handshake and dumped as with
+ * +DUMP_OUT, and the handshake counts are written to traffic.txt.
  * 
  * It is part of the Xilinx FINN open source framework for implementing
  * quantized neural networks on FPGAs
@@ -23,9 +34,10 @@
  * INIT_DLY=(CLK_PER*2)+1 - Initial delay
  * RAND_DLY=21 - Random delay to be used when needed
  * NO_IN_VEC = 100 - Number of input vectors
- * ACT_MatrixW = OFMDim*OFMDim; - Input activation matrix height
+ * ACT_MatrixW = OFMDim*OFMDim; - Input activation matrix height, the largest number of output pixels simulated
  * ACT_MatrixH = (KDim*KDim*IFMCh) - Input activation matrix weight
  * TOTAL_OUTPUTS = MatrixH*ACT_MatrixW - Total number of elements in the output matrix
+ * TRAFFIC_LEN = 4096 - Largest number of cycles of the traffic patterns
  * */
 
 `timescale 1ns/1ns
@@ -42,6 +54,8 @@ module mvau_stream_tb_v3;
    parameter int ACT_MatrixW = OFMDim*OFMDim; // input activation matrix height
    parameter int ACT_MatrixH = (KDim*KDim*IFMCh); // input activation matrix weight
    parameter int TOTAL_OUTPUTS = MatrixH*ACT_MatrixW;
+   parameter int ACT_WORDS = ACT_MatrixH/SIMD; // input words of each output pixel
+   parameter int TRAFFIC_LEN = 4096; // largest number of cycles of the traffic patterns
    
    // Signals Declarations
    // Signal: aclk
@@ -80,6 +94,9 @@ module mvau_stream_tb_v3;
    // Input activation matrix
    // Dimension: ACT_MatrixH x ACT_MatrixW, word length: TSrcI
    logic [0:SIMD-1][TSrcI-1:0] 	    in_mat [0:MMV-1][0:ACT_MatrixW-1][0:ACT_MatrixH/SIMD-1];
+   // Signal: in_flat
+   // Input activation matrix as read from the memory file, of act_w output pixels
+   logic [0:SIMD-1][TSrcI-1:0] 	    in_flat [0:MMV*ACT_MatrixW*ACT_WORDS-1];
    // Signal: in_act
    // Input activation stream to DUT
    // Dimension: SIMD, word length: TSrcI
@@ -88,6 +105,9 @@ module mvau_stream_tb_v3;
    // Output matrix holding output of behavioral simulation
    // Dimension: MatrixH x ACT_MatrixW
    logic [TDstI-1:0] 		    mvau_beh [0:ACT_MatrixW-1][0:MatrixH-1];
+   // Signal: act_w
+   // Number of output pixels simulated, set by the plusarg +ACT_MatrixW=<n>
+   int 				    act_w;
    // Signal: out_v
    // Output valid signal
    logic 			    out_v;
@@ -111,6 +131,39 @@ module mvau_stream_tb_v3;
    // Signal: do_comp
    // A signal which indicates the comparison is done, helps in debugging
    logic 			    do_comp;      
+   // Signal: dump_out
+   // Dump mode, set by the plusarg +DUMP_OUT. All outputs of the DUT are written
+   // to out_dump.mem and compared offline by mvau_cmp.py instead of stopping
+   // at the first mismatch
+   logic 			    dump_out;
+   // Signal: dump_fd
+   // File descriptor of out_dump.mem
+   integer 			    dump_fd;
+   // Signal: traffic
+   // Traffic mode, set by the plusarg +TRAFFIC=<n>
+   logic 			    traffic = 1'b0;
+   // Signal: traffic_len
+   // Number of cycles of the traffic patterns
+   int 				    traffic_len;
+   // Signal: in_pat
+   // Input valid pattern, read from traffic_in.mem
+   logic 			    in_pat [0:TRAFFIC_LEN-1];
+   // Signal: out_pat
+   // Output ready pattern, read from traffic_out.mem
+   logic 			    out_pat [0:TRAFFIC_LEN-1];
+   // Signal: t_idx
+   // Cycle of the traffic patterns
+   int 				    t_idx;
+   // Signal: in_done
+   // Set when the last input word is taken in traffic mode
+   logic 			    in_done;
+   // Signal: in_valid_cnt, in_taken_cnt, out_valid_cnt, out_ready_cnt, out_taken
+   // Cycles with the input valid, input handshakes, cycles with the output
+   // valid and ready and output handshakes in traffic mode
+   int 				    in_valid_cnt, in_taken_cnt, out_valid_cnt, out_ready_cnt, out_taken;
+   // Signal: first_out, last_out
+   // Cycles of the first and last output handshakes in traffic mode
+   int 				    first_out, last_out;
    // Events for synchronizing the simulation
    event 			    gen_inp;    // generate input activation matrix
    event 			    gen_weights;// generate weight matrix
@@ -124,6 +177,17 @@ module mvau_stream_tb_v3;
 	aresetn 	= 0;
 	sim_start = 0;
 	test_count 	      = 0;
+	if(!$value$plusargs("ACT_MatrixW=%d", act_w))
+	  act_w = ACT_MatrixW;
+	if(act_w < 1 || act_w > ACT_MatrixW)
+	  $fatal(1, "ACT_MatrixW=%0d must be between 1 and the %0d output pixels of the snapshot", act_w, ACT_MatrixW);
+	traffic = $value$plusargs("TRAFFIC=%d", traffic_len);
+	if(traffic) begin
+	   if(traffic_len < 1 || traffic_len > TRAFFIC_LEN)
+	     $fatal(1, "TRAFFIC=%0d must be between 1 and %0d cycles", traffic_len, TRAFFIC_LEN);
+	   $readmemb("traffic_in.mem",in_pat);
+	   $readmemb("traffic_out.mem",out_pat);
+	end
 	
 	// Generating events to generate input vector and coefficients for test	
 	#1 		      -> gen_inp; // To populate the input data vector
@@ -133,6 +197,9 @@ module mvau_stream_tb_v3;
 	#(INIT_DLY);//-CLK_PER/2) -> test_event; // Test event to start generating input
 	//#(CLK_PER/2);
 
+	dump_out = $test$plusargs("DUMP_OUT") | traffic;
+	if(dump_out)
+	  dump_fd = $fopen("out_dump.mem","w");
 	aresetn 		      = 1; // Coming out of reset
 	//rready = 1; // Fixing rready to '1' as this is just test bench
 	sim_start = 1;
@@ -142,7 +209,13 @@ module mvau_stream_tb_v3;
 
 	// Checking DUT output with golden output generated by HLS
 	//#(CLK_PER*4);// Delaying to synchronize the DUT output
-	for(int i = 0; i < ACT_MatrixW; i++) begin
+	if(traffic) begin
+	   // Outputs taken on each handshake by TRAFFIC_GEN
+	   wait(out_taken == MatrixH/PE*act_w);
+	   test_count = out_taken*PE;
+	end
+	else
+	for(int i = 0; i < act_w; i++) begin
 	   for(int j = 0; j < MatrixH/PE; j++) begin
 	      #(CLK_PER*MatrixW/SIMD);
 	      do_comp = 1;
@@ -150,36 +223,57 @@ module mvau_stream_tb_v3;
 	      @(posedge aclk) begin: TEST_DATA
 		 if(out_v) begin		    
 		    out_packed = out;
-		    for(int k = 0; k < PE; k++) begin
-		       if(out_packed[PE-k-1] == mvau_beh[i][j*PE+k]) begin
-			  $display($time, "<< PE%d : 0x%0h >>, << Model_%d_%d: 0x%0h",
-				   k,out_packed[PE-k-1],j*PE+k,i,mvau_beh[i][j*PE+k]);
+		    if(dump_out) begin
+		       // Writing all outputs, compared offline by mvau_cmp.py
+		       for(int k = 0; k < PE; k++) begin
+			  $fwrite(dump_fd, "%h\n", out_packed[PE-k-1]);
 			  test_count++;
 		       end
-		       else begin
-			  $display($time, "<< PE%d : 0x%0h >>, << Model_%d_%d: 0x%0h",
-				   k,out_packed[PE-k-1],j*PE+k,i,mvau_beh[i][j*PE+k]);
-			  assert (out_packed[PE-k-1] == mvau_beh[i][j*PE+k])
-			    else
-			      $fatal(1,"Data MisMatch");
-		       end
 		    end
+		    else begin
+		       for(int k = 0; k < PE; k++) begin
+			  if(out_packed[PE-k-1] == mvau_beh[i][j*PE+k]) begin
+			     $display($time, "<< PE%d : 0x%0h >>, << Model_%d_%d: 0x%0h",
+				      k,out_packed[PE-k-1],j*PE+k,i,mvau_beh[i][j*PE+k]);
+			     test_count++;
+			  end
+			  else begin
+			     $display($time, "<< PE%d : 0x%0h >>, << Model_%d_%d: 0x%0h",
+				      k,out_packed[PE-k-1],j*PE+k,i,mvau_beh[i][j*PE+k]);
+			     assert (out_packed[PE-k-1] == mvau_beh[i][j*PE+k])
+			       else
+				 $fatal(1,"Data MisMatch");
+			  end
+		       end // for (int k = 0; k < PE; k++)
+		    end // else: !if(dump_out)
 		 end // if (out_v)
 	      end // block: TEST_DATA
 	      do_comp = 0;
 	      wait(out_v==1'b0);
 	   end // for (int j = 0; j < MatrixH/PE; j++)
-	end // for (int i = 0; i < ACT_MatrixW; i++)
+	end // for (int i = 0; i < act_w; i++)
 	sim_start = 0;
+	if(dump_out)
+	  $fclose(dump_fd);
 	
 	#RAND_DLY;
-	if(test_count == TOTAL_OUTPUTS) begin
+	if(test_count == MatrixH*act_w) begin
 	   integer f;
 	   $display($time, " << Simulation Complete. Total successul outputs: %d >>", test_count);
+	   if(dump_out)
+	     $display($time, " << Outputs dumped to out_dump.mem >>");
 	   $display($time, " << Latency: %d >>", latency);
 	   f = $fopen("latency.txt","w");
 	   $fwrite(f,"%d",latency);
 	   $fclose(f);	   
+	   if(traffic) begin
+	      $display($time, " << Output handshakes: %0d in %0d cycles, input handshakes: %0d in %0d valid cycles >>",
+		       out_taken, latency, in_taken_cnt, in_valid_cnt);
+	      f = $fopen("traffic.txt","w");
+	      $fwrite(f,"cycles %0d\nin_valid %0d\nin_taken %0d\nout_valid %0d\nout_ready %0d\nout_taken %0d\nfirst_out %0d\nlast_out %0d\n",
+		      latency, in_valid_cnt, in_taken_cnt, out_valid_cnt, out_ready_cnt, out_taken, first_out, last_out);
+	      $fclose(f);
+	   end
 	   $stop;
 	end
 	else begin
@@ -206,7 +300,11 @@ module mvau_stream_tb_v3;
    // from a memory file
    always @(gen_inp)
      begin: INP_ACT_MAT_GEN
-	$readmemh("inp_act.mem",in_mat);
+	$readmemh("inp_act.mem",in_flat);
+	for(int m = 0; m < MMV; m++)
+	  for(int i = 0; i < act_w; i++)
+	    for(int j = 0; j < ACT_WORDS; j++)
+	      in_mat[m][i][j] = in_flat[(m*act_w+i)*ACT_WORDS+j];
      end
 
    // Always: OUT_ACT_MAT_GEN
@@ -230,16 +328,20 @@ module mvau_stream_tb_v3;
    
    // Always_Comb: Input Ready
    always @(out_v)
-     rready = out_v;
+     if(!traffic)
+       rready = out_v;
 
    /*
     * Generating data for DUT
     * */
    
    int m_inp, i_inp, j_inp;
+   logic inp_last;
+   assign inp_last = (m_inp == MMV-1 & i_inp == act_w-1 & j_inp == ACT_MatrixH/SIMD-1);
    
    // Always: Counters
-   // Three counters to control the generation of input
+   // Three counters to control the generation of input, advancing
+   // on each handshake in traffic mode
    always @(posedge aclk) begin
       if(!aresetn) begin
 	 m_inp <= 0;
@@ -247,14 +349,14 @@ module mvau_stream_tb_v3;
 	 j_inp <= 0;
 	 //in_v_init <= 1'd0;	 
       end
-      else if(wready) begin
-	 if(m_inp == MMV-1 & i_inp == ACT_MatrixW-1 & j_inp == ACT_MatrixH/SIMD-1) begin
+      else if(wready & (in_v | ~traffic)) begin
+	 if(m_inp == MMV-1 & i_inp == act_w-1 & j_inp == ACT_MatrixH/SIMD-1) begin
 	    m_inp <= MMV-1;
-	    i_inp <= ACT_MatrixW-1;
+	    i_inp <= act_w-1;
 	    j_inp <= ACT_MatrixH/SIMD-1;
 	    //in_v_init <= 1'd0;	    
 	 end
-	 else if(i_inp == ACT_MatrixW-1 & j_inp == ACT_MatrixH/SIMD-1) begin
+	 else if(i_inp == act_w-1 & j_inp == ACT_MatrixH/SIMD-1) begin
 	    i_inp <= 0;
 	    j_inp <= 0;
 	    m_inp <= m_inp+1;
@@ -277,50 +379,62 @@ module mvau_stream_tb_v3;
    end
    
    // Always_FF: INP_V_GEN
-   // Generating input valid for a variety of cases
-   if(ACT_MatrixW==1) begin: COL_1
-      if(ACT_MatrixH/SIMD==1) begin: ROW_1
-	 always_ff @(posedge aclk) begin
-	    if(!aresetn)
-	      in_v <= 1'b0;
-	    else
-	      in_v <= ~in_v;
-	 end
-end
-      else begin: ROW_N
-	 always_ff @(posedge aclk) begin
-	    if(!aresetn)
-	      in_v <= 1'b0;
-	    else if(m_inp == MMV-1 & j_inp == ACT_MatrixH/SIMD-1)
-	      in_v <= 1'b0;
-	    else
-	      in_v <= 1'b1;
-	 end
-end
-   end // block: COL_1   
-   else begin: COL_N
-      if(ACT_MatrixH/SIMD==1) begin: ROW_1
-	 always_ff @(posedge aclk) begin
-	    if(!aresetn)
-	      in_v <= 1'b0;
-	    else if(m_inp == MMV-1 & i_inp == ACT_MatrixW-1)
-	      in_v <= 1'b0;
-	    else
-	      in_v <= 1'b1;
-	 end
-end
-      else begin: ROW_N   
-	 always_ff @(posedge aclk) begin
-	    if(!aresetn)
-	      in_v <= 1'b0;
-	    else if(m_inp == MMV-1 & i_inp == ACT_MatrixW-1 & j_inp == ACT_MatrixH/SIMD-1)
-	      in_v <= 1'b0;
-	    else
-	      in_v <= 1'b1;
-	 end
-end
-   end // block: COL_N
+   // Generating input valid for a variety of cases, the number of
+   // output pixels (act_w) being known at run time. In traffic mode,
+   // the input valid is held until the word is taken and otherwise
+   // follows the input pattern until the last word is taken
+   always_ff @(posedge aclk) begin
+      if(!aresetn)
+	in_v <= 1'b0;
+      else if(traffic) begin
+	 if(in_v & ~wready)
+	   in_v <= 1'b1;
+	 else if(in_done | in_v & inp_last)
+	   in_v <= 1'b0;
+	 else
+	   in_v <= in_pat[t_idx];
+      end
+      else if(act_w == 1 & ACT_MatrixH/SIMD == 1)
+	in_v <= ~in_v;
+      else if(m_inp == MMV-1 & i_inp == act_w-1 & j_inp == ACT_MatrixH/SIMD-1)
+	in_v <= 1'b0;
+      else
+	in_v <= 1'b1;
+   end
 
+   // Always: TRAFFIC_GEN
+   // Generating the output ready from the output pattern in traffic mode,
+   // taking the outputs on each handshake and counting the handshakes
+   always @(posedge aclk) begin
+      if(traffic & !aresetn) begin
+	 t_idx <= 0;
+	 rready <= 1'b0;
+	 in_done <= 1'b0;
+	 in_valid_cnt <= 0;
+	 in_taken_cnt <= 0;
+	 out_valid_cnt <= 0;
+	 out_ready_cnt <= 0;
+	 out_taken <= 0;
+      end
+      else if(traffic & sim_start) begin
+	 t_idx <= (t_idx == traffic_len-1) ? 0 : t_idx+1;
+	 rready <= out_pat[t_idx];
+	 if(in_v & wready & inp_last)
+	   in_done <= 1'b1;
+	 in_valid_cnt <= in_valid_cnt + in_v;
+	 in_taken_cnt <= in_taken_cnt + (in_v & wready);
+	 out_valid_cnt <= out_valid_cnt + out_v;
+	 out_ready_cnt <= out_ready_cnt + rready;
+	 if(out_v & rready) begin
+	    for(int k = 0; k < PE; k++)
+	      $fwrite(dump_fd, "%h\n", out[k*TDstI +: TDstI]);
+	    if(out_taken == 0)
+	      first_out <= latency;
+	    last_out <= latency;
+	    out_taken <= out_taken+1;
+	 end
+      end
+   end
    
    int x_inp, r_inp, s_inp;   
    // Always: Counters
@@ -332,8 +446,8 @@ end
 	 s_inp <= 0;
       end
       else if(wmem_wready) begin
-	 if(x_inp == ACT_MatrixW-1 & r_inp == MatrixH/PE-1 & s_inp == MatrixW/SIMD-1) begin
-	    x_inp <= ACT_MatrixW-1;
+	 if(x_inp == act_w-1 & r_inp == MatrixH/PE-1 & s_inp == MatrixW/SIMD-1) begin
+	    x_inp <= act_w-1;
 	    r_inp <= MatrixH/PE-1;
 	    s_inp <= MatrixW/SIMD-1;
 	 end
@@ -370,7 +484,7 @@ end
    always_ff @(posedge aclk) begin
       if(!aresetn)
 	in_wgt_v <= 1'b0;
-      else if(x_inp == ACT_MatrixW-1 & r_inp == MatrixH/PE-1 & s_inp == MatrixW/SIMD-1)
+      else if(x_inp == act_w-1 & r_inp == MatrixH/PE-1 & s_inp == MatrixW/SIMD-1)
 	in_wgt_v <= 1'b0;
       else
 	in_wgt_v <= 1'b1;
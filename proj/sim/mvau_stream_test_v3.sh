@@ -1,7 +1,10 @@
 #!/bin/bash
 rm -rf mvau_stream_tb_v3.wdb
+rm -f out_dump.mem
 make clean
 DO_GUI="gui"
+# Elaboration and simulation are timed by mvau_events.py when MVAU_EVENT_LOG is set
+span="python ../RegressionTests/mvau_events.py run"
 if [ "$1" == "$DO_GUI" ]; then
     xelab -prj mvau_stream_files.prj -s run_mvau_stream_v3 work.mvau_stream_tb_v3 --debug all
     if [ $? -eq 0 ]; then
@@ -11,14 +14,47 @@ if [ "$1" == "$DO_GUI" ]; then
 	exit 0
     fi
     xsim run_mvau_stream_v3 -gui -wdb mvau_stream_tb_v3.wdb -t mvau_xsim_gui.tcl
+elif [ "${MVAU_SIM_SHARDS:-1}" -gt 1 ]; then
+    # Output pixels are split into MVAU_SIM_SHARDS shards simulated in parallel by mvau_shard.py,
+    # with the simulator given by MVAU_SIMULATOR
+    $span shards -- python mvau_shard.py -k $MVAU_SIM_SHARDS --stream
+    if [ $? -ne 0 ]; then
+	echo "RTL simulation failed"
+	exit 0
+    fi
+elif [ "${MVAU_SIMULATOR:-xsim}" == "verilator" ]; then
+    # The unit is built with Verilator and simulated by its C++ harness, see mvau_verilator.py
+    python mvau_verilator.py --stream --build_only
+    if [ $? -eq 0 ]; then
+	echo "RTL files compilation successfull"
+    else
+	echo "RTL files compilation failed"
+	exit 0
+    fi
+    python mvau_verilator.py --stream
+    if [ $? -ne 0 ]; then
+	echo "RTL simulation failed"
+	exit 0
+    fi
 else
-    xelab -prj mvau_stream_files.prj -s run_mvau_stream_v3 work.mvau_stream_tb_v3
+    # The test bench is elaborated once for each hardware shape and the snapshot reused, see mvau_snapshot.py
+    python mvau_snapshot.py elab --stream
     if [ $? -eq 0 ]; then
 	echo "RTL files compilation successfull"
     else
 	echo "RTL files compilation failed"
 	exit 0
     fi
-    xsim run_mvau_stream_v3 -t mvau_xsim.tcl
+    # All outputs are dumped and compared offline by mvau_cmp.py
+    python mvau_snapshot.py sim --stream --
+    if [ $? -ne 0 ]; then
+	echo "RTL simulation failed"
+	exit 0
+    fi
+    $span cmp -- python mvau_cmp.py
+    if [ $? -ne 0 ]; then
+	echo "RTL simulation failed"
+	exit 0
+    fi
 fi
 exit 1
@@ -35,7 +35,14 @@ else
 fi
 
 
-rm mvau_weight_mem[0-9]*.sv
+for f in mvau_weight_mem[0-9]*.sv
+do
+    wmem_id=${f#mvau_weight_mem}
+    wmem_id=${wmem_id%.sv}
+    if [ -f "${f}" ] && [ ${wmem_id} -ge ${pe} ]; then
+	rm ${f}
+    fi
+done
 for((p=0; p<${pe}; p++))
 do
     python gen_mvau_weight_mem.py --wmem_id ${p}
@@ -0,0 +1,355 @@
+ #
+ # Python Script: MVAU Traffic Generator (mvau_traffic.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file measures the throughput of the MVAU batch or stream unit under
+ # back-pressure. It generates patterns of the input valid (upstream) and output
+ # ready (downstream) for a number of traffic points, each a traffic profile
+ # with an offered load, i.e., the fraction of cycles with the signal set, for
+ # each side:
+ # - bernoulli: set in each cycle with the probability of the load
+ # - bursty: set in bursts with a mean length of --burst cycles, separated by
+ #           gaps of random length giving the load on average. The bursts are
+ #           lengthened for loads above burst/(burst+1), as no gap is shorter
+ #           than one cycle
+ # - periodic: set in the first load*--period cycles of every --period cycles,
+ #             rounded to at least one cycle set and, below a load of 1, one
+ #             cycle not set
+ # The offered load of the patterns (the fraction of their cycles set) is measured
+ # and stored along with the nominal one, and a warning is printed when they differ
+ # by more than --load_tol, e.g. for a periodic load which is not a multiple of
+ # 1/--period.
+ # For each traffic point, a folder (traffic/<point>) is created with links to
+ # the memory files and the patterns, traffic_in.mem and traffic_out.mem, and
+ # the v3 test bench is simulated with the plusarg +TRAFFIC=<n> (see
+ # mvau_tb_v3.sv and mvau_stream_tb_v3.sv). The patterns are repeated over the
+ # simulation, the input valid being held until the word is taken. The test
+ # bench is elaborated once (see mvau_snapshot.py), or built with Verilator with
+ # --verilator (see mvau_verilator.py), and the traffic points are simulated at
+ # the same time.
+ #
+ # The outputs of each traffic point are compared with the golden data (see
+ # mvau_cmp.py) and the handshake counts written by the test bench to
+ # traffic.txt give:
+ # - Out/cycle: output words taken per clock cycle, from reset to the last output
+ # - Sustained: output words taken per clock cycle between the first and the last
+ #   output, leaving out the latency of the pipeline
+ # - Efficiency: the sustained throughput with respect to one output word every
+ #   SF=MatrixW/SIMD cycles, the throughput of the unit without back-pressure
+ # - In stall and Out stall: fraction of the cycles with the input (output) valid
+ #   in which the word was not taken
+ # - In offered and Out offered: offered load of the input valid and output ready
+ #   patterns
+ # The results are stored in the throughput table of the results database
+ # (see mvau_results_db.py) with --db. The exit status is 0 if the outputs of
+ # all traffic points match and 1 otherwise.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_traffic.py --stream                                  - Output ready loads of 1, 0.75, 0.5 and 0.25 (bernoulli)
+ # python mvau_traffic.py --profile bursty periodic --in_load 0.5 1 - Input valid and output ready loads of 0.5 and 1
+ # python mvau_traffic.py --stream -d ../RegressionTests/mvau_results.db -s <sweep> -c <config set>
+ #                                                                  - Stores the results with a configuration set of a sweep
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from mvau_cmp import read_defn, read_out, compare_out
+from mvau_snapshot import elaborate, simulate
+import mvau_verilator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "RegressionTests"))
+from mvau_results_db import ResultsDB
+
+# Variable: traffic_profiles
+# Traffic profiles of the input valid and output ready
+traffic_profiles = ('bernoulli', 'bursty', 'periodic')
+
+# Variable: traffic_len
+# Largest number of cycles of the patterns (TRAFFIC_LEN of the test benches)
+traffic_len = 4096
+
+# Function: gen_pattern
+# This function generates the pattern of a valid or ready signal
+#
+# Parameters:
+#   profile - Traffic profile, one of traffic_profiles
+#   load - Offered load, fraction of the cycles with the signal set (0 < load <= 1)
+#   length - Number of cycles of the pattern
+#   rng - NumPy random generator
+#   burst - Mean length of the bursts (bursty)
+#   period - Number of cycles of each period (periodic)
+#
+# Returns:
+#
+#   pat - Array of the signal in each cycle (0 or 1)
+def gen_pattern(profile, load, length, rng, burst=8, period=10):
+    if(not 0 < load <= 1):
+        raise ValueError("Load %g must be in (0, 1]" % load)
+    if(load == 1):
+        return np.ones(length, dtype=np.uint8)
+    if(profile == 'bernoulli'):
+        return (rng.random(length) < load).astype(np.uint8)
+    if(profile == 'bursty'):
+        ### Bursts and gaps of geometric lengths, with a mean gap of burst*(1-load)/load cycles,
+        ### of at least one cycle
+        burst = max(burst, load/(1-load))
+        gap = burst*(1-load)/load
+        runs = []
+        total = 0
+        on = rng.random() < load
+        while(total < length):
+            runs.append(np.full(rng.geometric(min(1, 1/(burst if on else gap))), on, dtype=np.uint8))
+            total += len(runs[-1])
+            on = not on
+        return np.concatenate(runs)[:length]
+    if(profile == 'periodic'):
+        ### Whole periods only, so that the pattern repeats without a break
+        length = max(period, length - length % period)
+        return (np.arange(length) % period < max(1, min(period-1, round(load*period)))).astype(np.uint8)
+    raise ValueError("Unknown traffic profile %s" % profile)
+
+# Function: write_pattern
+# This function writes a pattern to a memory file read by $readmemb, one cycle per line
+#
+# Parameters:
+#   fname - Memory file name
+#   pat - Array of the signal in each cycle
+#
+# Returns:
+#
+#   None
+def write_pattern(fname, pat):
+    with open(fname, "wt") as f:
+        f.write("".join("1\n" if b else "0\n" for b in pat))
+
+# Function: point_name
+# This function returns the name of the folder of a traffic point
+#
+# Parameters:
+#   profile - Traffic profile
+#   in_load - Offered load of the input valid
+#   out_load - Offered load of the output ready
+#
+# Returns:
+#
+#   name - Folder name
+def point_name(profile, in_load, out_load):
+    return "%s_in%g_out%g" % (profile, in_load, out_load)
+
+# Function: make_points
+# This function creates the folder of each traffic point with its patterns and links
+# to the memory files
+#
+# Parameters:
+#   sim_dir - Simulation folder (proj/sim)
+#   points - List of the profile, input and output load of each traffic point
+#   length - Number of cycles of the patterns
+#   seed - Seed of the random patterns
+#   burst - Mean length of the bursts (bursty)
+#   period - Number of cycles of each period (periodic)
+#
+# Returns:
+#
+#   point_dirs - List of the folders of the traffic points
+#   lens - List of the number of cycles of the patterns of each traffic point
+#   loads - List of the offered loads of the input valid and output ready patterns
+#           of each traffic point
+def make_points(sim_dir, points, length, seed, burst, period):
+    mems = [m for m in glob.glob(os.path.join(sim_dir,"*.mem")) if os.path.basename(m) != "out_dump.mem"]
+    shutil.rmtree(os.path.join(sim_dir,"traffic"), ignore_errors=True)
+    point_dirs, lens, loads = [], [], []
+    for k, (profile, in_load, out_load) in enumerate(points):
+        d = os.path.join(sim_dir,"traffic",point_name(profile, in_load, out_load))
+        os.makedirs(d)
+        for m in mems:
+            os.symlink(m, os.path.join(d,os.path.basename(m)))
+        ### A different random stream for each traffic point
+        rng = np.random.default_rng([seed, k])
+        in_pat = gen_pattern(profile, in_load, length, rng, burst, period)
+        out_pat = gen_pattern(profile, out_load, length, rng, burst, period)
+        ### Both patterns repeat with the same number of cycles
+        n = min(len(in_pat), len(out_pat))
+        write_pattern(os.path.join(d,"traffic_in.mem"), in_pat[:n])
+        write_pattern(os.path.join(d,"traffic_out.mem"), out_pat[:n])
+        point_dirs.append(d)
+        lens.append(n)
+        loads.append((in_pat[:n].mean(), out_pat[:n].mean()))
+    return point_dirs, lens, loads
+
+# Function: run_point
+# This function simulates one traffic point
+#
+# Parameters:
+#   point_dir - Folder of the traffic point
+#   snap_dir - Folder of the snapshot (returned by elaborate of mvau_snapshot.py)
+#              or of the Verilator model (returned by build of mvau_verilator.py)
+#   unit - Unit simulated, 'batch' or 'stream'
+#   pixels - Number of output pixels
+#   length - Number of cycles of the patterns
+#   verilator - True to run the Verilator model instead of xsim
+#
+# Returns:
+#
+#   ok - True if the simulation completed
+def run_point(point_dir, snap_dir, unit, pixels, length, verilator=False):
+    with open(os.path.join(point_dir,"traffic.log"),"wt") as log:
+        if(verilator):
+            return mvau_verilator.simulate(point_dir, snap_dir, pixels, ["+TRAFFIC=%d" % length], log = log) == 0
+        return simulate(point_dir, snap_dir, unit, pixels, ["-testplusarg", "TRAFFIC=%d" % length], log = log) == 0
+
+# Function: read_traffic
+# This function reads the handshake counts written by the test bench
+#
+# Parameters:
+#   fname - File name (traffic.txt)
+#
+# Returns:
+#
+#   counts - Dictionary of the counts (cycles, in_valid, in_taken, out_valid,
+#            out_ready, out_taken, first_out and last_out)
+def read_traffic(fname):
+    with open(fname) as f:
+        return {k: int(v) for k, v in (line.split() for line in f if line.strip())}
+
+# Function: point_stats
+# This function compares the outputs of a traffic point and computes its throughput
+#
+# Parameters:
+#   point_dir - Folder of the traffic point
+#   done - True if the simulation completed (returned by run_point)
+#   params - Dictionary of the parameters of the package file (returned by read_defn)
+#
+# Returns:
+#
+#   stats - Dictionary of the throughput measures (see the header of this file),
+#           None if the simulation did not complete
+def point_stats(point_dir, done, params):
+    try:
+        counts = read_traffic(os.path.join(point_dir,"traffic.txt"))
+        dut, dut_unknown = read_out(os.path.join(point_dir,"out_dump.mem"), params['TDstI'])
+    except (OSError, ValueError):
+        return None
+    gold, _ = read_out(os.path.join(point_dir,"out_act.mem"), params['TDstI'])
+    cmp = compare_out(dut, dut_unknown, gold, params['MatrixH'], params['PE'])
+    sf = params['MatrixW']//params['SIMD']
+    outputs = counts['out_taken']
+    span = counts['last_out'] - counts['first_out']
+    sustained = (outputs-1)/span if span > 0 else float('nan')
+    return {'cycles': counts['cycles'], 'outputs': outputs,
+            'out_per_cycle': outputs/counts['cycles'], 'sustained': sustained,
+            'ideal': 1/sf, 'efficiency': sustained*sf,
+            'in_stall': 1-counts['in_taken']/max(1, counts['in_valid']),
+            'out_stall': 1-counts['out_taken']/max(1, counts['out_valid']),
+            'ok': done and cmp['mismatches'] == 0 and cmp['missing'] == 0 and cmp['extra'] == 0}
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for measuring the MVAU throughput under back-pressure')
+    parser.add_argument('--stream', action='store_true',
+			help="Simulates the stream unit instead of the batch unit")
+    parser.add_argument('--profile', nargs='+', default=['bernoulli'], choices=traffic_profiles,
+			help="Traffic profiles")
+    parser.add_argument('--in_load', nargs='+', default=[1.0], type=float,
+			help="Offered loads of the input valid")
+    parser.add_argument('--out_load', nargs='+', default=[1.0, 0.75, 0.5, 0.25], type=float,
+			help="Offered loads of the output ready")
+    parser.add_argument('--burst', default=8, type=float,
+			help="Mean length of the bursts (bursty)")
+    parser.add_argument('--period', default=10, type=int,
+			help="Number of cycles of each period (periodic)")
+    parser.add_argument('--load_tol', default=0.02, type=float,
+			help="Largest difference between the offered and nominal loads without a warning")
+    parser.add_argument('--length', default=traffic_len, type=int,
+			help="Number of cycles of the patterns, repeated over the simulation")
+    parser.add_argument('--seed', default=1, type=int,
+			help="Seed of the random patterns")
+    parser.add_argument('-j','--jobs', default=None, type=int,
+			help="Number of traffic points simulated at the same time, all by default")
+    parser.add_argument('--verilator', action='store_true', default=os.environ.get('MVAU_SIMULATOR') == 'verilator',
+			help="Simulates with Verilator instead of xsim, the default if MVAU_SIMULATOR is verilator")
+    parser.add_argument('-t','--threads', default=int(os.environ.get('MVAU_VERILATOR_THREADS') or 1), type=int,
+			help="Number of threads of the Verilator model")
+    parser.add_argument('-d','--db', default=None,
+			help="Results database file the throughput is stored in")
+    parser.add_argument('-s','--sweep', default=None,
+			help="Name of the sweep in the results database, traffic-<date and time> by default")
+    parser.add_argument('-c','--config_set', default=None, type=int,
+			help="Configuration set of the sweep")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# simulates the traffic points and reports and stores their throughput
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    if(not 1 <= args.length <= traffic_len):
+        print(f'Number of cycles of the patterns must be between 1 and {traffic_len}')
+        sys.exit(1)
+    sim_dir = os.path.dirname(os.path.abspath(__file__))
+    unit = 'stream' if args.stream else 'batch'
+    params = read_defn(os.path.join(sim_dir,"mvau_defn.sv"))
+    pixels = params['OFMDim']*params['OFMDim']
+    points = [(p, i, o) for p in args.profile for i in args.in_load for o in args.out_load]
+    try:
+        point_dirs, lens, loads = make_points(sim_dir, points, args.length, args.seed, args.burst, args.period)
+    except:
+        print("Cannot create the traffic points")
+        raise
+    for (profile, in_load, out_load), (in_offered, out_offered) in zip(points, loads):
+        if(abs(in_offered-in_load) > args.load_tol or abs(out_offered-out_load) > args.load_tol):
+            print(f'Warning: offered loads of {point_name(profile, in_load, out_load)} are {in_offered:.3f} '
+                  f'and {out_offered:.3f}, not {in_load:g} and {out_load:g}')
+    if(args.verilator):
+        snap_dir = mvau_verilator.build(unit, params, args.threads)
+    else:
+        snap_dir = elaborate(unit, pixels)
+    if(snap_dir is None):
+        print("RTL files compilation failed")
+        sys.exit(1)
+    print(f'Simulating {len(points)} traffic points of {pixels} output pixels')
+    with ThreadPoolExecutor(max_workers=args.jobs or len(points)) as executor:
+        done = list(executor.map(lambda p: run_point(p[0], snap_dir, unit, pixels, p[1], args.verilator),
+                                 zip(point_dirs, lens)))
+
+    ### Throughput of each traffic point, stored with the configuration of the unit
+    config = {'unit': unit, 'ifm_ch': params['IFMCh'], 'ifm_dim': params['IFMDim'], 'ofm_ch': params['OFMCh'],
+              'kdim': params['KDim'], 'simd': params['SIMD'], 'pe': params['PE'], 'mmv': params['MMV']}
+    recs = []
+    print("Profile\t\tIn load\tOut load\tIn offered\tOut offered\tCycles\tOutputs\tOut/cycle\tSustained\t"
+          "Efficiency\tIn stall\tOut stall\tResult")
+    for (profile, in_load, out_load), (in_offered, out_offered), d, ok in zip(points, loads, point_dirs, done):
+        stats = point_stats(d, ok, params)
+        if(stats is None):
+            print(f'{profile:<9}\t{in_load:g}\t{out_load:g}\t\t{in_offered:.4f}\t\t{out_offered:.4f}\t\t'
+                  f'-\t-\t-\t\t-\t\t-\t\t-\t\t-\t\tFailed')
+            stats = {'ok': False}
+        else:
+            print(f'{profile:<9}\t{in_load:g}\t{out_load:g}\t\t{in_offered:.4f}\t\t{out_offered:.4f}\t\t'
+                  f'{stats["cycles"]}\t{stats["outputs"]}\t'
+                  f'{stats["out_per_cycle"]:.4f}\t\t{stats["sustained"]:.4f}\t\t{stats["efficiency"]:.1%}\t\t'
+                  f'{stats["in_stall"]:.1%}\t\t{stats["out_stall"]:.1%}\t\t{"Pass" if stats["ok"] else "Data MisMatch"}')
+        recs.append(dict(config, profile=profile, in_load=in_load, out_load=out_load, in_offered=in_offered,
+                         out_offered=out_offered, seed=args.seed, **stats))
+    if(args.db is not None):
+        sweep = args.sweep if args.sweep is not None else time.strftime("traffic-%Y%m%d-%H%M%S")
+        db = ResultsDB(args.db)
+        db.add_throughput(sweep, args.config_set, recs)
+        db.close()
+        print(f'Throughput of {len(recs)} traffic points written to sweep {sweep} of {args.db}')
+    sys.exit(0 if all(r['ok'] for r in recs) else 1)
@@ -0,0 +1,198 @@
+ #
+ # Python Script: MVAU Verilator Simulation (mvau_verilator.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file simulates the MVAU batch (mvau_top) or stream (mvau_stream_top)
+ # unit with Verilator instead of xsim, using a locally installed Verilator (5.0
+ # or later) and no Vivado licence. The unit is built with the C++ harness
+ # mvau_vl_harness.cpp, which drives it like the v3 test benches: it feeds the
+ # input activations of inp_act.mem (and the weights of inp_wgt.mem for the
+ # stream unit), dumps all outputs to out_dump.mem and writes the latency to
+ # latency.txt. The outputs are then compared with the golden data
+ # (out_act.mem) by mvau_cmp.py. The exit status is 0 if all outputs match and
+ # 1 otherwise.
+ #
+ # The Verilator model is multi-threaded (--threads, MVAU_VERILATOR_THREADS,
+ # 1 by default) and built once for each hardware shape and number of threads
+ # in the snapshot cache of mvau_snapshot.py (MVAU_SNAPSHOT_CACHE), the number of
+ # output pixels being given to the harness at run time. The model is identified
+ # by a hash of the harness and of the design files, leaving out IFMDim, PAD
+ # and STRIDE, and is locked while it is built and run.
+ #
+ # The Verilator backend is experimental. The harness (the order of the weight
+ # tiles of the stream unit, the handshakes and the latency) has not yet been
+ # validated against xsim on the batch and stream units, and a warning is printed
+ # each time a model is built or reused.
+ #
+ # The build, simulation and comparison are timed by mvau_events.py when
+ # MVAU_EVENT_LOG is set, as stages vlbuild, vlsim and cmp nested in the stage of
+ # the parent process.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_verilator.py                  - Builds (unless cached) and simulates the batch unit
+ # python mvau_verilator.py --stream -t 4    - Same for the stream unit, with a model of 4 threads
+ # python mvau_verilator.py --build_only     - Only builds the model
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import os
+import sys
+import shutil
+import hashlib
+import argparse
+import subprocess
+from mvau_cmp import read_defn
+from mvau_snapshot import sim_dir, cache_dir, span_cmd, prj_sources, snapshot_key, snapshot_lock, prune, default_keep
+
+# Variable: harness
+# C++ harness of the Verilator model
+harness = os.path.join(sim_dir, "mvau_vl_harness.cpp")
+
+# Variable: vl_top
+# Top level module of each unit
+vl_top = {'batch': 'mvau_top', 'stream': 'mvau_stream_top'}
+
+# Variable: vl_bin
+# Executable of the Verilator model, in the obj_dir folder of the model
+vl_bin = "mvau_vl"
+
+# Variable: unvalidated
+# Warning printed when a Verilator model is used, until the harness is validated against xsim
+unvalidated = "Warning: the Verilator backend is experimental and unvalidated against xsim"
+
+# Function: model_key
+# This function computes the key of the Verilator model of a unit
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#   threads - Number of threads of the model
+#
+# Returns:
+#
+#   key - Name of the model in the cache
+def model_key(unit, threads):
+    h = hashlib.sha1(snapshot_key(unit).encode())
+    with open(harness, "rb") as f:
+        h.update(f.read())
+    return "%s_verilator_t%d_%s" % (unit, threads, h.hexdigest()[:16])
+
+# Function: harness_defines
+# This function returns the dimensions compiled in the harness
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#   params - Dictionary of the parameters of the package file (returned by read_defn)
+#
+# Returns:
+#
+#   defines - List of the -D options of the C++ compiler
+def harness_defines(unit, params):
+    defines = {'MVAU_MMV': params['MMV'], 'MVAU_SF': params['MatrixW']//params['SIMD'],
+               'MVAU_NF': params['MatrixH']//params['PE'], 'MVAU_PE': params['PE'],
+               'MVAU_TI': params['SIMD']*params['TSrcI'], 'MVAU_TDSTI': params['TDstI']}
+    if(unit == 'stream'):
+        defines['MVAU_STREAM'] = 1
+        defines['MVAU_TWS'] = params['SIMD']*params['TW']
+    return ["-D%s=%d" % (k, v) for k, v in defines.items()]
+
+# Function: build
+# This function returns the Verilator model of the current design files of a unit,
+# building it if it is not cached
+#
+# Parameters:
+#   unit - Unit simulated, 'batch' or 'stream'
+#   params - Dictionary of the parameters of the package file
+#   threads - Number of threads of the model
+#   log - File the output of Verilator is written to, None for the standard output
+#
+# Returns:
+#
+#   model_dir - Folder of the model, None if the build failed
+def build(unit, params, threads=1, log=None):
+    print(unvalidated, file=log, flush=True)
+    cache = cache_dir()
+    os.makedirs(cache, exist_ok=True)
+    model_dir = os.path.join(cache, model_key(unit, threads))
+    with snapshot_lock(model_dir):
+        if(os.path.isfile(os.path.join(model_dir, "obj_dir", vl_bin))):
+            print(f'Verilator model {os.path.basename(model_dir)} reused', file=log, flush=True)
+            os.utime(model_dir)
+            return model_dir
+        shutil.rmtree(model_dir, ignore_errors=True)
+        os.makedirs(model_dir)
+        ### Design files only, the test benches of the project file are left out
+        sources = [src for _, _, src in prj_sources(unit) if os.path.dirname(src) != sim_dir]
+        vl = ["verilator", "--cc", "--exe", "--build", "-j", "0", "-O3", "--threads", str(threads),
+              "--top-module", vl_top[unit], "--prefix", "Vmvau", "-Wno-fatal", "-Wno-lint", "-Wno-style",
+              "--Mdir", "obj_dir", "-o", vl_bin, "-CFLAGS", " ".join(["-O2"] + harness_defines(unit, params))]
+        if(subprocess.call(span_cmd("vlbuild") + vl + sources + [harness], cwd = model_dir,
+                           stdout = log, stderr = subprocess.STDOUT) != 0):
+            shutil.rmtree(model_dir, ignore_errors=True)
+            return None
+    prune(cache, int(os.environ.get('MVAU_SNAPSHOT_KEEP') or default_keep))
+    return model_dir
+
+# Function: simulate
+# This function runs the Verilator model from a folder holding the memory files
+#
+# Parameters:
+#   run_dir - Folder the simulation is run from
+#   model_dir - Folder of the model (returned by build)
+#   pixels - Number of output pixels simulated
+#   args - List of additional plusargs of the harness
+#   log - File the output of the harness is written to, None for the standard output
+#
+# Returns:
+#
+#   status - Exit status of the harness
+def simulate(run_dir, model_dir, pixels, args=(), log=None):
+    vlsim = [os.path.join(model_dir, "obj_dir", vl_bin), "+ACT_MatrixW=%d" % pixels] + list(args)
+    with snapshot_lock(model_dir, shared=True):
+        return subprocess.call(span_cmd("vlsim") + vlsim, cwd = run_dir, stdout = log, stderr = subprocess.STDOUT)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for simulating the MVAU with Verilator')
+    parser.add_argument('--stream', action='store_true',
+			help="Simulates the stream unit instead of the batch unit")
+    parser.add_argument('-t','--threads', default=int(os.environ.get('MVAU_VERILATOR_THREADS') or 1), type=int,
+			help="Number of threads of the Verilator model")
+    parser.add_argument('--build_only', action='store_true',
+			help="Only builds the Verilator model")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments,
+# builds and simulates the current configuration and compares its outputs
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    unit = 'stream' if args.stream else 'batch'
+    params = read_defn(os.path.join(sim_dir, "mvau_defn.sv"))
+    try:
+        model_dir = build(unit, params, args.threads)
+    except:
+        print("Cannot build the Verilator model")
+        raise
+    if(model_dir is None):
+        print("RTL files compilation failed")
+        sys.exit(1)
+    if(args.build_only):
+        sys.exit(0)
+    ### The output of the harness is written to xsim.log, checked by the regression test scripts
+    with open(os.path.join(os.getcwd(), "xsim.log"), "wt") as log:
+        status = simulate(os.getcwd(), model_dir, params['OFMDim']*params['OFMDim'], log = log)
+    with open(os.path.join(os.getcwd(), "xsim.log")) as log:
+        print(log.read(), end="")
+    if(status != 0):
+        print("Simulation failed")
+        sys.exit(1)
+    sys.exit(subprocess.call(span_cmd("cmp") + [sys.executable, os.path.join(sim_dir, "mvau_cmp.py")]))
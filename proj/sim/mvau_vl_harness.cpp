@@ -0,0 +1,363 @@
+/*
+ * C++ Harness: MVAU Verilator Harness (mvau_vl_harness.cpp)
+ *
+ * Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ *
+ * This file drives the Verilator model of the MVAU batch (mvau_top) or
+ * stream (mvau_stream_top, built with -DMVAU_STREAM) unit the same way as the
+ * v3 test benches, mvau_tb_v3.sv and mvau_stream_tb_v3.sv:
+ * - The unit is held in reset for two clock cycles
+ * - The input activation words are read from inp_act.mem in the order
+ *   [MMV][output pixels][MatrixW/SIMD] and presented one after the other,
+ *   advancing when the unit is ready (s0_axis_tready). The input valid is
+ *   registered and falls after the last word
+ * - The stream unit is fed with the weight tiles of inp_wgt.mem, in the order
+ *   [MatrixH/PE][MatrixW/SIMD], once for each output pixel, advancing when the
+ *   unit is ready (s1_axis_tready)
+ * - The output is always ready (batch) or ready when valid (stream). One output
+ *   word is taken for each pulse of the output valid and its PE elements are
+ *   written to out_dump.mem in the same format as with the plusarg +DUMP_OUT,
+ *   to be compared with the golden data by mvau_cmp.py
+ * - The latency, i.e., the number of clock cycles from reset to the last output,
+ *   is written to latency.txt
+ * - With the plusarg +TRAFFIC=<n>, the input valid and output ready follow the
+ *   patterns of n cycles of traffic_in.mem and traffic_out.mem as in the test
+ *   benches: the input valid is held until the word is taken, the output ready
+ *   is registered, the outputs are taken on each handshake and the handshake
+ *   counts are written to traffic.txt (see mvau_traffic.py)
+ * The weight memories of the batch unit read their memory files at time 0.
+ * All files are read from and written to the current folder.
+ *
+ * The dimensions of the unit are compiled in by mvau_verilator.py (MVAU_MMV,
+ * MVAU_SF=MatrixW/SIMD, MVAU_NF=MatrixH/PE, MVAU_PE, MVAU_TI, MVAU_TDSTI and,
+ * for the stream unit, MVAU_TWS=SIMD*TW), while the number of output pixels is
+ * given at run time by the plusarg +ACT_MatrixW=<n>. The exit status is 0 if
+ * all outputs were taken and 1 otherwise.
+ *
+ * This material is based upon work supported, in part, by Science Foundation
+ * Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ * European Union's Horizon 2020 research and innovation programme under the
+ * Marie Sklodowska-Curie grant agreement Grant No.754489.
+ */
+
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <memory>
+#include <string>
+#include <vector>
+#include <verilated.h>
+#include "Vmvau.h"
+
+// Type: Word
+// Memory word, 32-bit words with the least significant first
+typedef std::vector<uint32_t> Word;
+
+// Function: read_mem
+// Reads the hexadecimal words of a memory file, unknown digits read as 0
+//
+// Parameters:
+//   fname - Memory file name
+//   words - Vector the words are appended to
+//
+// Returns:
+// True if the file was read
+static bool read_mem(const char* fname, std::vector<Word>& words) {
+    std::ifstream f(fname);
+    if (!f) return false;
+    std::string line;
+    while (std::getline(f, line)) {
+	std::string digits;
+	for (char c : line) {
+	    if (c == '/') break;
+	    if (!isspace(static_cast<unsigned char>(c)) && c != '_') digits += c;
+	}
+	if (digits.empty()) continue;
+	Word w((digits.size()+7)/8, 0);
+	for (size_t d = 0; d < digits.size(); d++) {
+	    int nib = isxdigit(static_cast<unsigned char>(digits[digits.size()-1-d])) ?
+		std::stoi(std::string(1, digits[digits.size()-1-d]), nullptr, 16) : 0;
+	    w[d/8] |= static_cast<uint32_t>(nib) << (4*(d%8));
+	}
+	words.push_back(w);
+    }
+    return true;
+}
+
+// Function: word_bits
+// Extracts a bit field of at most 64 bits from a word
+static uint64_t word_bits(const Word& w, int lsb, int width) {
+    uint64_t v = 0;
+    for (int b = 0; b < width; b++) {
+	size_t i = (lsb+b)/32;
+	if (i < w.size() && ((w[i] >> ((lsb+b)%32)) & 1)) v |= 1ull << b;
+    }
+    return v;
+}
+
+// Function: set_port
+// Drives an input port of up to 64 bits (CData, SData, IData or QData) with the
+// lower bits of a word
+template <typename T>
+static void set_port(T& port, const Word& w, int width) {
+    port = static_cast<T>(word_bits(w, 0, width));
+}
+
+// Function: set_port
+// Drives an input port wider than 64 bits (VlWide) with the lower bits of a word
+template <std::size_t N>
+static void set_port(VlWide<N>& port, const Word& w, int width) {
+    for (std::size_t i = 0; i < N; i++) {
+	int bits = width-32*static_cast<int>(i);
+	uint32_t v = i < w.size() ? w[i] : 0;
+	port[i] = bits >= 32 ? v : (bits > 0 ? v & ((1u << bits)-1) : 0);
+    }
+}
+
+// Function: get_bits
+// Extracts a bit field of an output port of up to 64 bits
+template <typename T>
+static uint64_t get_bits(const T& port, int lsb, int width) {
+    uint64_t v = static_cast<uint64_t>(port) >> lsb;
+    return width >= 64 ? v : v & ((1ull << width)-1);
+}
+
+// Function: get_bits
+// Extracts a bit field of an output port wider than 64 bits
+template <std::size_t N>
+static uint64_t get_bits(const VlWide<N>& port, int lsb, int width) {
+    Word w(port.data(), port.data()+N);
+    return word_bits(w, lsb, width);
+}
+
+// Function: plusarg
+// Reads an integer plusarg +<name>=<value>
+static bool plusarg(int argc, char** argv, const char* name, int& value) {
+    std::string prefix = std::string("+")+name+"=";
+    for (int a = 1; a < argc; a++) {
+	if (strncmp(argv[a], prefix.c_str(), prefix.size()) == 0) {
+	    value = atoi(argv[a]+prefix.size());
+	    return true;
+	}
+    }
+    return false;
+}
+
+// Function: main
+// Reads the memory files, simulates the unit until all outputs are taken and
+// writes the outputs and latency
+int main(int argc, char** argv) {
+    const std::unique_ptr<VerilatedContext> ctx{new VerilatedContext};
+    ctx->commandArgs(argc, argv);
+    const std::unique_ptr<Vmvau> top{new Vmvau{ctx.get()}};
+
+    int act_w = 0;
+    if (!plusarg(argc, argv, "ACT_MatrixW", act_w) || act_w < 1) {
+	fprintf(stderr, "Number of output pixels must be given by +ACT_MatrixW=<n>\n");
+	return 1;
+    }
+    int max_cycles = 0;
+    if (!plusarg(argc, argv, "MAX_CYCLES", max_cycles))
+	max_cycles = 100*MVAU_MMV*act_w*(MVAU_SF*MVAU_NF+1)+10000;
+
+    std::vector<Word> in_act;
+    if (!read_mem("inp_act.mem", in_act) || in_act.size() < static_cast<size_t>(MVAU_MMV*act_w*MVAU_SF)) {
+	fprintf(stderr, "Cannot read %d input words from inp_act.mem\n", MVAU_MMV*act_w*MVAU_SF);
+	return 1;
+    }
+#ifdef MVAU_STREAM
+    // Weight tiles, PE slices of SIMD*TW bits placed in the reversed order of the
+    // stream, the first slice of the tile being the most significant of the stream
+    std::vector<Word> wgt_mem, in_wgt;
+    if (!read_mem("inp_wgt.mem", wgt_mem) || wgt_mem.size() < static_cast<size_t>(MVAU_NF*MVAU_SF)) {
+	fprintf(stderr, "Cannot read %d weight tiles from inp_wgt.mem\n", MVAU_NF*MVAU_SF);
+	return 1;
+    }
+    for (int t = 0; t < MVAU_NF*MVAU_SF; t++) {
+	Word w((MVAU_PE*MVAU_TWS+31)/32, 0);
+	for (int p = 0; p < MVAU_PE; p++) {
+	    for (int b = 0; b < MVAU_TWS; b++) {
+		int dst = (MVAU_PE-1-p)*MVAU_TWS+b;
+		if (word_bits(wgt_mem[t], p*MVAU_TWS+b, 1)) w[dst/32] |= 1u << (dst%32);
+	    }
+	}
+	in_wgt.push_back(w);
+    }
+    const int outputs = MVAU_NF*act_w;
+#else
+    const int outputs = MVAU_MMV*MVAU_NF*act_w;
+#endif
+
+    FILE* dump_fd = fopen("out_dump.mem", "w");
+    if (dump_fd == nullptr) {
+	fprintf(stderr, "Cannot write out_dump.mem\n");
+	return 1;
+    }
+    const int ndig = (MVAU_TDSTI+3)/4;
+
+    // Traffic patterns of the input valid and output ready, one bit per line
+    int traffic_len = 0;
+    const bool traffic = plusarg(argc, argv, "TRAFFIC", traffic_len);
+    std::vector<Word> in_pat, out_pat;
+    if (traffic && (traffic_len < 1 || !read_mem("traffic_in.mem", in_pat) || !read_mem("traffic_out.mem", out_pat) ||
+		    in_pat.size() < static_cast<size_t>(traffic_len) || out_pat.size() < static_cast<size_t>(traffic_len))) {
+	fprintf(stderr, "Cannot read traffic patterns of %d cycles from traffic_in.mem and traffic_out.mem\n", traffic_len);
+	return 1;
+    }
+
+    // Input counters (m, i, j), weight counters (x, r, s) and valids of the test bench
+    int m_inp = 0, i_inp = 0, j_inp = 0;
+    bool in_v = false;
+#ifdef MVAU_STREAM
+    int x_inp = 0, r_inp = 0, s_inp = 0;
+    bool in_wgt_v = false;
+#endif
+    bool armed = true;
+    int taken = 0;
+    long latency = 0;
+    // Pattern cycle, registered output ready and handshake counts of the traffic mode
+    int t_idx = 0;
+    bool rready = false, in_done = false;
+    long in_valid_cnt = 0, in_taken_cnt = 0, out_valid_cnt = 0, out_ready_cnt = 0, first_out = 0, last_out = 0;
+
+    printf("%ld << Starting Simulation >>\n", static_cast<long>(ctx->time()));
+    top->aclk = 0;
+    top->aresetn = 0;
+    for (long cycle = 0; taken < outputs && cycle < max_cycles && !ctx->gotFinish(); cycle++) {
+	const bool reset = cycle < 2;
+	top->aresetn = reset ? 0 : 1;
+	set_port(top->s0_axis_tdata, in_act[(m_inp*act_w+i_inp)*MVAU_SF+j_inp], MVAU_TI);
+	top->s0_axis_tvalid = in_v;
+#ifdef MVAU_STREAM
+	set_port(top->s1_axis_tdata, in_wgt[r_inp*MVAU_SF+s_inp], MVAU_PE*MVAU_TWS);
+	top->s1_axis_tvalid = in_wgt_v;
+	top->eval();
+	top->m0_axis_tready = traffic ? rready : top->m0_axis_tvalid;
+#else
+	top->m0_axis_tready = traffic ? rready : 1;
+#endif
+	top->eval();
+
+	// Values seen by the test bench at the rising edge
+	const bool wready = top->s0_axis_tready;
+	const bool out_v = top->m0_axis_tvalid;
+#ifdef MVAU_STREAM
+	const bool wmem_wready = top->s1_axis_tready;
+#endif
+	if (!reset) latency++;
+	const bool take = traffic ? out_v && rready : out_v && armed;
+	if (take && !reset) {
+	    for (int k = 0; k < MVAU_PE; k++)
+		fprintf(dump_fd, "%0*llx\n", ndig,
+			static_cast<unsigned long long>(get_bits(top->m0_axis_tdata, k*MVAU_TDSTI, MVAU_TDSTI)));
+	    if (taken == 0) first_out = latency-1;
+	    last_out = latency-1;
+	    taken++;
+	}
+	armed = !out_v;
+	if (traffic && !reset) {
+	    in_valid_cnt += in_v;
+	    in_taken_cnt += in_v && wready;
+	    out_valid_cnt += out_v;
+	    out_ready_cnt += rready;
+	}
+
+	ctx->timeInc(10);
+	top->aclk = 1;
+	top->eval();
+	ctx->timeInc(10);
+	top->aclk = 0;
+	top->eval();
+
+	// Registers of the test bench, updated from the values before the edge
+	if (reset) {
+	    m_inp = i_inp = j_inp = 0;
+	    in_v = false;
+	    t_idx = 0;
+	    rready = in_done = false;
+#ifdef MVAU_STREAM
+	    x_inp = r_inp = s_inp = 0;
+	    in_wgt_v = false;
+#endif
+	    continue;
+	}
+	const bool inp_last = m_inp == MVAU_MMV-1 && i_inp == act_w-1 && j_inp == MVAU_SF-1;
+	const bool in_taken = wready && (in_v || !traffic);
+	if (traffic) {
+	    // Held until taken, then following the input pattern until the last word is taken
+	    const bool last_taken = in_v && wready && inp_last;
+	    if (in_v && !wready)
+		in_v = true;
+	    else
+		in_v = !in_done && !last_taken && word_bits(in_pat[t_idx], 0, 1);
+	    in_done = in_done || last_taken;
+	    rready = word_bits(out_pat[t_idx], 0, 1);
+	    t_idx = t_idx == traffic_len-1 ? 0 : t_idx+1;
+	}
+	else if (act_w == 1 && MVAU_SF == 1)
+	    in_v = !in_v;
+	else
+	    in_v = !inp_last;
+	if (in_taken && !inp_last) {
+	    if (i_inp == act_w-1 && j_inp == MVAU_SF-1) {
+		i_inp = j_inp = 0;
+		m_inp++;
+	    }
+	    else if (j_inp == MVAU_SF-1) {
+		j_inp = 0;
+		i_inp++;
+	    }
+	    else
+		j_inp++;
+	}
+#ifdef MVAU_STREAM
+	const bool wgt_last = x_inp == act_w-1 && r_inp == MVAU_NF-1 && s_inp == MVAU_SF-1;
+	in_wgt_v = !wgt_last;
+	if (wmem_wready && !wgt_last) {
+	    if (r_inp == MVAU_NF-1 && s_inp == MVAU_SF-1) {
+		r_inp = s_inp = 0;
+		x_inp++;
+	    }
+	    else if (s_inp == MVAU_SF-1) {
+		s_inp = 0;
+		r_inp++;
+	    }
+	    else
+		s_inp++;
+	}
+#endif
+    }
+    fclose(dump_fd);
+    top->final();
+
+    if (taken < outputs) {
+	printf("%ld << Simulation complete, failed: %d of %d outputs taken >>\n",
+	       static_cast<long>(ctx->time()), taken*MVAU_PE, outputs*MVAU_PE);
+	return 1;
+    }
+    printf("%ld << Simulation Complete. Total successul outputs: %d >>\n", static_cast<long>(ctx->time()), taken*MVAU_PE);
+    printf("%ld << Outputs dumped to out_dump.mem >>\n", static_cast<long>(ctx->time()));
+#ifdef MVAU_STREAM
+    printf("%ld << Latency: %ld >>\n", static_cast<long>(ctx->time()), latency);
+#else
+    printf("%ld << Latency: %ld >>\n", static_cast<long>(ctx->time()), latency/MVAU_MMV);
+#endif
+    FILE* f = fopen("latency.txt", "w");
+    if (f != nullptr) {
+	fprintf(f, "%ld", latency);
+	fclose(f);
+    }
+    if (traffic) {
+	printf("%ld << Output handshakes: %d in %ld cycles, input handshakes: %ld in %ld valid cycles >>\n",
+	       static_cast<long>(ctx->time()), taken, latency, in_taken_cnt, in_valid_cnt);
+	f = fopen("traffic.txt", "w");
+	if (f != nullptr) {
+	    fprintf(f, "cycles %ld\nin_valid %ld\nin_taken %ld\nout_valid %ld\nout_ready %ld\nout_taken %d\nfirst_out %ld\nlast_out %ld\n",
+		    latency, in_valid_cnt, in_taken_cnt, out_valid_cnt, out_ready_cnt, taken, first_out, last_out);
+	    fclose(f);
+	}
+    }
+    return 0;
+}
@@ -0,0 +1,267 @@
+ #
+ # Python Script: MVAU Weight Layout Generator (mvau_wgt_layout.py)
+ #
+ # Author(s): Syed Asad Alam <syed.asad.alam@tcd.ie>
+ #
+ # This file lays out the weights of a layer for the MVAU without relying on
+ # HLS. A weight tensor (OFMCh x KDim x KDim x IFMCh) is lowered to the weight
+ # matrix (MatrixH x MatrixW) with the kernel elements ordered as (KDim row,
+ # KDim column, IFMCh), in the same way as the input activation matrix. The
+ # weight matrix is folded into SF=MatrixW/SIMD and NF=MatrixH/PE chunks and
+ # written as:
+ # - The weight memory of each PE (weight_mem<p>.mem) read by mvau_weight_mem<p>.sv,
+ #   with row nf*PE+p of the weight matrix going to PE p and the SF words of
+ #   each row being [0:SIMD-1][TW-1:0], i.e., [NF][SF] words
+ # - The weight stream (inp_wgt.mem) read by the stream test benches,
+ #   [NF][SF] words of [PE-1:0][0:SIMD-1][TW-1:0]
+ # The inverse transforms recover the weight matrix from either layout.
+ #
+ # It can be called from the command line as follows:
+ # python mvau_wgt_layout.py split <matrix file> <config>       - Writes the weight memories of all PEs
+ # python mvau_wgt_layout.py merge <matrix file> <config>       - Reads the weight memories of all PEs back
+ # where the matrix file holds one row of the weight matrix in each word, as
+ # for e.g. weight_mem_batch<n>.mem of the MLP regression tests
+ #
+ # This material is based upon work supported, in part, by Science Foundation
+ # Ireland, www.sfi.ie under Grant No. 13/RC/2094_P2 and, in part, by the
+ # European Union's Horizon 2020 research and innovation programme under the
+ # Marie Sklodowska-Curie grant agreement Grant No.754489.
+
+import numpy as np
+import sys
+import os
+import argparse
+from mvau_mem import read_mem, write_mem
+
+# Function: fold_check
+# This function checks that the weight matrix can be folded
+#
+# Parameters:
+#   matrix_h - Number of rows of the weight matrix (OFMCh)
+#   matrix_w - Number of columns of the weight matrix (KDim^2*IFMCh)
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   sf, nf - Number of SIMD wide and PE high chunks of the weight matrix
+def fold_check(matrix_h,matrix_w,simd,pe):
+    if(matrix_w%simd != 0 or matrix_h%pe != 0):
+        raise ValueError("Invalid weight folding: MatrixW=%d, MatrixH=%d, SIMD=%d, PE=%d"
+                         % (matrix_w, matrix_h, simd, pe))
+    return matrix_w//simd, matrix_h//pe
+
+# Function: wgt_matrix
+# This function lowers a weight tensor to the weight matrix
+#
+# Parameters:
+#   wgt - Weight tensor, OFMCh x KDim x KDim x IFMCh
+#
+# Returns:
+#
+#   mat - Weight matrix, OFMCh x (KDim^2*IFMCh)
+def wgt_matrix(wgt):
+    wgt = np.asarray(wgt)
+    return wgt.reshape(wgt.shape[0], -1)
+
+# Function: wgt_tensor
+# This function restores the weight tensor from the weight matrix
+#
+# Parameters:
+#   mat - Weight matrix, OFMCh x (KDim^2*IFMCh)
+#   kdim - Kernel dimension
+#
+# Returns:
+#
+#   wgt - Weight tensor, OFMCh x KDim x KDim x IFMCh
+def wgt_tensor(mat,kdim):
+    return mat.reshape(mat.shape[0], kdim, kdim, -1)
+
+# Function: pe_banks
+# This function folds the weight matrix into the weight memories of the PEs
+#
+# Parameters:
+#   mat - Weight matrix, MatrixH x MatrixW
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   banks - Weight memories, PE x (NF*SF) x SIMD
+def pe_banks(mat,simd,pe):
+    sf, nf = fold_check(mat.shape[0], mat.shape[1], simd, pe)
+    ### NF x PE x SF x SIMD -> PE x NF x SF x SIMD
+    return mat.reshape(nf, pe, sf, simd).transpose(1,0,2,3).reshape(pe, nf*sf, simd)
+
+# Function: banks_matrix
+# This function restores the weight matrix from the weight memories of the PEs
+#
+# Parameters:
+#   banks - Weight memories, PE x (NF*SF) x SIMD
+#   matrix_w - Number of columns of the weight matrix
+#
+# Returns:
+#
+#   mat - Weight matrix, MatrixH x MatrixW
+def banks_matrix(banks,matrix_w):
+    pe, depth, simd = banks.shape
+    sf = matrix_w//simd
+    nf = depth//sf
+    return banks.reshape(pe, nf, sf, simd).transpose(1,0,2,3).reshape(nf*pe, matrix_w)
+
+# Function: wgt_stream
+# This function folds the weight matrix into the words of the weight stream
+#
+# Parameters:
+#   mat - Weight matrix, MatrixH x MatrixW
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   stream - Weight stream, (NF*SF) x (PE*SIMD), PE-1 being the first PE of a word
+def wgt_stream(mat,simd,pe):
+    sf, nf = fold_check(mat.shape[0], mat.shape[1], simd, pe)
+    ### NF x PE x SF x SIMD -> NF x SF x PE (descending) x SIMD
+    return mat.reshape(nf, pe, sf, simd)[:,::-1].transpose(0,2,1,3).reshape(nf*sf, pe*simd)
+
+# Function: stream_matrix
+# This function restores the weight matrix from the words of the weight stream
+#
+# Parameters:
+#   stream - Weight stream, (NF*SF) x (PE*SIMD)
+#   matrix_w - Number of columns of the weight matrix
+#   pe - Number of processing elements (PE)
+#
+# Returns:
+#
+#   mat - Weight matrix, MatrixH x MatrixW
+def stream_matrix(stream,matrix_w,pe):
+    depth, width = stream.shape
+    simd = width//pe
+    sf = matrix_w//simd
+    nf = depth//sf
+    return stream.reshape(nf, sf, pe, simd)[:,:,::-1].transpose(0,2,1,3).reshape(nf*pe, matrix_w)
+
+# Function: write_wgt_banks
+# This function writes the weight memory file of each PE
+#
+# Parameters:
+#   mat - Weight matrix, MatrixH x MatrixW
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#   wwl - Weight precision
+#   wmem_dir - Directory for the weight memory files (weight_mem<p>.mem)
+#
+# Returns:
+#
+# None
+def write_wgt_banks(mat,simd,pe,wwl,wmem_dir="."):
+    for p, bank in enumerate(pe_banks(mat,simd,pe)):
+        write_mem(os.path.join(wmem_dir,"weight_mem%d.mem" % p), bank, wwl)
+
+# Function: read_wgt_banks
+# This function reads the weight memory files of all PEs
+#
+# Parameters:
+#   matrix_h - Number of rows of the weight matrix
+#   matrix_w - Number of columns of the weight matrix
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#   wwl - Weight precision
+#   sgn - '1' if the weights are signed, else '0'
+#   wmem_dir - Directory of the weight memory files (weight_mem<p>.mem)
+#
+# Returns:
+#
+#   mat - Weight matrix, MatrixH x MatrixW
+def read_wgt_banks(matrix_h,matrix_w,simd,pe,wwl,sgn=0,wmem_dir="."):
+    sf, nf = fold_check(matrix_h, matrix_w, simd, pe)
+    banks = np.stack([read_mem(os.path.join(wmem_dir,"weight_mem%d.mem" % p), simd, wwl, sgn)[:nf*sf]
+                      for p in range(pe)])
+    return banks_matrix(banks,matrix_w)
+
+# Function: write_wgt_stream
+# This function writes the weight stream file
+#
+# Parameters:
+#   fname - File name, for e.g. inp_wgt.mem
+#   mat - Weight matrix, MatrixH x MatrixW
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#   wwl - Weight precision
+#
+# Returns:
+#
+# None
+def write_wgt_stream(fname,mat,simd,pe,wwl):
+    write_mem(fname, wgt_stream(mat,simd,pe), wwl)
+
+# Function: read_wgt_stream
+# This function reads the weight stream file
+#
+# Parameters:
+#   fname - File name, for e.g. inp_wgt.mem
+#   matrix_h - Number of rows of the weight matrix
+#   matrix_w - Number of columns of the weight matrix
+#   simd - Number of SIMD elements
+#   pe - Number of processing elements (PE)
+#   wwl - Weight precision
+#   sgn - '1' if the weights are signed, else '0'
+#
+# Returns:
+#
+#   mat - Weight matrix, MatrixH x MatrixW
+def read_wgt_stream(fname,matrix_h,matrix_w,simd,pe,wwl,sgn=0):
+    sf, nf = fold_check(matrix_h, matrix_w, simd, pe)
+    return stream_matrix(read_mem(fname, pe*simd, wwl, sgn)[:nf*sf], matrix_w, pe)
+
+# Function: parser
+# This function defines an ArgumentParser object for command line arguments
+#
+# Returns:
+# Parser object (parser)
+def parser():
+    parser = argparse.ArgumentParser(description='Python script for laying out the weights of the MVAU')
+    parser.add_argument('cmd', choices=['split', 'merge'],
+			help="Write the weight memories from a weight matrix file or the weight matrix file from the weight memories")
+    parser.add_argument('mat_file',
+			help="Weight matrix file, one row of the weight matrix in each word")
+    parser.add_argument('-k','--kdim',default=2,type=int,
+			help="Filter dimension")
+    parser.add_argument('--ifm_ch', default=4,type=int,
+			help="Input feature map channels")
+    parser.add_argument('--ofm_ch', default=4, type=int,
+			help="Output feature map channels")
+    parser.add_argument('-w','--wgt_wl',default=1,type=int,
+                        help="Weight word length")
+    parser.add_argument('-s','--simd',default=2,type=int,
+			help="SIMD")
+    parser.add_argument('-p', '--pe', default=2,type=int,
+			help="PE")
+    parser.add_argument('--wmem_dir', default=".",
+			help="Directory of the weight memory files")
+    parser.add_argument('--stream_file', default=None,
+			help="Weight stream file (for e.g. inp_wgt.mem) also written by split")
+    return parser
+
+# Function: __main__
+# Entry point of the file, retrieves the command line arguments and
+# converts between the weight matrix file and the weight memories
+if __name__ == "__main__":
+
+    args = parser().parse_args()
+    matrix_w = args.kdim*args.kdim*args.ifm_ch
+    if(args.cmd == 'split'):
+        mat = read_mem(args.mat_file, matrix_w, args.wgt_wl)
+        if(mat.shape[0] != args.ofm_ch):
+            print(f'Weight matrix file has {mat.shape[0]} rows instead of {args.ofm_ch}')
+            sys.exit(1)
+        write_wgt_banks(mat, args.simd, args.pe, args.wgt_wl, args.wmem_dir)
+        if(args.stream_file is not None):
+            write_wgt_stream(args.stream_file, mat, args.simd, args.pe, args.wgt_wl)
+    else:
+        mat = read_wgt_banks(args.ofm_ch, matrix_w, args.simd, args.pe, args.wgt_wl, 0, args.wmem_dir)
+        write_mem(args.mat_file, mat, args.wgt_wl)
+
+    sys.exit(0)
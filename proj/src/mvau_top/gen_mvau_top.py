@@ -13,8 +13,12 @@
 
 import numpy as np
 import sys
+import os
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sim"))
+from mvau_gen_file import GenFile
+
 # Function: gen_mvau_top
 # This function takes in a number of parameters and generates the top level
 # Verilog wrapper for the mvau.sv module through the use of successive write
@@ -34,12 +38,13 @@ import argparse
 #   pe - Number of processing elements (PE)
 #   mmv - Number of images
 #   stride - Convolution stride
+#   out_dir - Directory where the file is written
 #
 # Returns:
 #
-# None
-def gen_mvau_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,stride=1):
-    mvau_top = open("mvau_top.v","wt")
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,stride=1,out_dir="."):
+    mvau_top = GenFile(os.path.join(out_dir,"mvau_top.v"))
     #stride=1
     pad=0
     #mmv=1    
@@ -182,6 +187,7 @@ def gen_mvau_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,op_sgn,owl,simd,pe,mmv,stri
     mvau_top.write("endmodule // mvau_top\n")
 
     mvau_top.close()
+    return mvau_top.changed
 
 # Function: parser
 # This function defines an ArgumentParser object for command line arguments
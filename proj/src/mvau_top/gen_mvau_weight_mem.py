@@ -14,8 +14,12 @@
 
 import numpy as np
 import sys
+import os
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sim"))
+from mvau_gen_file import GenFile
+
 # Function: gen_mvau_weight_mem
 # This function takes does the actual generation using a series
 # of write commands. The use of Python generator was necessary
@@ -23,13 +27,14 @@ import argparse
 #
 # Parameters:
 #   wmem_id - Unique ID for each memory, passed on from command line when generating memories. All other parameters are part of the SystemVerilog design space
+#   out_dir - Directory where the file is written
 #
 # Returns:
 #
-# None
-def gen_mvau_weight_mem(wmem_id):
-    fname = "mvau_weight_mem"+str(wmem_id)+".sv"
-    mvau_wmem = open(fname,"wt")
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_weight_mem(wmem_id,out_dir="."):
+    fname = os.path.join(out_dir,"mvau_weight_mem"+str(wmem_id)+".sv")
+    mvau_wmem = GenFile(fname)
 
     mvau_wmem.write("/*\n")
     mvau_wmem.write(" * Module: MVAU Weight Memory (mvau_weight_mem.sv)\n")
@@ -96,6 +101,7 @@ def gen_mvau_weight_mem(wmem_id):
     mvau_wmem.write("endmodule // mvau_weight_mem\n")
 
     mvau_wmem.close()
+    return mvau_wmem.changed
 
 # Function: parser
 # This function defines an ArgumentParser object for command line arguments
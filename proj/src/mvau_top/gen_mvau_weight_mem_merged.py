@@ -13,8 +13,12 @@
 
 import numpy as np
 import sys
+import os
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sim"))
+from mvau_gen_file import GenFile
+
 # Function: gen_mvau_weight_mem_merged
 # This function takes does the actual generation using a series
 # of write commands. The use of Python generator was necessary
@@ -23,13 +27,14 @@ import argparse
 #
 # Parameters:
 #   pe - Number of processing elements as the number of memories equals PE
+#   out_dir - Directory where the file is written
 #
 # Returns:
 #
-# None
-def gen_mvau_weight_mem_merged(pe):
-    fname = "mvau_weight_mem_merged.sv"
-    mvau_wmem = open(fname,"wt")
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_weight_mem_merged(pe,out_dir="."):
+    fname = os.path.join(out_dir,"mvau_weight_mem_merged.sv")
+    mvau_wmem = GenFile(fname)
     mvau_wmem.write("/*\n")
     mvau_wmem.write(" * Module: MVAU Weights Top Level file (mvau_weight_mem_merged.sv)\n")
     mvau_wmem.write(" * \n")
@@ -82,6 +87,7 @@ def gen_mvau_weight_mem_merged(pe):
     mvau_wmem.write("endmodule // mvau_weight_mem_merged\n")
         
     mvau_wmem.close()
+    return mvau_wmem.changed
 
 # Function: parser
 # This function defines an ArgumentParser object for command line arguments
@@ -13,8 +13,12 @@
 
 import numpy as np
 import sys
+import os
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "sim"))
+from mvau_gen_file import GenFile
+
 
 
 # Function: gen_mvau_stream_top
@@ -36,12 +40,14 @@ import argparse
 #   pe - Number of processing elements (PE)
 #   mmv - Number of images
 #   stride - Convolution stride
+#   op_sgn - Enumerated values showing signedness of input activation/weights
+#   out_dir - Directory where the file is written
 #
 # Returns:
 #
-# None
-def gen_mvau_stream_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,owl,simd,pe,stride=1,mmv=1):
-    mvau_stream_top = open("mvau_stream_top.v","wt")
+#   changed - True if the file was written, False if its contents were unchanged
+def gen_mvau_stream_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,owl,simd,pe,stride=1,mmv=1,op_sgn=0,out_dir="."):
+    mvau_stream_top = GenFile(os.path.join(out_dir,"mvau_stream_top.v"))
     stride=1
     pad=0
     mmv=1    
@@ -185,6 +191,7 @@ def gen_mvau_stream_top(kdim,iwl,iwb,ifmc,ofmc,ifmd,wwl,wwb,owl,simd,pe,stride=1
     mvau_stream_top.write("endmodule // mvau_stream_top\n")
 
     mvau_stream_top.close()
+    return mvau_stream_top.changed
 
     
 # Function: parser
@@ -210,6 +217,8 @@ def parser():
                         help="Weight word length")
     parser.add_argument('--wgt_bin',default=1,type=int,
                         help="Weights binary or fixed point")
+    parser.add_argument('--op_sgn',default=0,type=int,
+                        help="Enumerated values for signed/unsigned input activation/weights")
     parser.add_argument('-o','--out_wl', default=16, type=int,
 			help="Output word length")
     parser.add_argument('-s','--simd',default=2,type=int,
@@ -230,6 +239,6 @@ if __name__ == "__main__":
     gen_mvau_stream_top(args.kdim,args.inp_wl,args.inp_bin,
                         args.ifm_ch,args.ofm_ch,args.ifm_dim,
                         args.wgt_wl,args.wgt_bin,args.out_wl,
-                        args.simd,args.pe)
+                        args.simd,args.pe,op_sgn=args.op_sgn)
                             
     sys.exit(0)